@@ -4,7 +4,6 @@ Utility script to add individual cards to the hash database
 """
 
 import asyncio
-import httpx
 from pathlib import Path
 import logging
 from PIL import Image
@@ -13,6 +12,9 @@ import imagehash
 import re
 
 from card_matching import load_card_database, save_card_database
+from image_store import image_store
+from scryfall_integration import get_card_details_by_set, close_http_client
+from rate_limiter import background_priority
 
 logging.basicConfig(
     level=logging.INFO,
@@ -55,30 +57,13 @@ async def fetch_card_from_scryfall(set_code: str, collector_number: str) -> dict
     Returns:
         Card data from Scryfall
     """
-    url = f"https://api.scryfall.com/cards/{set_code}/{collector_number}"
+    # Goes through the shared Scryfall client so it respects the rate limiter
+    card_data = await get_card_details_by_set(set_code, collector_number)
 
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, timeout=10.0)
-        response.raise_for_status()
-        return response.json()
+    if card_data is None:
+        raise ValueError(f"Card not found on Scryfall: {set_code}/{collector_number}")
 
-
-async def download_card_image(url: str) -> Image.Image:
-    """
-    Download card image from URL
-
-    Args:
-        url: Image URL
-
-    Returns:
-        PIL Image
-    """
-    async with httpx.AsyncClient() as client:
-        response = await client.get(url, timeout=30.0)
-        response.raise_for_status()
-
-        img = Image.open(BytesIO(response.content))
-        return img
+    return card_data
 
 
 async def add_card_by_url(url: str, hash_size: int = 16) -> dict:
@@ -110,22 +95,12 @@ async def add_card_by_url(url: str, hash_size: int = 16) -> dict:
 
     logger.info(f"Found card: {card_name} (ID: {scryfall_id})")
 
-    # Get image URL
-    if 'image_uris' in card_data:
-        # Single-faced card
-        image_url = card_data['image_uris']['normal']
-    elif 'card_faces' in card_data and len(card_data['card_faces']) > 0:
-        # Multi-faced card - use front face
-        if 'image_uris' in card_data['card_faces'][0]:
-            image_url = card_data['card_faces'][0]['image_uris']['normal']
-        else:
-            raise ValueError(f"No image found for {card_name}")
-    else:
-        raise ValueError(f"No image URL found for {card_name}")
-
-    # Download image
-    logger.info("Downloading card image...")
-    img = await download_card_image(image_url)
+    # Load image (downloaded once, then read from the image store)
+    logger.info("Loading card image...")
+    image_data = await image_store.get(card_data, "normal")
+    if image_data is None:
+        raise ValueError(f"No image found for {card_name}")
+    img = Image.open(BytesIO(image_data))
 
     # Create perceptual hash
     logger.info("Creating perceptual hash...")
@@ -249,7 +224,11 @@ async def main():
         return
 
     # Add cards
-    await add_cards_to_database(urls, hash_size=args.hash_size)
+    try:
+        with background_priority():
+            await add_cards_to_database(urls, hash_size=args.hash_size)
+    finally:
+        await close_http_client()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,99 @@
+"""
+Bulk Data Ingestion Memory Benchmark
+Compares peak RSS of loading a bulk data file with json.load (the old
+download_all_cards behaviour) against streaming it through iter_bulk_cards
+
+Each mode runs in its own subprocess so peak RSS is measured independently.
+A synthetic file shaped like Scryfall's default_cards is generated unless
+--file points at a real one.
+
+Usage (from the repository root):
+    python -m benchmarks.bulk_ingest --cards 100000
+    python -m benchmarks.bulk_ingest --file cache/default_cards.json
+"""
+
+import argparse
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+import time
+
+
+def write_synthetic_file(path: str, count: int) -> None:
+    """Write a default_cards-like array of `count` cards"""
+    with open(path, "w", encoding="utf-8") as f:
+        f.write("[\n")
+        for i in range(count):
+            card = {
+                "object": "card",
+                "id": f"{i:08d}-0000-0000-0000-000000000000",
+                "oracle_id": f"{i // 4:08d}-1111-1111-1111-111111111111",
+                "name": f"Synthetic Cárd {i // 4}",
+                "set": f"s{i % 400:03d}",
+                "collector_number": str(i),
+                "released_at": f"20{i % 25:02d}-01-01",
+                "layout": "normal",
+                "oracle_text": "Flying, vigilance. When this creature enters, draw a card. " * 6,
+                "image_uris": {size: f"https://cards.example/{size}/{i}.jpg" for size in ("small", "normal", "large", "png", "art_crop", "border_crop")},
+                "legalities": {fmt: "legal" for fmt in ("standard", "pioneer", "modern", "legacy", "vintage", "commander", "pauper", "historic")},
+                "prices": {"usd": "0.25", "usd_foil": "1.00", "eur": "0.20", "tix": "0.02"}
+            }
+            f.write(json.dumps(card))
+            f.write(",\n" if i < count - 1 else "\n")
+        f.write("]\n")
+
+
+def measure(mode: str, path: str) -> None:
+    """Ingest the file in one mode and print count, seconds and peak RSS (child process)"""
+    started = time.perf_counter()
+    count = 0
+    if mode == "json.load":
+        with open(path, "r", encoding="utf-8") as f:
+            cards = json.load(f)
+        for card in cards:
+            count += 1
+    else:
+        from scryfall_integration import iter_bulk_cards
+        for card in iter_bulk_cards(path):
+            count += 1
+    elapsed = time.perf_counter() - started
+    peak_mb = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    print(json.dumps({"mode": mode, "cards": count, "seconds": round(elapsed, 2), "peak_rss_mb": round(peak_mb, 1)}))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure peak memory of bulk data ingestion")
+    parser.add_argument('--cards', type=int, default=100000, help='Synthetic cards to generate (default: 100000)')
+    parser.add_argument('--file', help='Existing bulk data file to ingest instead')
+    parser.add_argument('--measure', choices=["json.load", "stream"], help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.measure:
+        measure(args.measure, args.file)
+        return
+
+    path = args.file
+    tmp_dir = None
+    if not path:
+        tmp_dir = tempfile.TemporaryDirectory()
+        path = os.path.join(tmp_dir.name, "default_cards.json")
+        write_synthetic_file(path, args.cards)
+
+    print(f"{path}: {os.path.getsize(path) / 1e6:.0f} MB\n")
+    for mode in ("json.load", "stream"):
+        output = subprocess.run(
+            [sys.executable, "-m", "benchmarks.bulk_ingest", "--measure", mode, "--file", path],
+            capture_output=True, text=True, check=True
+        ).stdout
+        result = json.loads(output.strip().splitlines()[-1])
+        print(f"{mode:>10}: {result['cards']} cards  {result['seconds']:6.2f}s  peak RSS {result['peak_rss_mb']:8.1f} MB")
+
+    if tmp_dir:
+        tmp_dir.cleanup()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,143 @@
+"""
+Edition Matching Benchmark
+Accuracy and latency of the local edition matcher on synthetic printings
+
+Each trial renders a set of candidate "printings" - a few artworks, each
+reprinted with different frames, borders and set symbols - then photographs
+one of them (perspective warp onto a background, lighting change, blur and
+JPEG compression) and asks the matcher to pick it. Reports top-1 accuracy,
+how many picks were confident enough to skip the LLM, and how many of those
+were wrong.
+
+With --neighbours, other cards (same frame, different art) are laid out
+next to it in the photo, as in a multi-card scan.
+
+Usage (from the repository root):
+    python -m benchmarks.edition_matching --trials 60
+    python -m benchmarks.edition_matching --trials 60 --neighbours 2
+"""
+
+import argparse
+import time
+from typing import List
+
+import cv2
+import numpy as np
+
+from image_comparison import EditionMatcher, ScanPhoto, CARD_SIZE
+
+WIDTH, HEIGHT = CARD_SIZE
+
+
+def render_art(seed: int) -> np.ndarray:
+    """Random shapes standing in for card artwork"""
+    rng = np.random.RandomState(seed)
+    art = np.zeros((300, 400, 3), np.uint8)
+    art[:] = rng.randint(0, 255, 3)
+    for _ in range(40):
+        color = tuple(int(c) for c in rng.randint(0, 255, 3))
+        shape = rng.randint(3)
+        if shape == 0:
+            cv2.circle(art, (rng.randint(400), rng.randint(300)), rng.randint(5, 60), color, -1)
+        elif shape == 1:
+            cv2.rectangle(art, (rng.randint(400), rng.randint(300)), (rng.randint(400), rng.randint(300)), color, -1)
+        else:
+            cv2.line(art, (rng.randint(400), rng.randint(300)), (rng.randint(400), rng.randint(300)), color, rng.randint(1, 8))
+    return art
+
+
+def render_card(art_seed: int, frame: int, symbol_seed: int, number: int) -> np.ndarray:
+    """A printing: shared art and text, printing-specific frame, border, symbol and number"""
+    border = (20, 20, 20) if frame % 2 == 0 else (235, 235, 235)
+    card = np.full((HEIGHT, WIDTH, 3), border, np.uint8)
+    cv2.rectangle(card, (22, 22), (WIDTH - 22, HEIGHT - 40), (60 + frame * 30, 90, 140 - frame * 20), -1)
+
+    art = cv2.resize(render_art(art_seed), (int(WIDTH * 0.84), int(HEIGHT * 0.44)))
+    top, left = int(HEIGHT * 0.11), int(WIDTH * 0.08)
+    card[top:top + art.shape[0], left:left + art.shape[1]] = art
+
+    cv2.rectangle(card, (30, int(HEIGHT * 0.56)), (WIDTH - 30, int(HEIGHT * 0.62)), (200, 200, 190), -1)
+    cv2.putText(card, "Creature - Goblin", (40, int(HEIGHT * 0.605)), cv2.FONT_HERSHEY_SIMPLEX, 0.8, (0, 0, 0), 2)
+    rng = np.random.RandomState(symbol_seed)
+    symbol = rng.randint(-14, 14, (5, 2)) + [WIDTH - 60, int(HEIGHT * 0.59)]
+    cv2.fillPoly(card, [symbol.astype(np.int32)], tuple(int(c) for c in rng.randint(0, 255, 3)))
+
+    cv2.rectangle(card, (40, int(HEIGHT * 0.64)), (WIDTH - 40, int(HEIGHT * 0.89)), (225, 225, 215), -1)
+    for line in range(4):
+        cv2.putText(card, "Haste. When this enters, deal 2.", (50, int(HEIGHT * 0.68) + line * 30),
+                    cv2.FONT_HERSHEY_SIMPLEX, 0.6, (0, 0, 0), 1)
+    text_color = (255, 255, 255) if frame % 2 == 0 else (0, 0, 0)
+    cv2.putText(card, f"{number:03d}/280 R  SET  EN", (30, HEIGHT - 15), cv2.FONT_HERSHEY_SIMPLEX, 0.55, text_color, 1)
+    return card
+
+
+def photograph(cards: List[np.ndarray], seed: int) -> bytes:
+    """Simulated phone photo of cards laid out side by side"""
+    rng = np.random.RandomState(seed)
+    size = (1000 * len(cards), 1200)
+    photo = np.full((size[1], size[0], 3), rng.randint(60, 200, 3), np.uint8)
+    photo = cv2.add(photo, rng.randint(0, 40, photo.shape).astype(np.uint8))
+
+    corners = np.float32([[0, 0], [WIDTH, 0], [WIDTH, HEIGHT], [0, HEIGHT]])
+    for slot, card in enumerate(cards):
+        placed = np.float32([[200, 150], [720, 180], [760, 900], [170, 870]]) + rng.randint(-40, 40, (4, 2)) + [1000 * slot, 0]
+        matrix = cv2.getPerspectiveTransform(corners, placed.astype(np.float32))
+        warped = cv2.warpPerspective(card, matrix, size)
+        mask = cv2.warpPerspective(np.full((HEIGHT, WIDTH), 255, np.uint8), matrix, size)
+        photo[mask > 0] = warped[mask > 0]
+
+    photo = cv2.convertScaleAbs(photo, alpha=rng.uniform(0.8, 1.2), beta=rng.uniform(-25, 25))
+    photo = cv2.GaussianBlur(photo, (5, 5), rng.uniform(0.5, 1.5))
+    return cv2.imencode(".jpg", photo, [cv2.IMWRITE_JPEG_QUALITY, 80])[1].tobytes()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure local edition matching on synthetic printings")
+    parser.add_argument('--trials', type=int, default=60, help='Photos to match (default: 60)')
+    parser.add_argument('--arts', type=int, default=4, help='Artworks per card (default: 4)')
+    parser.add_argument('--reprints', type=int, default=3, help='Printings per artwork (default: 3)')
+    parser.add_argument('--neighbours', type=int, default=0, help='Other cards in the photo (default: 0)')
+    args = parser.parse_args()
+
+    matcher = EditionMatcher()
+    correct = confident = confident_wrong = 0
+    seconds = []
+
+    for trial in range(args.trials):
+        count = args.arts * args.reprints
+        candidates, images = [], []
+        for i in range(count):
+            card = render_card(1000 * trial + i // args.reprints, i % args.reprints, 5000 + trial * 100 + i, i + 1)
+            candidates.append({"id": f"{trial}-{i}", "set": f"s{i}", "collector_number": str(i + 1),
+                               "image_uris": {"normal": f"https://example/{trial}/{i}.jpg"}})
+            images.append(cv2.imencode(".jpg", card, [cv2.IMWRITE_JPEG_QUALITY, 90])[1].tobytes())
+
+        rng = np.random.RandomState(100 + trial)
+        target = rng.randint(count)
+        cards = [cv2.imdecode(np.frombuffer(images[target], np.uint8), cv2.IMREAD_COLOR)]
+        cards += [render_card(900000 + 1000 * trial + n, target % args.reprints, 5000 + trial * 100 + target, n + 1)
+                  for n in range(args.neighbours)]
+        order = rng.permutation(len(cards))
+        photo = photograph([cards[i] for i in order], trial)
+
+        started = time.perf_counter()
+        ranked = matcher.rank(ScanPhoto(photo), candidates, images)
+        seconds.append(time.perf_counter() - started)
+
+        top = ranked[0]
+        hit = top['card']['id'] == candidates[target]['id']
+        correct += hit
+        if top['score'] >= matcher.min_score and top['margin'] >= matcher.margin:
+            confident += 1
+            confident_wrong += not hit
+
+    print(f"Top-1 accuracy:     {correct}/{args.trials}")
+    print(f"Decided locally:    {confident}/{args.trials} (thresholds: score >= {matcher.min_score}, margin >= {matcher.margin})")
+    print(f"Wrong local picks:  {confident_wrong}")
+    print(f"Rank time:          median {np.median(seconds) * 1000:.0f} ms, max {max(seconds) * 1000:.0f} ms "
+          f"({args.arts * args.reprints} candidates, {args.neighbours + 1} card(s) in the photo, "
+          f"candidate features not cached)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,104 @@
+"""
+HTTP Connection Reuse Benchmark
+Compares per-lookup latency with a fresh client per request (the old
+behaviour) against the shared pooled client, using a local stub server
+
+The stub delays the first request on every new connection to simulate the
+TCP + TLS handshake to api.scryfall.com.
+
+Usage (from the repository root):
+    python -m benchmarks.http_pool --requests 200 --handshake-ms 60
+"""
+
+import argparse
+import asyncio
+import json
+import statistics
+import time
+from typing import List
+
+import httpx
+
+from scryfall_integration import create_http_client
+from benchmarks.stub_server import StubServer
+
+CARD_BODY = json.dumps({
+    "object": "card",
+    "id": "00000000-0000-0000-0000-000000000000",
+    "name": "Sol Ring",
+    "set": "c21",
+    "collector_number": "263",
+    "prices": {"usd": "1.50"}
+}).encode()
+
+
+async def respond_with_card(method: str, path: str, body: bytes):
+    """Answer every request with the same card"""
+    return 200, {"Content-Type": "application/json"}, CARD_BODY
+
+
+async def lookup_fresh_client(url: str) -> None:
+    """Old behaviour: a new AsyncClient (and connection) per lookup"""
+    async with httpx.AsyncClient() as client:
+        response = await client.get(url, timeout=30.0)
+        response.raise_for_status()
+        response.json()
+
+
+async def lookup_pooled_client(client: httpx.AsyncClient, url: str) -> None:
+    """New behaviour: reuse the shared pooled client"""
+    response = await client.get(url, timeout=30.0)
+    response.raise_for_status()
+    response.json()
+
+
+def summarize(name: str, latencies: List[float], connections: int) -> None:
+    """Print latency percentiles in milliseconds"""
+    latencies = sorted(latencies)
+    p95 = latencies[int(len(latencies) * 0.95) - 1]
+    print(
+        f"{name:>14}: mean {statistics.mean(latencies) * 1000:7.2f} ms  "
+        f"p50 {statistics.median(latencies) * 1000:7.2f} ms  "
+        f"p95 {p95 * 1000:7.2f} ms  connections {connections}"
+    )
+
+
+async def run(requests: int, handshake_ms: float) -> None:
+    server = await StubServer(respond_with_card, connection_delay=handshake_ms / 1000).start()
+    base = server.base_url
+
+    print(f"{requests} sequential lookups, simulated handshake {handshake_ms:.0f} ms\n")
+
+    # Fresh client per request
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        await lookup_fresh_client(f"{base}/cards/c21/{i}")
+        latencies.append(time.perf_counter() - started)
+    summarize("fresh client", latencies, server.connections)
+
+    # Shared pooled client
+    server.connections = 0
+    client = create_http_client()
+    latencies = []
+    for i in range(requests):
+        started = time.perf_counter()
+        await lookup_pooled_client(client, f"{base}/cards/c21/{i}")
+        latencies.append(time.perf_counter() - started)
+    await client.aclose()
+    summarize("pooled client", latencies, server.connections)
+
+    await server.stop()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark HTTP connection reuse against a local stub")
+    parser.add_argument('--requests', type=int, default=200, help='Lookups per mode (default: 200)')
+    parser.add_argument('--handshake-ms', type=float, default=60.0, help='Simulated handshake per connection (default: 60)')
+    args = parser.parse_args()
+
+    asyncio.run(run(args.requests, args.handshake_ms))
+
+
+if __name__ == "__main__":
+    main()
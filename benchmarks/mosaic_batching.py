@@ -0,0 +1,96 @@
+"""
+Mosaic Batching Benchmark
+Provider calls and identification latency of concurrent one- and two-card
+scans, with and without mosaic batching
+
+Requests arrive as a Poisson process. A stub provider takes a lognormal
+base latency plus a cost per tile and answers every tile of a mosaic;
+unbatched requests (and requests left alone in their window) make one
+call each. Mosaics are really built and encoded, so that cost is
+included. Times are scaled down by --scale;
+reported times are unscaled.
+
+Usage (from the repository root):
+    python -m benchmarks.mosaic_batching --rates 0.5,2,5,10 --requests 200
+"""
+
+import argparse
+import asyncio
+import logging
+import random
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from mosaic_batcher import MOSAIC_MAX_TILES, MOSAIC_WINDOW_MS, MosaicBatcher
+
+
+def stub_provider(median: float, sigma: float, per_tile: float, scale: float, seed: int):
+    """Provider stub answering every tile after base + per-tile latency"""
+    rng = random.Random(seed)
+
+    def identify(image_data: bytes, prompt: str, timeout: Optional[float] = None) -> List[Dict]:
+        tiles = int(re.search(r"grid of (\d+)", prompt).group(1))
+        time.sleep((median * rng.lognormvariate(0, sigma) + per_tile * tiles) * scale)
+        return [{"tile": tile, "name": f"Card {tile}"} for tile in range(1, tiles + 1)]
+
+    return identify
+
+
+async def run(rate: float, args, batched: bool) -> Dict:
+    """Latencies and call count of --requests requests arriving at `rate` per second"""
+    rng = random.Random(args.seed)
+    provider = stub_provider(args.median, args.sigma, args.per_tile, args.scale, args.seed)
+    batcher = MosaicBatcher(identify=provider, window=args.window / 1000 * args.scale, max_tiles=args.max_tiles)
+    crop = np.random.default_rng(args.seed).integers(0, 255, (680, 488, 3), dtype=np.uint8)
+    latencies, calls = [], 0
+    # Plenty of threads, so unbatched calls don't queue for the default executor
+    asyncio.get_running_loop().set_default_executor(ThreadPoolExecutor(max_workers=args.requests))
+
+    async def request(crop_count: int):
+        nonlocal calls
+        started = time.perf_counter()
+        if not batched or await batcher.identify([crop] * crop_count) is None:
+            calls += 1
+            await asyncio.to_thread(provider, b"", "grid of 1")
+        latencies.append((time.perf_counter() - started) / args.scale)
+
+    tasks = []
+    for _ in range(args.requests):
+        tasks.append(asyncio.ensure_future(request(rng.choice((1, 1, 1, 2)))))
+        await asyncio.sleep(rng.expovariate(rate) * args.scale)
+    await asyncio.gather(*tasks)
+    return {"latencies": sorted(latencies), "calls": calls + batcher.batches}
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure mosaic batching throughput and latency")
+    parser.add_argument('--rates', default="0.5,2,5,10", help='Arrival rates in requests/s (default: 0.5,2,5,10)')
+    parser.add_argument('--requests', type=int, default=200, help='Requests per run (default: 200)')
+    parser.add_argument('--median', type=float, default=4.0, help='Provider median latency in s (default: 4)')
+    parser.add_argument('--sigma', type=float, default=0.4, help='Provider latency log-space sigma (default: 0.4)')
+    parser.add_argument('--per-tile', type=float, default=0.3, help='Extra provider seconds per tile (default: 0.3)')
+    parser.add_argument('--window', type=float, default=MOSAIC_WINDOW_MS, help=f'Batching window in ms (default: {MOSAIC_WINDOW_MS:g})')
+    parser.add_argument('--max-tiles', type=int, default=MOSAIC_MAX_TILES, help=f'Tiles per mosaic (default: {MOSAIC_MAX_TILES})')
+    parser.add_argument('--scale', type=float, default=0.1, help='Real seconds per simulated second (default: 0.1)')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    print(f"{args.requests} requests per run (1-2 cards each); provider {args.median:g}s median "
+          f"+ {args.per_tile:g}s per tile; window {args.window:g} ms, up to {args.max_tiles} tiles")
+    for rate in (float(r) for r in args.rates.split(",")):
+        for batched in (False, True):
+            result = asyncio.run(run(rate, args, batched))
+            ordered = result["latencies"]
+            pick = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+            print(f"{rate:5g} req/s  {'mosaic' if batched else 'single':<7} calls {result['calls']:4d} "
+                  f"({args.requests / result['calls']:4.1f} requests/call)  "
+                  f"p50 {pick(0.5):5.2f}s  p95 {pick(0.95):5.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,141 @@
+"""
+Vision Provider Latency Benchmark
+Scan latency with stubbed vision providers whose response times follow
+configurable lognormal distributions
+
+Compares Pro Scan waiting for every provider against returning on a
+quorum, and the default scan (always starting with Claude, so routing
+doesn't blur the comparison) with and without a hedged backup request.
+Delays are scaled down by --scale to keep runs short; reported times are
+unscaled. With --down, one provider fails every call after an SDK-style
+timeout, to show its circuit breaker taking it out of rotation.
+
+Usage (from the repository root):
+    python -m benchmarks.pro_scan_latency --scans 200
+    python -m benchmarks.pro_scan_latency --claude 6,0.6 --openai 4,0.4 --gemini 3,0.8 --fail 0.02
+    python -m benchmarks.pro_scan_latency --down Claude [--no-breakers]
+"""
+
+import argparse
+import logging
+import random
+import statistics
+import threading
+import time
+from typing import Dict, List
+
+import multi_vision
+from circuit_breaker import BREAKER_OPEN_SECONDS, BREAKER_SLOW_SECONDS, CircuitBreakers
+from multi_vision import identify_cards_hedged, identify_cards_pro, scan_counters
+
+ANSWER = [{"name": "Lightning Bolt", "set": "lea", "collector_number": "161"},
+          {"name": "Counterspell", "set": "lea", "collector_number": "54"}]
+
+
+def stub_provider(name: str, median: float, sigma: float, fail_rate: float, scale: float, seed: int):
+    """Provider stub sleeping for a lognormal delay (median seconds, log-space sigma)"""
+    rng = random.Random(seed)
+    lock = threading.Lock()
+
+    def identify(image_data: bytes, raise_errors: bool = False) -> List[Dict]:
+        with lock:
+            delay = median * rng.lognormvariate(0, sigma)
+            failed = rng.random() < fail_rate
+        time.sleep(delay * scale)
+        if failed:
+            raise RuntimeError(f"{name} stub failure")
+        return [dict(card) for card in ANSWER]
+
+    return identify
+
+
+def down_provider(name: str, seconds: float, scale: float):
+    """Provider stub that times out on every call"""
+
+    def identify(image_data: bytes, raise_errors: bool = False) -> List[Dict]:
+        time.sleep(seconds * scale)
+        raise TimeoutError(f"{name} stub timed out")
+
+    return identify
+
+
+def parse_distribution(text: str) -> tuple:
+    """'median,sigma' -> (median, sigma)"""
+    median, sigma = text.split(",")
+    return float(median), float(sigma)
+
+
+def summarize(label: str, runs: List[tuple], scale: float, extra: str = "") -> None:
+    """Print latency percentiles (unscaled) and how many scans found no cards"""
+    ordered = sorted(seconds / scale for seconds, _ in runs)
+    failed = sum(1 for _, cards in runs if not cards)
+    pick = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+    print(f"{label:<26} p50 {pick(0.5):5.1f}s  p90 {pick(0.9):5.1f}s  p99 {pick(0.99):5.1f}s  "
+          f"mean {statistics.mean(ordered):5.1f}s  failed {failed:3d}  {extra}")
+
+
+def timed(scan) -> tuple:
+    """(seconds, cards) of one scan"""
+    started = time.perf_counter()
+    cards = scan()
+    return time.perf_counter() - started, cards
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure Pro Scan quorum and default scan hedging latency")
+    parser.add_argument('--scans', type=int, default=200, help='Scans per scenario (default: 200)')
+    parser.add_argument('--claude', type=parse_distribution, default=(6.0, 0.5), help='Claude median,sigma (default: 6,0.5)')
+    parser.add_argument('--openai', type=parse_distribution, default=(5.0, 0.5), help='OpenAI median,sigma (default: 5,0.5)')
+    parser.add_argument('--gemini', type=parse_distribution, default=(4.0, 0.7), help='Gemini median,sigma (default: 4,0.7)')
+    parser.add_argument('--fail', type=float, default=0.0, help='Failure rate of every provider (default: 0)')
+    parser.add_argument('--backup', default="Gemini", help='Hedge backup provider (default: Gemini)')
+    parser.add_argument('--down', help='Provider that times out on every call')
+    parser.add_argument('--down-seconds', type=float, default=30.0, help='Timeout of the --down provider (default: 30)')
+    parser.add_argument('--no-breakers', action='store_true', help='Never open circuit breakers')
+    parser.add_argument('--scale', type=float, default=0.01, help='Real seconds per simulated second (default: 0.01)')
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)  # Stub failures are expected
+    distributions = {"Claude": args.claude, "OpenAI": args.openai, "Gemini": args.gemini}
+    multi_vision.PROVIDERS.update({
+        name: stub_provider(name, median, sigma, args.fail, args.scale, seed)
+        for seed, (name, (median, sigma)) in enumerate(distributions.items())
+    })
+    if args.down:
+        multi_vision.PROVIDERS[args.down] = down_provider(args.down, args.down_seconds, args.scale)
+
+    # Breaker timings are real seconds, so they are scaled like the stubs
+    multi_vision.vision_breakers = CircuitBreakers(
+        open_seconds=BREAKER_OPEN_SECONDS * args.scale,
+        slow_seconds=BREAKER_SLOW_SECONDS * args.scale,
+        **({"min_calls": args.scans * 10} if args.no_breakers else {})
+    )
+
+    print(f"{args.scans} scans per scenario; provider medians/sigmas: "
+          + ", ".join(f"{name} {m:g}s/{s:g}" for name, (m, s) in distributions.items()))
+
+    # Pro Scan
+    all_answers = [timed(lambda: identify_cards_pro(b"", quorum=len(distributions) + 1)) for _ in range(args.scans)]
+    summarize("Pro, wait for all", all_answers, args.scale)
+    quorum = [timed(lambda: identify_cards_pro(b"", quorum=2)) for _ in range(args.scans)]
+    summarize("Pro, quorum of 2", quorum, args.scale, f"({scan_counters['quorum_exits']} early exits)")
+
+    # Default scan: warm the latency tracker up with the unhedged runs first
+    unhedged = [timed(lambda: identify_cards_hedged(b"", primary="Claude", backup="")) for _ in range(args.scans)]
+    summarize("Default, no hedging", unhedged, args.scale)
+    hedged = [timed(lambda: identify_cards_hedged(b"", primary="Claude", backup=args.backup)) for _ in range(args.scans)]
+    summarize(
+        f"Default, hedged at p{multi_vision.HEDGE_PERCENTILE * 100:g}", hedged, args.scale,
+        f"({scan_counters['hedges_fired']} hedges = {scan_counters['hedges_fired'] / args.scans:.0%} extra calls, "
+        f"{scan_counters['backup_wins']} backup wins)"
+    )
+    breakers = multi_vision.vision_breakers.stats()
+    if args.down:
+        print(f"{args.down} breaker: {breakers[args.down]['trips']} trips, "
+              f"{breakers[args.down]['rejected']} calls skipped")
+    # Give straggling stub threads time to finish before exiting
+    time.sleep(max(m * 5 for m, _ in distributions.values()) * args.scale)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,129 @@
+"""
+Provider Client Benchmark
+Per-call overhead of building a provider SDK client for every request
+versus the shared clients of provider_registry, and the app's import time
+
+Calls go to a local keep-alive HTTP server answering with canned Anthropic
+and OpenAI responses, so what is measured is client construction and
+connection setup rather than the model (TLS handshakes to the real APIs,
+which reused connections also avoid, are not included). Gemini has no
+call to fake; its configure + model construction is timed on its own.
+
+Usage (from the repository root):
+    python -m benchmarks.provider_clients --calls 200
+"""
+
+import argparse
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ANTHROPIC_RESPONSE = {
+    "id": "msg_1", "type": "message", "role": "assistant", "model": "stub",
+    "content": [{"type": "text", "text": "[]"}],
+    "stop_reason": "end_turn", "stop_sequence": None,
+    "usage": {"input_tokens": 1, "output_tokens": 1}
+}
+OPENAI_RESPONSE = {
+    "id": "chatcmpl-1", "object": "chat.completion", "created": 0, "model": "stub",
+    "choices": [{"index": 0, "finish_reason": "stop", "message": {"role": "assistant", "content": "[]"}}],
+    "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2}
+}
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    """Canned answers for /v1/messages (Anthropic) and /v1/chat/completions (OpenAI)"""
+    protocol_version = "HTTP/1.1"
+
+    def setup(self):
+        super().setup()
+        # Headers and body are written separately; don't let Nagle hold the body back
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get("Content-Length", 0)))
+        body = json.dumps(ANTHROPIC_RESPONSE if self.path.endswith("/messages") else OPENAI_RESPONSE).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def timed_calls(call, count: int) -> float:
+    """Median milliseconds of `count` calls"""
+    seconds = []
+    for _ in range(count):
+        started = time.perf_counter()
+        call()
+        seconds.append(time.perf_counter() - started)
+    return statistics.median(seconds) * 1000
+
+
+def import_seconds(runs: int) -> float:
+    """Median seconds of `import main` in a fresh interpreter"""
+    seconds = []
+    for _ in range(runs):
+        started = time.perf_counter()
+        subprocess.run([sys.executable, "-c", "import main"], check=True, capture_output=True)
+        seconds.append(time.perf_counter() - started)
+    return statistics.median(seconds)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure provider client setup overhead")
+    parser.add_argument('--calls', type=int, default=200, help='Calls per scenario (default: 200)')
+    parser.add_argument('--imports', type=int, default=5, help='Fresh-interpreter imports timed (default: 5)')
+    args = parser.parse_args()
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}"
+    os.environ.update({
+        "ANTHROPIC_API_KEY": "stub", "ANTHROPIC_BASE_URL": base_url,
+        "OPENAI_API_KEY": "stub", "OPENAI_BASE_URL": f"{base_url}/v1",
+        "GEMINI_API_KEY": "stub"
+    })
+
+    import anthropic
+    import google.generativeai as genai
+    import openai
+    from provider_registry import provider_registry, GEMINI_MODEL
+
+    message = {"model": "stub", "max_tokens": 10, "messages": [{"role": "user", "content": "hi"}]}
+    chat = {"model": "stub", "max_tokens": 10, "messages": [{"role": "user", "content": "hi"}]}
+
+    def gemini_per_call():
+        genai.configure(api_key="stub")
+        genai.GenerativeModel(GEMINI_MODEL)
+
+    scenarios = [
+        ("Anthropic", lambda: anthropic.Anthropic().messages.create(**message),
+         lambda: provider_registry.anthropic().messages.create(**message)),
+        ("OpenAI", lambda: openai.OpenAI().chat.completions.create(**chat),
+         lambda: provider_registry.openai().chat.completions.create(**chat)),
+        ("Gemini (setup only)", gemini_per_call, provider_registry.gemini),
+    ]
+    print(f"Median per call over {args.calls} calls to a local stub server:")
+    for label, per_call, shared in scenarios:
+        per_call()
+        shared()  # First use creates the shared client
+        print(f"  {label:<20} new client {timed_calls(per_call, args.calls):7.3f} ms   "
+              f"shared client {timed_calls(shared, args.calls):7.3f} ms")
+    provider_registry.close()
+    server.shutdown()
+
+    print(f"import main (fresh interpreter, median of {args.imports}): {import_seconds(args.imports):.2f}s")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,134 @@
+"""
+Rate Limiter Stress Test
+Fires concurrent interactive and background lookups at a local stub that
+enforces Scryfall's limit (429 + Retry-After when exceeded), and compares the
+shared token bucket against the old unsynchronized last-request-time delay
+
+Usage (from the repository root):
+    python -m benchmarks.rate_limit --interactive 40 --background 40 --limit 10
+"""
+
+import argparse
+import asyncio
+import json
+import logging
+import statistics
+import time
+from collections import deque
+from typing import List
+
+import scryfall_integration
+from benchmarks.stub_server import StubServer
+from card_store import CardStore
+from rate_limiter import TokenBucket, background_priority
+from response_cache import ResponseCache
+
+REQUEST_DELAY = 0.1  # The old fixed delay between requests
+
+
+class LimitEnforcingStub:
+    """Stub Scryfall that allows `limit` requests per sliding second"""
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        self.window = deque()
+        self.rejected = 0
+
+    async def respond(self, method: str, path: str, body: bytes):
+        now = time.monotonic()
+        while self.window and now - self.window[0] > 1.0:
+            self.window.popleft()
+
+        if len(self.window) >= self.limit:
+            self.rejected += 1
+            return 429, {"Retry-After": "1", "Content-Type": "application/json"}, b'{"object": "error"}'
+
+        self.window.append(now)
+        number = path.rstrip("/").split("/")[-1].replace("id-", "")
+        card = {"object": "card", "id": f"id-{number}", "name": f"Card {number}", "set": "tst", "collector_number": number}
+        return 200, {"Content-Type": "application/json"}, json.dumps(card).encode()
+
+
+class LegacyLimiter:
+    """The old ScryfallClient._rate_limit: reads and writes a timestamp without a lock"""
+
+    def __init__(self):
+        self.last_request_time = 0
+
+    async def acquire(self, priority=None) -> None:
+        current_time = asyncio.get_event_loop().time()
+        time_since_last = current_time - self.last_request_time
+        if time_since_last < REQUEST_DELAY:
+            await asyncio.sleep(REQUEST_DELAY - time_since_last)
+        self.last_request_time = asyncio.get_event_loop().time()
+
+    def pause(self, seconds: float) -> None:
+        pass
+
+    def stats(self):
+        return {}
+
+
+async def timed_lookup(number: int, latencies: List[float]) -> None:
+    started = time.perf_counter()
+    try:
+        await scryfall_integration.get_card_details(f"id-{number}")
+    except Exception:
+        pass
+    latencies.append(time.perf_counter() - started)
+
+
+async def run_background(count: int, offset: int, latencies: List[float]) -> None:
+    with background_priority():
+        await asyncio.gather(*(timed_lookup(offset + i, latencies) for i in range(count)))
+
+
+async def run(name: str, limiter, interactive: int, background: int, limit: int) -> None:
+    stub = LimitEnforcingStub(limit)
+    server = await StubServer(stub.respond).start()
+
+    scryfall_integration.SCRYFALL_API_BASE = server.base_url
+    scryfall_integration.scryfall_rate_limiter = limiter
+    scryfall_integration._client = scryfall_integration.ScryfallClient()
+    # Every lookup must reach the stub
+    scryfall_integration.card_store = CardStore(db_path="/nonexistent/cards.sqlite3")
+    scryfall_integration.response_cache = ResponseCache(enabled=False)
+
+    interactive_latencies: List[float] = []
+    background_latencies: List[float] = []
+    started = time.perf_counter()
+
+    # Background bulk traffic starts first; interactive lookups arrive just after
+    background_task = asyncio.create_task(run_background(background, 10000, background_latencies))
+    await asyncio.sleep(0.05)
+    await asyncio.gather(*(timed_lookup(i, interactive_latencies) for i in range(interactive)))
+    await background_task
+
+    elapsed = time.perf_counter() - started
+    stats = scryfall_integration.get_request_stats()
+    await server.stop()
+    await scryfall_integration.close_http_client()
+
+    print(f"{name}:")
+    print(f"  total {elapsed:.2f}s  stub accepted {server.requests - stub.rejected}  rejected (429) {stub.rejected}  retries {stats['retries']}")
+    print(f"  interactive p50 {statistics.median(interactive_latencies):.2f}s  max {max(interactive_latencies):.2f}s")
+    print(f"  background  p50 {statistics.median(background_latencies):.2f}s  max {max(background_latencies):.2f}s")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Stress the Scryfall rate limiter against a limit-enforcing stub")
+    parser.add_argument('--interactive', type=int, default=40, help='Concurrent interactive lookups (default: 40)')
+    parser.add_argument('--background', type=int, default=40, help='Concurrent background lookups (default: 40)')
+    parser.add_argument('--limit', type=int, default=10, help='Requests per second the stub accepts (default: 10)')
+    args = parser.parse_args()
+
+    # Retry/429 logging would drown the results
+    logging.disable(logging.ERROR)
+
+    asyncio.run(run("legacy delay", LegacyLimiter(), args.interactive, args.background, args.limit))
+    asyncio.run(run("token bucket", TokenBucket(rate=args.limit * 0.8, burst=max(1, args.limit // 5)),
+                    args.interactive, args.background, args.limit))
+
+
+if __name__ == "__main__":
+    main()
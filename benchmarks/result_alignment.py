@@ -0,0 +1,116 @@
+"""
+Pro Scan Alignment Benchmark
+How many cards the Pro Scan vote gets right, and with what confidence,
+when providers list the cards in different orders
+
+Synthetic scans of a grid of cards are "read" by three simulated providers
+that sometimes list the grid column by column instead of row by row, swap
+neighbours, misread or miss a card. The vote is run with cards aligned by
+list index (the old behaviour) and by result_alignment.align_results().
+Medium-confidence cards are the ones the scan pipeline sends to the
+slower printings and image comparison path.
+
+Usage (from the repository root):
+    python -m benchmarks.result_alignment --scans 500
+    python -m benchmarks.result_alignment --boxes   # providers return bounding boxes
+"""
+
+import argparse
+import logging
+import random
+from typing import Dict, List
+
+import multi_vision
+from result_alignment import align_results
+
+NAMES = [
+    "Lightning Bolt", "Counterspell", "Llanowar Elves", "Dark Ritual", "Swords to Plowshares",
+    "Giant Growth", "Serra Angel", "Shivan Dragon", "Wrath of God", "Birds of Paradise",
+    "Sol Ring", "Brainstorm", "Shock", "Duress", "Opt", "Ponder", "Preordain", "Thoughtseize",
+    "Lightning Helix", "Lightning Strike", "Counterbalance", "Dark Confidant", "Serra's Sanctum",
+]
+
+
+def by_position(provider_results: Dict[str, List[Dict]]) -> List[Dict[str, Dict]]:
+    """Groups by list index, as the vote used to do"""
+    longest = max((len(cards) for cards in provider_results.values()), default=0)
+    return [
+        {provider: cards[i] for provider, cards in provider_results.items() if i < len(cards) and cards[i]}
+        for i in range(longest)
+    ]
+
+
+def misread(name: str, rng: random.Random) -> str:
+    """A plausible misreading: a typo, or another card altogether"""
+    if rng.random() < 0.5:
+        i = rng.randrange(len(name))
+        return name[:i] + name[i + 1:]
+    return rng.choice(NAMES)
+
+
+def provider_answer(grid: List[List[str]], rng: random.Random, args) -> List[Dict]:
+    """One provider's reading of a grid of cards"""
+    rows, columns = len(grid), len(grid[0])
+    cells = [(r, c) for r in range(rows) for c in range(columns) if grid[r][c]]
+    if rng.random() < args.column_order:
+        cells.sort(key=lambda cell: (cell[1], cell[0]))
+    if len(cells) > 1 and rng.random() < args.swap:
+        i = rng.randrange(len(cells) - 1)
+        cells[i], cells[i + 1] = cells[i + 1], cells[i]
+
+    cards = []
+    for r, c in cells:
+        if rng.random() < args.miss:
+            continue
+        name = grid[r][c] if rng.random() >= args.misread else misread(grid[r][c], rng)
+        card = {"name": name, "set": None, "collector_number": None}
+        if args.boxes:
+            jitter = lambda: rng.uniform(-0.03, 0.03)
+            card["bbox"] = [c / columns + jitter(), r / rows + jitter(), (c + 1) / columns + jitter(), (r + 1) / rows + jitter()]
+        cards.append(card)
+    return cards
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare index-based and aligned Pro Scan voting")
+    parser.add_argument('--scans', type=int, default=500, help='Scans (default: 500)')
+    parser.add_argument('--column-order', type=float, default=0.2, help='Chance a provider reads column by column (default: 0.2)')
+    parser.add_argument('--swap', type=float, default=0.15, help='Chance a provider swaps two neighbours (default: 0.15)')
+    parser.add_argument('--miss', type=float, default=0.03, help='Chance a provider misses a card (default: 0.03)')
+    parser.add_argument('--misread', type=float, default=0.05, help='Chance a provider misreads a card (default: 0.05)')
+    parser.add_argument('--boxes', action='store_true', help='Providers return bounding boxes')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.CRITICAL)
+    rng = random.Random(args.seed)
+    scans = []
+    for _ in range(args.scans):
+        rows, columns = rng.choice([(1, 1), (1, 2), (2, 2), (2, 3), (3, 3)])
+        grid = [[rng.choice(NAMES) for _ in range(columns)] for _ in range(rows)]
+        answers = {name: provider_answer(grid, rng, args) for name in ("Claude", "OpenAI", "Gemini")}
+        scans.append(([name for row in grid for name in row], answers))
+
+    cards = sum(len(truth) for truth, _ in scans)
+    print(f"{args.scans} scans, {cards} cards{' (with bounding boxes)' if args.boxes else ''}")
+    for label, aligner in (("By list index", by_position), ("Aligned", align_results)):
+        multi_vision.align_results = aligner
+        correct_high = medium = extra = missing = 0
+        for truth, answers in scans:
+            validated = multi_vision.vote_on_results(answers)
+            found = [card['name'] for card in validated]
+            remaining = list(truth)
+            for card in validated:
+                if card['confidence'] != 'high':
+                    medium += 1
+                if card['name'] in remaining:
+                    remaining.remove(card['name'])
+                    correct_high += card['confidence'] == 'high'
+            missing += len(remaining)
+            extra += max(0, len(found) - len(truth))
+        print(f"{label:<14} correct + high confidence {correct_high / cards:6.1%}   medium (fallback) {medium:4d}   "
+              f"missing {missing:3d}   extra cards {extra:3d}")
+
+
+if __name__ == "__main__":
+    main()
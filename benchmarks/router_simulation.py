@@ -0,0 +1,154 @@
+"""
+Provider Routing Simulation
+Replays per-request provider outcomes through fixed routing and the
+adaptive ProviderRouter
+
+Each request of the trace says, for every provider, how long it took,
+whether it succeeded and how much of its answer the vote kept. A share of
+requests are Pro Scans (every provider asked, feeding agreement stats);
+the rest are default scans, answered by the routed provider with failover
+to the next on errors. Without --trace a synthetic trace with regime shifts
+is generated: Claude slows down for a stretch, OpenAI has an error burst,
+and Gemini is fast but agrees less often throughout.
+
+Usage (from the repository root):
+    python -m benchmarks.router_simulation --requests 4000
+    python -m benchmarks.router_simulation --trace provider_trace.jsonl   # PROVIDER_TRACE_FILE output
+"""
+
+import argparse
+import json
+import random
+import statistics
+from typing import Dict, Iterator, List
+
+from multi_vision import PROVIDERS, LatencyTracker, ProviderRouter, ROUTER_EXPLORATION, ROUTER_LATENCY_COST
+
+FIXED_ORDER = ["Claude", "OpenAI", "Gemini"]
+
+
+def synthetic_trace(requests: int, seed: int) -> Iterator[Dict[str, Dict]]:
+    """Per-request outcomes of every provider, with regime shifts"""
+    rng = random.Random(seed)
+    for i in range(requests):
+        claude_median = 12.0 if requests // 4 <= i < requests // 2 else 5.0
+        openai_errors = 0.4 if requests * 5 // 8 <= i < requests * 3 // 4 else 0.02
+        regimes = {
+            "Claude": (claude_median, 0.4, 0.02, 0.97),
+            "OpenAI": (6.0, 0.4, openai_errors, 0.95),
+            "Gemini": (3.5, 0.5, 0.02, 0.80),
+        }
+        yield {
+            name: {
+                "seconds": median * rng.lognormvariate(0, sigma),
+                "ok": rng.random() >= errors,
+                "agreement": 1.0 if rng.random() < agrees else 0.5
+            }
+            for name, (median, sigma, errors, agrees) in regimes.items()
+        }
+
+
+def load_trace(path: str) -> Iterator[Dict[str, Dict]]:
+    """Requests from a PROVIDER_TRACE_FILE; providers cut off by the quorum count as failed"""
+    with open(path) as f:
+        for line in f:
+            providers = json.loads(line)["providers"]
+            slowest = max((p["seconds"] for p in providers.values()), default=0.0)
+            yield {
+                name: {
+                    "seconds": providers.get(name, {}).get("seconds", slowest),
+                    "ok": providers.get(name, {}).get("ok", False),
+                    "agreement": providers.get(name, {}).get("agreement", 1.0)
+                }
+                for name in PROVIDERS
+            }
+
+
+class Strategy:
+    """A routing policy and the default-scan outcomes it produced"""
+
+    def __init__(self, label: str, router: ProviderRouter = None):
+        self.label = label
+        self.router = router
+        self.latencies: List[float] = []
+        self.agreement: List[float] = []
+        self.failed = 0
+        self.picks: Dict[str, int] = {}
+
+    def observe(self, outcomes: Dict[str, Dict], agreement: bool) -> None:
+        """Feed a call's outcome to the router (as _timed_call and Pro Scan do)"""
+        if self.router is None:
+            return
+        for name, outcome in outcomes.items():
+            self.router.record_outcome(name, outcome["ok"])
+            if outcome["ok"]:
+                self.router.latency.record(name, outcome["seconds"])
+                if agreement:
+                    self.router.record_agreement(name, outcome["agreement"])
+
+    def scan(self, request: Dict[str, Dict]) -> None:
+        """A default scan: ask providers in order until one succeeds"""
+        order = self.router.select() if self.router else FIXED_ORDER
+        self.picks[order[0]] = self.picks.get(order[0], 0) + 1
+        elapsed = 0.0
+        for name in order:
+            outcome = request[name]
+            elapsed += outcome["seconds"]
+            self.observe({name: outcome}, agreement=False)
+            if outcome["ok"]:
+                self.latencies.append(elapsed)
+                self.agreement.append(outcome["agreement"])
+                return
+        self.failed += 1
+
+    def summary(self) -> str:
+        ordered = sorted(self.latencies)
+        pick = lambda fraction: ordered[min(len(ordered) - 1, int(fraction * len(ordered)))]
+        scans = len(self.latencies) + self.failed
+        picks = ", ".join(f"{name} {count / scans:.0%}" for name, count in sorted(self.picks.items()))
+        return (f"{self.label:<22} p50 {pick(0.5):5.1f}s  p95 {pick(0.95):5.1f}s  "
+                f"agreement {statistics.mean(self.agreement):.3f}  failed {self.failed:3d}  first: {picks}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare fixed and adaptive provider routing on a trace")
+    parser.add_argument('--trace', help='PROVIDER_TRACE_FILE to replay (default: synthetic)')
+    parser.add_argument('--requests', type=int, default=4000, help='Synthetic requests (default: 4000)')
+    parser.add_argument('--pro-share', type=float, default=0.1, help='Share of requests that are Pro Scans (default: 0.1)')
+    parser.add_argument('--exploration', type=float, default=ROUTER_EXPLORATION,
+                        help=f'Router exploration rate (default: {ROUTER_EXPLORATION})')
+    parser.add_argument('--latency-cost', type=float, default=ROUTER_LATENCY_COST,
+                        help=f'Router score lost per second of latency (default: {ROUTER_LATENCY_COST})')
+    parser.add_argument('--seed', type=int, default=1)
+    args = parser.parse_args()
+
+    trace = load_trace(args.trace) if args.trace else synthetic_trace(args.requests, args.seed)
+    strategies = [
+        Strategy("Fixed (Claude first)"),
+        Strategy("Adaptive", ProviderRouter(
+            latency=LatencyTracker(), exploration=args.exploration, latency_cost=args.latency_cost,
+            enabled=True, rng=random.Random(args.seed)
+        )),
+    ]
+
+    rng = random.Random(args.seed)
+    pro_scans = 0
+    for request in trace:
+        if rng.random() < args.pro_share:
+            # Every provider answers; with two or more answers there is a vote
+            pro_scans += 1
+            voted = sum(outcome["ok"] for outcome in request.values()) >= 2
+            for strategy in strategies:
+                strategy.observe(request, agreement=voted)
+        else:
+            for strategy in strategies:
+                strategy.scan(request)
+
+    print(f"{pro_scans} Pro Scans, {len(strategies[0].latencies) + strategies[0].failed} default scans "
+          f"({'trace ' + args.trace if args.trace else 'synthetic trace'}, exploration {args.exploration:g})")
+    for strategy in strategies:
+        print(strategy.summary())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,145 @@
+"""
+Set Symbol Accuracy Benchmark
+Top-1/top-2 set accuracy and per-card latency of the set symbol index
+
+Synthetic mode (default) renders sets that share a symbol per set, builds
+templates from some printings of each set and photographs held-out
+printings (different art and frame) to identify. With --store, templates
+are built from cards in the image store instead and held-out stored
+printings are photographed; the same card's other printings are the
+candidates, as in a real edition lookup.
+
+Usage (from the repository root):
+    python -m benchmarks.set_symbol_accuracy --trials 100
+    python -m benchmarks.set_symbol_accuracy --store --trials 200
+"""
+
+import argparse
+import asyncio
+import random
+import tempfile
+import time
+from collections import defaultdict
+
+import cv2
+import numpy as np
+
+from benchmarks.edition_matching import render_card, photograph
+from image_comparison import user_card_crops
+from set_symbol_index import (
+    SetSymbolIndex, SYMBOL_BOX, SYMBOL_KEEP_MARGIN, SYMBOL_MIN_SCORE, is_template_source, symbol_area, template_key
+)
+
+
+def identify(index: SetSymbolIndex, crops: list, keys) -> dict:
+    """Template scores on the crop (and orientation) that matches best"""
+    best = {}
+    for crop in crops:
+        scores = index.score_keys(crop, keys)
+        if scores and max(scores.values()) > max(best.values(), default=-1.0):
+            best = scores
+    return best
+
+
+def synthetic_trials(index: SetSymbolIndex, trials: int, sets: int, samples: int):
+    """(photo, candidate keys, true key) for rendered sets"""
+    keys = [f"s{i}|rare|2015" for i in range(sets)]
+    index.build({
+        key: [symbol_area(render_card(10_000 + i * 100 + j, j % 3, 77 + i, j + 1), SYMBOL_BOX) for j in range(samples)]
+        for i, key in enumerate(keys)
+    })
+    rng = random.Random(1)
+    for trial in range(trials):
+        candidates = rng.sample(range(sets), min(sets, 12))
+        target = rng.choice(candidates)
+        card = render_card(50_000 + trial, rng.randrange(3), 77 + target, rng.randrange(1, 280))
+        yield photograph([card], trial), [keys[i] for i in candidates], keys[target]
+
+
+def store_trials(index: SetSymbolIndex, trials: int, samples: int):
+    """(photo, candidate keys, true key) for stored printings of multi-printing cards"""
+    from card_store import card_store
+    from image_store import image_store
+
+    by_key, by_oracle = defaultdict(list), defaultdict(list)
+    for card in card_store.iter_cards():
+        if is_template_source(card):
+            by_key[template_key(card)].append(card)
+            by_oracle[card.get('oracle_id')].append(card)
+
+    async def load(cards):
+        images = await asyncio.gather(*(image_store.get(card) for card in cards))
+        return {card['id']: data for card, data in zip(cards, images) if data}
+
+    # Hold out one printing from each of a sample of multi-printing cards
+    rng = random.Random(1)
+    reprinted = [cards for cards in by_oracle.values() if len({template_key(c) for c in cards}) > 1]
+    held_out = [rng.choice(cards) for cards in rng.sample(reprinted, min(trials, len(reprinted)))]
+    held_ids = {card['id'] for card in held_out}
+
+    sources = {key: [c for c in cards if c['id'] not in held_ids][:samples] for key, cards in by_key.items()}
+    images = asyncio.run(load([c for cards in sources.values() for c in cards] + held_out))
+    decode = lambda data: cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR)
+    index.build({
+        key: [symbol_area(decode(images[c['id']]), SYMBOL_BOX) for c in cards if c['id'] in images]
+        for key, cards in sources.items()
+    })
+
+    for trial, card in enumerate(held_out):
+        if card['id'] in images:
+            keys = {template_key(c) for c in by_oracle[card.get('oracle_id')]}
+            yield photograph([decode(images[card['id']])], trial), keys, template_key(card)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measure set symbol identification")
+    parser.add_argument('--trials', type=int, default=100, help='Photos to identify (default: 100)')
+    parser.add_argument('--sets', type=int, default=40, help='Synthetic sets (default: 40)')
+    parser.add_argument('--samples', type=int, default=3, help='Images per template (default: 3)')
+    parser.add_argument('--store', action='store_true', help='Use cards from the card and image stores')
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as directory:
+        index = SetSymbolIndex(f"{directory}/set_symbols.npz")
+        if args.store:
+            trials = store_trials(index, args.trials, args.samples)
+        else:
+            trials = synthetic_trials(index, args.trials, args.sets, args.samples)
+
+        count = top1 = top2 = narrowed = narrowed_wrong = 0
+        seconds, per_crop = [], []
+        for photo, keys, truth in trials:
+            crops = [crop for orientations in user_card_crops(photo) for crop in orientations]
+            started = time.perf_counter()
+            scores = identify(index, crops, keys)
+            seconds.append(time.perf_counter() - started)
+            per_crop.append(seconds[-1] / max(1, len(crops)))
+
+            ranked = sorted(scores, key=scores.get, reverse=True)
+            sets = list(dict.fromkeys(key.split("|", 1)[0] for key in ranked))
+            truth_set = truth.split("|", 1)[0]
+            count += 1
+            top1 += sets[:1] == [truth_set]
+            top2 += truth_set in sets[:2]
+
+            # What SetSymbolIndex.narrow() would keep
+            best = max(scores.values(), default=0.0)
+            if best >= SYMBOL_MIN_SCORE:
+                narrowed += 1
+                narrowed_wrong += scores.get(truth, -1.0) < best - SYMBOL_KEEP_MARGIN
+
+    if not count:
+        print("No trials (is the card store built?)")
+        return
+    print(f"Photos:          {count}")
+    print(f"Top-1 set:       {top1}/{count} ({top1 / count:.1%})")
+    print(f"Top-2 sets:      {top2}/{count} ({top2 / count:.1%})")
+    print(f"Narrowed:        {narrowed}/{count}, true set dropped in {narrowed_wrong} "
+          f"(score >= {SYMBOL_MIN_SCORE}, keeping sets within {SYMBOL_KEEP_MARGIN})")
+    print(f"Time per card:   median {np.median(seconds) * 1000:.1f} ms, max {max(seconds) * 1000:.1f} ms "
+          f"(every crop and orientation; card detection not included)")
+    print(f"Time per crop:   median {np.median(per_crop) * 1000:.2f} ms")
+
+
+if __name__ == "__main__":
+    main()
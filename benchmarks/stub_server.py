@@ -0,0 +1,71 @@
+"""
+Stub HTTP Server
+Minimal local HTTP/1.1 keep-alive server used by the benchmarks in place of
+api.scryfall.com
+"""
+
+import asyncio
+from typing import Awaitable, Callable, Dict, Tuple
+
+# respond(method, path, body) -> (status, headers, body)
+Responder = Callable[[str, str, bytes], Awaitable[Tuple[int, Dict[str, str], bytes]]]
+
+REASONS = {200: "OK", 404: "Not Found", 429: "Too Many Requests", 503: "Service Unavailable"}
+
+
+class StubServer:
+    """Local HTTP server answering every request through a responder coroutine"""
+
+    def __init__(self, respond: Responder, connection_delay: float = 0.0):
+        self.respond = respond
+        self.connection_delay = connection_delay
+        self.connections = 0
+        self.requests = 0
+        self._server = None
+
+    @property
+    def base_url(self) -> str:
+        port = self._server.sockets[0].getsockname()[1]
+        return f"http://127.0.0.1:{port}"
+
+    async def start(self) -> "StubServer":
+        self._server = await asyncio.start_server(self._handle, "127.0.0.1", 0)
+        return self
+
+    async def stop(self) -> None:
+        self._server.close()
+        await self._server.wait_closed()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter) -> None:
+        self.connections += 1
+        # Simulated connection setup cost (TCP + TLS handshake)
+        if self.connection_delay:
+            await asyncio.sleep(self.connection_delay)
+
+        try:
+            while True:
+                head = await reader.readuntil(b"\r\n\r\n")
+                lines = head.decode("latin-1").split("\r\n")
+                method, path, _ = lines[0].split(" ", 2)
+                headers = {}
+                for line in lines[1:]:
+                    if ":" in line:
+                        name, value = line.split(":", 1)
+                        headers[name.strip().lower()] = value.strip()
+                body = await reader.readexactly(int(headers.get("content-length", "0")))
+
+                self.requests += 1
+                status, response_headers, response_body = await self.respond(method, path, body)
+
+                header_lines = "".join(f"{name}: {value}\r\n" for name, value in response_headers.items())
+                writer.write(
+                    f"HTTP/1.1 {status} {REASONS.get(status, 'Status')}\r\n"
+                    f"Content-Length: {len(response_body)}\r\n"
+                    f"Connection: keep-alive\r\n"
+                    f"{header_lines}\r\n".encode("latin-1") + response_body
+                )
+                await writer.drain()
+        except (asyncio.IncompleteReadError, ConnectionResetError):
+            pass
+        finally:
+            writer.close()
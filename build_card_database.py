@@ -3,14 +3,13 @@ Build Card Hash Database
 Downloads all Magic cards from Scryfall and creates perceptual hashes
 
 This script should be run ONCE to build the initial database,
-and periodically to update with new card releases.
+and periodically with --update to pick up new card releases.
 
 WARNING: This takes a long time (several hours) and downloads ~100MB of data
 plus all card images. Make sure you have good internet and disk space.
 """
 
 import asyncio
-import httpx
 from pathlib import Path
 import logging
 from tqdm import tqdm
@@ -18,9 +17,14 @@ import imagehash
 from PIL import Image
 from io import BytesIO
 import sys
+from typing import Any, Dict, Iterable, List, Optional
 
-from card_matching import save_card_database
-from scryfall_integration import download_all_cards
+from card_matching import load_card_database, save_card_database
+from card_store import card_store, image_fingerprint
+from card_sync import sync_card_data
+from image_store import image_store, IMAGE_VARIANT, chunked, is_hashable
+from scryfall_integration import close_http_client
+from rate_limiter import background_priority
 
 logging.basicConfig(
     level=logging.INFO,
@@ -28,28 +32,106 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Cards whose images are fetched concurrently before hashing
+HASH_CHUNK_SIZE = 200
 
-async def download_card_image(url: str, session: httpx.AsyncClient) -> Image.Image:
+
+async def load_card_image(card: Dict[str, Any]) -> Image.Image:
     """
-    Download a card image from URL
-    
+    Load a card's image (downloaded once, then read from the image store)
+
     Args:
-        url: Image URL
-        session: HTTP session
-        
+        card: Scryfall card object
+
     Returns:
         PIL Image
     """
-    try:
-        response = await session.get(url, timeout=30.0)
-        response.raise_for_status()
-        
-        img = Image.open(BytesIO(response.content))
-        return img
-        
-    except Exception as e:
-        logger.error(f"Error downloading image from {url}: {e}")
-        raise
+    data = await image_store.get(card, IMAGE_VARIANT)
+    if data is None:
+        raise ValueError(f"No image available for {card.get('name', card['id'])}")
+    return Image.open(BytesIO(data))
+
+
+async def hash_card(card: Dict[str, Any], hash_size: int = 16) -> Dict[str, Any]:
+    """
+    Load a card's image and build its hash database entry
+
+    Args:
+        card: Scryfall card object
+        hash_size: Size of perceptual hash
+
+    Returns:
+        Database entry (hash, image fingerprint and display fields)
+    """
+    img = await load_card_image(card)
+
+    # Create perceptual hash
+    card_hash = imagehash.phash(img, hash_size=hash_size)
+
+    return {
+        'hash': card_hash,
+        'image_fingerprint': image_fingerprint(card),
+        'name': card['name'],
+        'set': card.get('set'),
+        'set_name': card.get('set_name'),
+        'collector_number': card.get('collector_number'),
+        'rarity': card.get('rarity')
+    }
+
+
+async def hash_cards(
+    database: Dict[str, Dict[str, Any]],
+    cards: Iterable[Dict[str, Any]],
+    hash_size: int = 16,
+    total: Optional[int] = None
+) -> List[str]:
+    """
+    Hash cards into the database, saving a checkpoint every 1000 cards
+
+    Args:
+        database: Hash database to add entries to
+        cards: Cards to hash
+        hash_size: Size of perceptual hash
+        total: Number of cards, for the progress bar
+
+    Returns:
+        IDs of cards that failed
+    """
+    failed_cards = []
+    processed = 0
+    progress = tqdm(desc="Processing cards", total=total)
+
+    # Images for the next chunk download concurrently; hashing then reads
+    # them from the image store (and a rebuild reads them all from disk)
+    for chunk in chunked(cards, HASH_CHUNK_SIZE):
+        await image_store.prefetch(chunk, IMAGE_VARIANT)
+        for card in chunk:
+            try:
+                database[card['id']] = await hash_card(card, hash_size)
+            except Exception as e:
+                logger.error(f"Error processing card {card.get('name', 'unknown')}: {e}")
+                failed_cards.append(card['id'])
+
+            processed += 1
+            progress.update(1)
+
+            # Periodic save (every 1000 cards)
+            if processed % 1000 == 0:
+                save_card_database(database)
+                logger.info(f"Saved checkpoint at {processed} cards")
+
+    progress.close()
+    return failed_cards
+
+
+def log_failures(failed_cards: List[str]) -> None:
+    """Log how many cards failed and the first few IDs"""
+    logger.info(f"Failed cards: {len(failed_cards)}")
+
+    if failed_cards:
+        logger.info("Failed card IDs (first 10):")
+        for card_id in failed_cards[:10]:
+            logger.info(f"  {card_id}")
 
 
 async def build_database(
@@ -67,97 +149,36 @@ async def build_database(
     """
     logger.info("Starting card database build...")
     
-    # Step 1: Download all card data from Scryfall
-    logger.info("Downloading card data from Scryfall...")
-    all_cards = await download_all_cards()
-    
-    logger.info(f"Downloaded {len(all_cards)} cards")
-    
-    # Step 2: Filter cards
-    cards_to_process = []
-    
-    for card in all_cards:
-        # Skip tokens if requested
-        if skip_tokens and card.get('layout') == 'token':
-            continue
-        
-        # Skip cards without images
-        if 'image_uris' not in card and 'card_faces' not in card:
-            continue
-        
-        cards_to_process.append(card)
-    
-    logger.info(f"Will process {len(cards_to_process)} cards")
-    
-    if limit:
-        cards_to_process = cards_to_process[:limit]
-        logger.info(f"Limited to {limit} cards for testing")
-    
-    # Step 3: Download images and create hashes
-    database = {}
-    failed_cards = []
-    
-    async with httpx.AsyncClient() as session:
-        for i, card in enumerate(tqdm(cards_to_process, desc="Processing cards")):
-            try:
-                scryfall_id = card['id']
-                card_name = card['name']
-                
-                # Get image URL
-                if 'image_uris' in card:
-                    # Single-faced card
-                    image_url = card['image_uris']['normal']
-                elif 'card_faces' in card and len(card['card_faces']) > 0:
-                    # Multi-faced card - use front face
-                    if 'image_uris' in card['card_faces'][0]:
-                        image_url = card['card_faces'][0]['image_uris']['normal']
-                    else:
-                        logger.warning(f"No image for {card_name}")
-                        continue
-                else:
-                    logger.warning(f"No image URL for {card_name}")
-                    continue
-                
-                # Download image
-                img = await download_card_image(image_url, session)
-                
-                # Create perceptual hash
-                card_hash = imagehash.phash(img, hash_size=hash_size)
-                
-                # Store in database
-                database[scryfall_id] = {
-                    'hash': card_hash,
-                    'name': card_name,
-                    'set': card.get('set'),
-                    'set_name': card.get('set_name'),
-                    'collector_number': card.get('collector_number'),
-                    'rarity': card.get('rarity')
-                }
-                
-                # Periodic save (every 1000 cards)
-                if (i + 1) % 1000 == 0:
-                    save_card_database(database)
-                    logger.info(f"Saved checkpoint at {i+1} cards")
-                
-                # Rate limiting
-                await asyncio.sleep(0.1)
-                
-            except Exception as e:
-                logger.error(f"Error processing card {card.get('name', 'unknown')}: {e}")
-                failed_cards.append(card['id'])
-                continue
+    try:
+        # Step 1: Bring the local card store up to date (streams the bulk data)
+        logger.info("Syncing card data from Scryfall...")
+        await sync_card_data()
+
+        # Step 2: Filter cards (read one at a time, never all in memory)
+        def cards_to_process():
+            selected = 0
+            for card in card_store.iter_cards():
+                if limit and selected >= limit:
+                    return
+                if is_hashable(card, skip_tokens):
+                    selected += 1
+                    yield card
+
+        if limit:
+            logger.info(f"Limited to {limit} cards for testing")
+
+        # Step 3: Download images and create hashes
+        database = {}
+        failed_cards = await hash_cards(database, cards_to_process(), hash_size, total=limit)
+    finally:
+        await close_http_client()
     
     # Final save
     save_card_database(database)
     
     logger.info(f"Database build complete!")
     logger.info(f"Successfully processed: {len(database)} cards")
-    logger.info(f"Failed cards: {len(failed_cards)}")
-    
-    if failed_cards:
-        logger.info("Failed card IDs (first 10):")
-        for card_id in failed_cards[:10]:
-            logger.info(f"  {card_id}")
+    log_failures(failed_cards)
 
 
 async def build_test_database(num_cards: int = 100):
@@ -171,13 +192,59 @@ async def build_test_database(num_cards: int = 100):
     await build_database(limit=num_cards)
 
 
-async def update_database():
+async def update_database(hash_size: int = 16, skip_tokens: bool = True, force: bool = False):
     """
     Update existing database with new cards
     This is faster than rebuilding from scratch
+
+    The card store is delta-synced first, then only cards that are new,
+    have a new image, or were removed touch the hash database. Entries are
+    matched to cards by image fingerprint, so cards synced earlier without
+    a hash update are caught up too.
+
+    Args:
+        hash_size: Size of perceptual hash
+        skip_tokens: Whether to skip token cards
+        force: Re-download and diff even if Scryfall reports no update
     """
-    logger.info("Database update not yet implemented")
-    logger.info("Please rebuild the full database")
+    try:
+        manifest = await sync_card_data(force=force)
+        image_changed = set(manifest['image_changed'])
+
+        database = load_card_database()
+        stored_ids = set()
+        to_hash = []
+
+        for card in card_store.iter_cards():
+            stored_ids.add(card['id'])
+            if not is_hashable(card, skip_tokens):
+                continue
+
+            entry = database.get(card['id'])
+            fingerprint = image_fingerprint(card)
+            if entry is None:
+                to_hash.append(card['id'])
+            elif entry.get('image_fingerprint') != fingerprint:
+                if 'image_fingerprint' not in entry and card['id'] not in image_changed:
+                    # Entry predates fingerprints; its image is current
+                    entry['image_fingerprint'] = fingerprint
+                else:
+                    to_hash.append(card['id'])
+
+        removed = [scryfall_id for scryfall_id in database if scryfall_id not in stored_ids]
+        for scryfall_id in removed:
+            del database[scryfall_id]
+
+        logger.info(f"Hash update: {len(to_hash)} cards to hash, {len(removed)} removed")
+        cards = (card_store.get_by_id(scryfall_id) for scryfall_id in to_hash)
+        failed_cards = await hash_cards(database, cards, hash_size, total=len(to_hash))
+    finally:
+        await close_http_client()
+
+    save_card_database(database)
+
+    logger.info(f"Database update complete! {len(database)} cards")
+    log_failures(failed_cards)
 
 
 def main():
@@ -206,12 +273,31 @@ def main():
         action='store_true',
         help='Include token cards'
     )
+    parser.add_argument(
+        '--update',
+        action='store_true',
+        help='Sync changes since the last run instead of rebuilding'
+    )
+    parser.add_argument(
+        '--force',
+        action='store_true',
+        help='With --update: re-download and diff even if Scryfall reports no update'
+    )
     
     args = parser.parse_args()
     
-    if args.test:
+    if args.update:
+        logger.info("Updating database...")
+        with background_priority():
+            asyncio.run(update_database(
+                hash_size=args.hash_size,
+                skip_tokens=not args.include_tokens,
+                force=args.force
+            ))
+    elif args.test:
         logger.info("Building TEST database...")
-        asyncio.run(build_test_database())
+        with background_priority():
+            asyncio.run(build_test_database())
     else:
         logger.info("Building FULL database...")
         logger.warning("This will take several hours and download many GB of data!")
@@ -221,11 +307,12 @@ def main():
             logger.info("Cancelled")
             sys.exit(0)
         
-        asyncio.run(build_database(
-            limit=args.limit,
-            hash_size=args.hash_size,
-            skip_tokens=not args.include_tokens
-        ))
+        with background_priority():
+            asyncio.run(build_database(
+                limit=args.limit,
+                hash_size=args.hash_size,
+                skip_tokens=not args.include_tokens
+            ))
 
 
 if __name__ == "__main__":
@@ -192,10 +192,16 @@ def extract_card(image: np.ndarray, contour: np.ndarray) -> np.ndarray:
     Returns:
         Warped card image
     """
-    # Get minimum area rectangle
-    rect = cv2.minAreaRect(contour)
-    box = cv2.boxPoints(rect)
-    box = np.int0(box)
+    # Use the card's four corners when the contour has them, so perspective
+    # (not just rotation) is corrected; otherwise the minimum area rectangle
+    peri = cv2.arcLength(contour, True)
+    approx = cv2.approxPolyDP(contour, 0.02 * peri, True)
+    if len(approx) == 4:
+        box = approx.reshape(4, 2)
+    else:
+        rect = cv2.minAreaRect(contour)
+        box = cv2.boxPoints(rect)
+        box = np.intp(box)
     
     # Order points: top-left, top-right, bottom-right, bottom-left
     pts = order_points(box)
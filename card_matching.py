@@ -13,6 +13,8 @@ import pickle
 import os
 from pathlib import Path
 
+from descriptor_index import descriptor_index
+
 logger = logging.getLogger(__name__)
 
 # Cache file for card hashes
@@ -82,6 +84,10 @@ def match_cards(
 ) -> List[Dict[str, Any]]:
     """
     Match detected cards against the database
+
+    Cards without a close enough perceptual hash (sleeves, glare, fingers
+    over the card) fall back to keypoint matching against the descriptor
+    index.
     
     Args:
         detected_cards: List of card images
@@ -89,7 +95,7 @@ def match_cards(
         threshold: Maximum hash distance for a match (lower = stricter)
         
     Returns:
-        List of match results
+        List of match results ('method' is "phash" or "descriptors")
     """
     results = []
     
@@ -106,11 +112,22 @@ def match_cards(
             if match:
                 results.append({
                     'matched': True,
+                    'method': 'phash',
                     'scryfall_id': match['scryfall_id'],
                     'confidence': match['confidence'],
                     'distance': match['distance']
                 })
                 logger.info(f"Card {i+1} matched with distance {match['distance']}")
+            elif (keypoint_match := descriptor_index.match(card_image)) is not None:
+                results.append({
+                    'matched': True,
+                    'method': 'descriptors',
+                    'scryfall_id': keypoint_match['scryfall_id'],
+                    'scryfall_ids': keypoint_match['scryfall_ids'],
+                    'confidence': keypoint_match['confidence'],
+                    'inliers': keypoint_match['inliers']
+                })
+                logger.info(f"Card {i+1} matched by keypoints ({keypoint_match['inliers']} inliers)")
             else:
                 results.append({
                     'matched': False,
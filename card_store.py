@@ -0,0 +1,623 @@
+"""
+Local Card Store
+SQLite mirror of Scryfall's default_cards bulk data, so set/number, name,
+printing and ID lookups are answered locally instead of over the network
+
+Build it from scratch with:
+    python card_store.py
+and keep it current with the delta sync (card_sync.py).
+"""
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import unicodedata
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from price_cache import PRICE_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Store location (overridable through the environment)
+CARD_STORE_PATH = os.getenv("CARD_STORE_PATH", str(Path(__file__).parent / "cache" / "cards.sqlite3"))
+
+# Rows per insert batch while building
+BUILD_BATCH_SIZE = 2000
+
+# Bumped whenever the table layout changes; a mismatch forces a full rebuild
+SCHEMA_VERSION = "2"
+
+# Fields that change without the card itself changing (prices move daily)
+VOLATILE_FIELDS = ('prices', 'edhrec_rank', 'penny_rank')
+
+# Printings that never match a physical scan and that Scryfall's own search
+# hides by default
+UNSEARCHABLE_LAYOUTS = ('art_series',)
+
+SCHEMA = """
+    CREATE TABLE IF NOT EXISTS cards (
+        id TEXT PRIMARY KEY,
+        oracle_id TEXT,
+        name TEXT NOT NULL,
+        normalized_name TEXT NOT NULL,
+        set_code TEXT NOT NULL,
+        collector_number TEXT NOT NULL,
+        released_at TEXT,
+        searchable INTEGER NOT NULL,
+        fingerprint TEXT NOT NULL,
+        image_fingerprint TEXT NOT NULL,
+        prices TEXT,
+        data TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS card_names (
+        normalized_name TEXT NOT NULL,
+        card_id TEXT NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS meta (
+        key TEXT PRIMARY KEY,
+        value TEXT
+    );
+"""
+
+INDEXES = """
+    CREATE INDEX IF NOT EXISTS idx_cards_set_number ON cards (set_code, collector_number);
+    CREATE INDEX IF NOT EXISTS idx_cards_oracle ON cards (oracle_id);
+    CREATE INDEX IF NOT EXISTS idx_card_names_name ON card_names (normalized_name);
+    CREATE INDEX IF NOT EXISTS idx_card_names_card ON card_names (card_id);
+"""
+
+
+def normalize_name(name: str) -> str:
+    """
+    Normalize a card name for lookups
+
+    Case, accents and repeated whitespace are ignored, so "Lim-Dûl's Vault"
+    and "lim-dul's  vault" compare equal.
+
+    Args:
+        name: Card name as printed or recognized
+
+    Returns:
+        Normalized name
+    """
+    decomposed = unicodedata.normalize("NFKD", name)
+    stripped = "".join(ch for ch in decomposed if not unicodedata.combining(ch))
+    return " ".join(stripped.casefold().split())
+
+
+def card_names(card: Dict[str, Any]) -> List[str]:
+    """
+    All normalized names a card can be looked up by
+
+    Args:
+        card: Scryfall card object
+
+    Returns:
+        Full name plus each face name ("Fire // Ice" -> fire // ice, fire, ice)
+    """
+    names = {normalize_name(card['name'])}
+    for face in card.get('card_faces') or []:
+        if face.get('name'):
+            names.add(normalize_name(face['name']))
+    return sorted(names)
+
+
+def _digest(value: Any) -> str:
+    """Short stable hash of a JSON-serializable value"""
+    encoded = json.dumps(value, sort_keys=True, separators=(',', ':')).encode()
+    return hashlib.blake2b(encoded, digest_size=12).hexdigest()
+
+
+def card_fingerprint(card: Dict[str, Any]) -> str:
+    """
+    Fingerprint of a card's metadata, ignoring prices and rankings
+
+    Args:
+        card: Scryfall card object
+
+    Returns:
+        Hex digest that changes when any stable field (including images) changes
+    """
+    return _digest({k: v for k, v in card.items() if k not in VOLATILE_FIELDS})
+
+
+def image_fingerprint(card: Dict[str, Any]) -> str:
+    """
+    Fingerprint of a card's image URIs
+
+    Scryfall puts a version timestamp in every image URI, so this changes
+    whenever a scan is replaced.
+
+    Args:
+        card: Scryfall card object
+
+    Returns:
+        Hex digest of the card's (and its faces') image URIs
+    """
+    faces = [face.get('image_uris') for face in card.get('card_faces') or []]
+    return _digest([card.get('image_uris'), faces])
+
+
+def _card_row(card: Dict[str, Any]) -> tuple:
+    """Row for the cards table (prices are kept in their own column)"""
+    stable = {k: v for k, v in card.items() if k != 'prices'}
+    return (
+        card['id'],
+        card.get('oracle_id') or (card.get('card_faces') or [{}])[0].get('oracle_id'),
+        card['name'],
+        normalize_name(card['name']),
+        (card.get('set') or '').lower(),
+        card.get('collector_number') or '',
+        card.get('released_at'),
+        int(not card.get('digital') and card.get('layout') not in UNSEARCHABLE_LAYOUTS),
+        card_fingerprint(card),
+        image_fingerprint(card),
+        prices_json(card),
+        json.dumps(stable, separators=(',', ':'))
+    )
+
+
+def prices_json(card: Dict[str, Any]) -> Optional[str]:
+    """Serialized prices of a card (None if it has none)"""
+    prices = card.get('prices')
+    return json.dumps(prices, sort_keys=True, separators=(',', ':')) if prices is not None else None
+
+
+INSERT_CARD = "INSERT OR REPLACE INTO cards VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)"
+
+
+def _write_cards(db: sqlite3.Connection, cards: List[Dict[str, Any]], replace: bool = True) -> None:
+    """Insert or replace cards and their lookup names (replace=False for a fresh store)"""
+    db.executemany(INSERT_CARD, [_card_row(card) for card in cards])
+    if replace:
+        db.executemany("DELETE FROM card_names WHERE card_id = ?", [(card['id'],) for card in cards])
+    db.executemany(
+        "INSERT INTO card_names VALUES (?, ?)",
+        [(name, card['id']) for card in cards for name in card_names(card)]
+    )
+
+
+def is_storable(card: Dict[str, Any]) -> bool:
+    """Whether a bulk data item is a card the store can hold"""
+    return card.get('object', 'card') == 'card' and bool(card.get('id')) and bool(card.get('name'))
+
+
+class CardStoreWriter:
+    """
+    Transactional changes to an existing store (used by the delta sync)
+
+    Changes become visible to readers when commit() is called.
+    """
+
+    def __init__(self, db_path: str):
+        self._db = sqlite3.connect(db_path)
+        # Stores built before an index was added get it here
+        self._db.executescript(INDEXES)
+
+    def upsert(self, cards: List[Dict[str, Any]]) -> None:
+        """Insert new cards or replace changed ones"""
+        _write_cards(self._db, cards)
+
+    def update_prices(self, prices: Dict[str, Optional[str]]) -> None:
+        """
+        Update prices only
+
+        Args:
+            prices: Scryfall ID -> serialized prices (as from fingerprints())
+        """
+        self._db.executemany("UPDATE cards SET prices = ? WHERE id = ?", [(v, k) for k, v in prices.items()])
+
+    def remove(self, scryfall_ids: Iterable[str]) -> None:
+        """Delete cards that are no longer in the bulk data"""
+        ids = [(scryfall_id,) for scryfall_id in scryfall_ids]
+        self._db.executemany("DELETE FROM cards WHERE id = ?", ids)
+        self._db.executemany("DELETE FROM card_names WHERE card_id = ?", ids)
+
+    def set_meta(self, **values: Any) -> None:
+        """Record sync metadata"""
+        self._db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [(k, str(v)) for k, v in values.items()])
+
+    def commit(self) -> None:
+        card_count = self._db.execute("SELECT COUNT(*) FROM cards").fetchone()[0]
+        self.set_meta(card_count=card_count)
+        self._db.commit()
+
+    def close(self) -> None:
+        self._db.close()
+
+
+class CardStore:
+    """
+    Read-mostly SQLite mirror of Scryfall card objects
+
+    The store is optional: until it has been built every lookup returns None
+    and callers fall back to the Scryfall API. Full builds write a new file
+    and swap it in atomically, and delta syncs apply in one transaction, so
+    readers never see a half-written store.
+    """
+
+    def __init__(self, db_path: str = CARD_STORE_PATH, price_ttl: float = PRICE_CACHE_TTL):
+        self.db_path = db_path
+        self.price_ttl = price_ttl
+        self._db: Optional[sqlite3.Connection] = None
+        self._lock = threading.Lock()
+        self._opened_mtime: Optional[float] = None
+        self._prices_updated_at = 0.0
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def _connection(self) -> Optional[sqlite3.Connection]:
+        """Open the store on first use, and reopen it after a rebuild"""
+        try:
+            mtime = os.stat(self.db_path).st_mtime
+        except OSError:
+            return None
+
+        if self._db is None or mtime != self._opened_mtime:
+            if self._db is not None:
+                self._db.close()
+            try:
+                self._db = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True, check_same_thread=False)
+                self._opened_mtime = mtime
+                meta = self.meta()
+                self._prices_updated_at = float(meta.get('prices_updated_at') or meta.get('built_at') or 0)
+                logger.info(f"Opened card store {self.db_path} ({meta.get('card_count', '?')} cards)")
+            except sqlite3.Error as e:
+                logger.error(f"Failed to open card store {self.db_path}: {e}")
+                self._db = None
+        return self._db
+
+    @property
+    def available(self) -> bool:
+        """Whether a built store is present"""
+        with self._lock:
+            return self._connection() is not None
+
+    def _query(self, sql: str, params: tuple) -> List[Dict[str, Any]]:
+        """Run a lookup returning card objects; errors count as a miss"""
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return []
+            try:
+                rows = db.execute(sql, params).fetchall()
+            except sqlite3.Error as e:
+                logger.error(f"Card store lookup failed: {e}")
+                rows = []
+
+            if rows:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+            # Prices older than the TTL are left off, so callers fetch live ones
+            prices_fresh = time.time() - self._prices_updated_at <= self.price_ttl
+
+        # Fresh objects per call so callers can't mutate each other's cards
+        cards = []
+        for data, prices in rows:
+            card = json.loads(data)
+            if prices is not None and prices_fresh:
+                card['prices'] = json.loads(prices)
+            cards.append(card)
+        return cards
+
+    def get_by_id(self, scryfall_id: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a card by Scryfall ID
+
+        Args:
+            scryfall_id: Scryfall UUID
+
+        Returns:
+            Card object or None
+        """
+        rows = self._query("SELECT data, prices FROM cards WHERE id = ?", (scryfall_id,))
+        return rows[0] if rows else None
+
+    def get_by_set(self, set_code: str, collector_number: str) -> Optional[Dict[str, Any]]:
+        """
+        Look up a card by set code and collector number
+
+        Args:
+            set_code: Set code (any case)
+            collector_number: Collector number
+
+        Returns:
+            Card object or None
+        """
+        rows = self._query(
+            "SELECT data, prices FROM cards WHERE set_code = ? AND collector_number = ?",
+            (set_code.lower(), collector_number)
+        )
+        return rows[0] if rows else None
+
+    def find_by_name(
+        self,
+        card_name: str,
+        set_code: Optional[str] = None,
+        limit: Optional[int] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Exact (normalized) name lookup, matching full or face names
+
+        Args:
+            card_name: Card name
+            set_code: Optional set code to narrow the search
+            limit: Maximum printings to return
+
+        Returns:
+            Printings, newest first
+        """
+        sql = (
+            "SELECT c.data, c.prices FROM card_names n JOIN cards c ON c.id = n.card_id "
+            "WHERE n.normalized_name = ? AND c.searchable = 1"
+        )
+        params: tuple = (normalize_name(card_name),)
+        if set_code:
+            sql += " AND c.set_code = ?"
+            params += (set_code.lower(),)
+        sql += " ORDER BY c.released_at DESC, c.set_code, c.collector_number"
+        if limit:
+            sql += " LIMIT ?"
+            params += (limit,)
+        return self._query(sql, params)
+
+    def meta(self) -> Dict[str, str]:
+        """Build metadata (built_at, card_count, source_updated_at)"""
+        db = self._db
+        if db is None:
+            return {}
+        try:
+            return dict(db.execute("SELECT key, value FROM meta").fetchall())
+        except sqlite3.Error:
+            return {}
+
+    def build(self, cards: Iterable[Dict[str, Any]], source_updated_at: Optional[str] = None) -> int:
+        """
+        Build a fresh store from Scryfall card objects and swap it in
+
+        Args:
+            cards: Card objects (e.g. the default_cards bulk file)
+            source_updated_at: Bulk file's updated_at, recorded for refreshes
+
+        Returns:
+            Number of cards stored
+        """
+        started = time.time()
+        Path(self.db_path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.db_path}.building"
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+        db = sqlite3.connect(tmp_path)
+        try:
+            db.execute("PRAGMA journal_mode = OFF")
+            db.execute("PRAGMA synchronous = OFF")
+            db.executescript(SCHEMA)
+
+            count = 0
+            batch = []
+            for card in cards:
+                if not is_storable(card):
+                    continue
+                batch.append(card)
+                count += 1
+
+                if len(batch) >= BUILD_BATCH_SIZE:
+                    _write_cards(db, batch, replace=False)
+                    batch = []
+
+            _write_cards(db, batch, replace=False)
+            db.executescript(INDEXES)
+            db.executemany("INSERT OR REPLACE INTO meta VALUES (?, ?)", [
+                ('schema_version', SCHEMA_VERSION),
+                ('built_at', str(time.time())),
+                ('synced_at', str(time.time())),
+                ('prices_updated_at', str(time.time())),
+                ('card_count', str(count)),
+                ('source_updated_at', source_updated_at or '')
+            ])
+            db.commit()
+            db.execute("ANALYZE")
+        finally:
+            db.close()
+
+        with self._lock:
+            os.replace(tmp_path, self.db_path)
+            # Force a reopen on the next lookup
+            self._opened_mtime = None
+
+        logger.info(f"✓ Card store built: {count} cards in {time.time() - started:.1f}s ({self.db_path})")
+        return count
+
+    def current_meta(self) -> Dict[str, str]:
+        """Metadata of the store on disk ({} if not built)"""
+        with self._lock:
+            return self.meta() if self._connection() is not None else {}
+
+    def fingerprints(self) -> Dict[str, Tuple[str, str, Optional[str]]]:
+        """
+        Fingerprints of every stored card, for diffing against new bulk data
+
+        Returns:
+            Scryfall ID -> (fingerprint, image fingerprint, serialized prices)
+        """
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return {}
+            return {
+                row[0]: (row[1], row[2], row[3])
+                for row in db.execute("SELECT id, fingerprint, image_fingerprint, prices FROM cards")
+            }
+
+    def lookup_names(self) -> List[Tuple[str, str]]:
+        """
+        Every lookup name (full and face) of searchable cards
+
+        Returns:
+            (normalized name, full card name) pairs
+        """
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return []
+            return db.execute(
+                "SELECT DISTINCT n.normalized_name, c.name FROM card_names n "
+                "JOIN cards c ON c.id = n.card_id WHERE c.searchable = 1"
+            ).fetchall()
+
+    def get_many(self, scryfall_ids: List[str]) -> List[Dict[str, Any]]:
+        """
+        Look up several cards by Scryfall ID
+
+        Args:
+            scryfall_ids: Scryfall UUIDs
+
+        Returns:
+            Card objects found, in the order of scryfall_ids
+        """
+        if not scryfall_ids:
+            return []
+        cards = {}
+        # Stay well under SQLite's bound-parameter limit
+        for start in range(0, len(scryfall_ids), 500):
+            chunk = scryfall_ids[start:start + 500]
+            rows = self._query(
+                f"SELECT data, prices FROM cards WHERE id IN ({', '.join('?' * len(chunk))})",
+                tuple(chunk)
+            )
+            cards.update((card['id'], card) for card in rows)
+        return [cards[scryfall_id] for scryfall_id in scryfall_ids if scryfall_id in cards]
+
+    def printing_rows(self) -> List[tuple]:
+        """
+        Printing attributes of every searchable card, grouped by oracle ID
+
+        Returns:
+            (id, oracle_id, set_code, set_name, collector_number, released_at,
+            frame, frame_effects, border_color, finishes, image_uri) tuples,
+            list-valued fields as JSON, newest first within each oracle ID
+        """
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return []
+            return db.execute("""
+                SELECT id, oracle_id, set_code, json_extract(data, '$.set_name'), collector_number, released_at,
+                       json_extract(data, '$.frame'), json_extract(data, '$.frame_effects'),
+                       json_extract(data, '$.border_color'), json_extract(data, '$.finishes'),
+                       COALESCE(json_extract(data, '$.image_uris.normal'),
+                                json_extract(data, '$.card_faces[0].image_uris.normal'))
+                FROM cards WHERE searchable = 1 AND oracle_id IS NOT NULL
+                ORDER BY oracle_id, released_at DESC, set_code, collector_number
+            """).fetchall()
+
+    def oracle_names(self) -> List[Tuple[str, str]]:
+        """
+        Every lookup name (full and face) of searchable cards with its oracle ID
+
+        Returns:
+            (normalized name, oracle ID) pairs
+        """
+        with self._lock:
+            db = self._connection()
+            if db is None:
+                return []
+            return db.execute(
+                "SELECT DISTINCT n.normalized_name, c.oracle_id FROM card_names n "
+                "JOIN cards c ON c.id = n.card_id WHERE c.searchable = 1 AND c.oracle_id IS NOT NULL"
+            ).fetchall()
+
+    def iter_cards(self) -> Iterable[Dict[str, Any]]:
+        """
+        Iterate every stored card (own connection, so lookups aren't blocked)
+
+        Yields:
+            Card objects with prices
+        """
+        if not os.path.exists(self.db_path):
+            return
+        db = sqlite3.connect(f"file:{self.db_path}?mode=ro", uri=True)
+        try:
+            for data, prices in db.execute("SELECT data, prices FROM cards"):
+                card = json.loads(data)
+                if prices is not None:
+                    card['prices'] = json.loads(prices)
+                yield card
+        finally:
+            db.close()
+
+    def writer(self) -> CardStoreWriter:
+        """
+        Open a writer for in-place changes to the built store
+
+        Returns:
+            Writer; call commit() then close()
+        """
+        return CardStoreWriter(self.db_path)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters and build metadata"""
+        with self._lock:
+            available = self._connection() is not None
+            meta = self.meta() if available else {}
+            lookups = self.hits + self.misses
+            return {
+                "available": available,
+                "cards": int(meta.get('card_count') or 0),
+                "source_updated_at": meta.get('source_updated_at') or None,
+                "synced_at": float(meta['synced_at']) if meta.get('synced_at') else None,
+                "prices_age_seconds": round(time.time() - self._prices_updated_at) if available else None,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+# Global store instance
+card_store = CardStore()
+
+
+async def build_card_store() -> int:
+    """
+    Download the default_cards bulk file and (re)build the store
+
+    Returns:
+        Number of cards stored
+    """
+    # Imported here: scryfall_integration reads through this module
+    from scryfall_integration import get_bulk_data_item, download_bulk_file, iter_bulk_cards, close_http_client
+
+    try:
+        item = await get_bulk_data_item("default_cards")
+        bulk_path = await download_bulk_file("default_cards")
+    finally:
+        await close_http_client()
+    return card_store.build(iter_bulk_cards(bulk_path), source_updated_at=item.get('updated_at'))
+
+
+def main():
+    """Main entry point"""
+    import asyncio
+    from rate_limiter import background_priority
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    with background_priority():
+        asyncio.run(build_card_store())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,201 @@
+"""
+Card Data Sync
+Keeps the local card store current with Scryfall's bulk data by applying
+only what changed since the last sync
+
+Usage:
+    python card_sync.py            # Sync if Scryfall published new bulk data
+    python card_sync.py --force    # Re-download and diff even if unchanged
+
+Card hashes are brought up to date with `python build_card_database.py --update`,
+which runs this sync first.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import time
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Any, Dict
+
+from card_store import (
+    card_store, card_fingerprint, image_fingerprint, prices_json, is_storable, SCHEMA_VERSION
+)
+from scryfall_integration import get_bulk_data_item, download_bulk_file, iter_bulk_cards
+
+logger = logging.getLogger(__name__)
+
+# One JSON line per sync run
+SYNC_MANIFEST_PATH = os.getenv("SYNC_MANIFEST_PATH", str(Path(__file__).parent / "cache" / "sync_manifest.jsonl"))
+
+# Cards written per batch while applying a delta
+SYNC_BATCH_SIZE = 1000
+
+# A delta removing more than this fraction of the store is treated as a bad
+# download and aborted rather than applied
+MAX_REMOVED_FRACTION = 0.1
+
+
+async def sync_card_data(force: bool = False, bulk_type: str = "default_cards") -> Dict[str, Any]:
+    """
+    Bring the card store up to date with Scryfall's bulk data
+
+    Nothing is downloaded when the bulk file's updated_at matches the last
+    sync. Otherwise the file is streamed to disk and diffed card by card:
+    new, changed (metadata or image) and removed cards are written, and
+    cards whose only change is their price just get new prices. The store
+    is built from scratch when it doesn't exist yet or its schema changed.
+
+    Args:
+        force: Download and diff even if updated_at hasn't changed
+        bulk_type: Bulk data type to mirror
+
+    Returns:
+        Sync manifest (mode, counts and the affected card IDs)
+    """
+    started = time.time()
+    item = await get_bulk_data_item(bulk_type)
+    updated_at = item.get('updated_at')
+    meta = card_store.current_meta()
+
+    manifest: Dict[str, Any] = {
+        "started_at": datetime.now(timezone.utc).isoformat(),
+        "bulk_type": bulk_type,
+        "source_updated_at": updated_at,
+        "previous_updated_at": meta.get('source_updated_at') or None,
+        "new": [],
+        "changed": [],
+        "image_changed": [],
+        "removed": [],
+        "prices_updated": 0
+    }
+
+    schema_current = meta.get('schema_version') == SCHEMA_VERSION
+    if schema_current and not force and meta.get('source_updated_at') == updated_at:
+        manifest["mode"] = "skipped"
+        logger.info(f"✓ Card data unchanged since {updated_at}, nothing to download")
+    else:
+        bulk_path = await download_bulk_file(bulk_type)
+        manifest["download_mb"] = round(os.path.getsize(bulk_path) / 1e6, 1)
+
+        if schema_current:
+            manifest["mode"] = "delta"
+            await asyncio.to_thread(_apply_delta, bulk_path, updated_at, manifest)
+        else:
+            manifest["mode"] = "full"
+            manifest["cards"] = await asyncio.to_thread(
+                card_store.build, iter_bulk_cards(bulk_path), updated_at
+            )
+
+    manifest["seconds"] = round(time.time() - started, 2)
+    _write_manifest(manifest)
+
+    logger.info(
+        f"✓ Sync {manifest['mode']}: {len(manifest['new'])} new, {len(manifest['changed'])} changed "
+        f"({len(manifest['image_changed'])} new images), {len(manifest['removed'])} removed, "
+        f"{manifest['prices_updated']} price updates in {manifest['seconds']}s"
+    )
+    return manifest
+
+
+def _apply_delta(bulk_path: Path, updated_at: str, manifest: Dict[str, Any]) -> None:
+    """
+    Diff a bulk file against the store and apply the changes in one transaction
+
+    Args:
+        bulk_path: Downloaded bulk data file
+        updated_at: Bulk file's updated_at
+        manifest: Filled in with the affected card IDs
+    """
+    existing = card_store.fingerprints()
+    seen = set()
+    prices: Dict[str, Any] = {}
+    batch = []
+
+    writer = card_store.writer()
+    try:
+        for card in iter_bulk_cards(bulk_path):
+            if not is_storable(card):
+                continue
+
+            scryfall_id = card['id']
+            seen.add(scryfall_id)
+            stored = existing.get(scryfall_id)
+
+            if stored is None:
+                manifest["new"].append(scryfall_id)
+                batch.append(card)
+            elif card_fingerprint(card) != stored[0]:
+                manifest["changed"].append(scryfall_id)
+                if image_fingerprint(card) != stored[1]:
+                    manifest["image_changed"].append(scryfall_id)
+                batch.append(card)
+            else:
+                card_prices = prices_json(card)
+                if card_prices != stored[2]:
+                    prices[scryfall_id] = card_prices
+
+            if len(batch) >= SYNC_BATCH_SIZE:
+                writer.upsert(batch)
+                batch = []
+
+        writer.upsert(batch)
+
+        removed = sorted(set(existing) - seen)
+        if existing and len(removed) > len(existing) * MAX_REMOVED_FRACTION:
+            raise ValueError(
+                f"Bulk data would remove {len(removed)} of {len(existing)} cards - "
+                f"refusing to apply (truncated download?)"
+            )
+
+        writer.remove(removed)
+        writer.update_prices(prices)
+        now = time.time()
+        writer.set_meta(source_updated_at=updated_at, synced_at=now, prices_updated_at=now)
+        writer.commit()
+    finally:
+        writer.close()
+
+    manifest["removed"] = removed
+    manifest["prices_updated"] = len(prices)
+
+
+def _write_manifest(manifest: Dict[str, Any]) -> None:
+    """Append a sync manifest to the JSONL log"""
+    try:
+        Path(SYNC_MANIFEST_PATH).parent.mkdir(parents=True, exist_ok=True)
+        with open(SYNC_MANIFEST_PATH, "a", encoding="utf-8") as f:
+            f.write(json.dumps(manifest) + "\n")
+    except OSError as e:
+        logger.error(f"Failed to write sync manifest: {e}")
+
+
+def main():
+    """Main entry point"""
+    import argparse
+    from rate_limiter import background_priority
+    from scryfall_integration import close_http_client
+
+    parser = argparse.ArgumentParser(description="Sync the local card store with Scryfall bulk data")
+    parser.add_argument('--force', action='store_true', help='Download and diff even if Scryfall reports no update')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    async def run():
+        try:
+            await sync_card_data(force=args.force)
+        finally:
+            await close_http_client()
+
+    with background_priority():
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,176 @@
+"""
+Circuit Breakers
+Per-provider breakers that stop calling a vision provider while it is
+failing or slow, and let a trial call through after a cool-down
+"""
+
+import logging
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+logger = logging.getLogger(__name__)
+
+# Recent calls a breaker judges a provider on, and the fewest it trips on
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+
+# Trip conditions: the share of recent calls that failed, or that took
+# longer than BREAKER_SLOW_SECONDS
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_SECONDS = float(os.getenv("BREAKER_SLOW_SECONDS", "20"))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", "0.8"))
+
+# How long an open breaker skips its provider before a trial call, and how
+# many trial calls may be in flight at once (half-open)
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+BREAKER_HALF_OPEN_CALLS = 1
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open breaker for one provider
+
+    Closed: calls go through and are recorded. When enough of the last
+    BREAKER_WINDOW calls failed or were slow, the breaker opens.
+    Open: calls are refused instantly for BREAKER_OPEN_SECONDS.
+    Half-open: BREAKER_HALF_OPEN_CALLS trial calls go through; a fast
+    success closes the breaker, a failure or slow call opens it again.
+
+    Callers ask allow() before a call and must report every allowed call
+    with record().
+    """
+
+    def __init__(
+        self,
+        name: str,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        slow_seconds: float = BREAKER_SLOW_SECONDS,
+        slow_rate: float = BREAKER_SLOW_RATE,
+        open_seconds: float = BREAKER_OPEN_SECONDS
+    ):
+        self.name = name
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_seconds = slow_seconds
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.state = CLOSED
+        self._calls: deque = deque(maxlen=window)  # (ok, slow) of recent calls
+        self._opened_at = 0.0
+        self._trials = 0
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.rejected = 0
+        self.trips = 0
+
+    def allow(self) -> bool:
+        """
+        Whether a call may go out now (an allowed half-open trial call is
+        counted as in flight until it is recorded)
+        """
+        with self._lock:
+            if self.state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+                self.state = HALF_OPEN
+                self._trials = 0
+                logger.info(f"{self.name} breaker half-open, allowing a trial call")
+
+            if self.state == CLOSED:
+                return True
+            if self.state == HALF_OPEN and self._trials < BREAKER_HALF_OPEN_CALLS:
+                self._trials += 1
+                return True
+            self.rejected += 1
+            return False
+
+    def record(self, ok: bool, seconds: float) -> None:
+        """
+        Record the outcome of an allowed call
+
+        Args:
+            ok: Whether the call succeeded
+            seconds: How long it took
+        """
+        slow = seconds >= self.slow_seconds
+        with self._lock:
+            if self.state == HALF_OPEN:
+                self._trials = max(0, self._trials - 1)
+                if ok and not slow:
+                    self.state = CLOSED
+                    self._calls.clear()
+                    logger.info(f"✓ {self.name} breaker closed after a successful trial call")
+                else:
+                    self._open(f"trial call {'failed' if not ok else f'took {seconds:.1f}s'}")
+                return
+            if self.state == OPEN:
+                # A call that was already in flight when the breaker opened
+                return
+
+            self._calls.append((ok, slow))
+            if len(self._calls) < self.min_calls:
+                return
+            failures = sum(1 for call_ok, _ in self._calls if not call_ok) / len(self._calls)
+            slow_calls = sum(1 for _, call_slow in self._calls if call_slow) / len(self._calls)
+            if failures >= self.failure_rate:
+                self._open(f"{failures:.0%} of the last {len(self._calls)} calls failed")
+            elif slow_calls >= self.slow_rate:
+                self._open(f"{slow_calls:.0%} of the last {len(self._calls)} calls took over {self.slow_seconds:g}s")
+
+    def _open(self, reason: str) -> None:
+        """Open the breaker (lock held)"""
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._calls.clear()
+        self.trips += 1
+        logger.warning(f"✗ {self.name} breaker open for {self.open_seconds:g}s: {reason}")
+
+    def stats(self) -> Dict[str, Any]:
+        """State and counters"""
+        with self._lock:
+            calls = list(self._calls)
+            reopens_in = self.open_seconds - (time.monotonic() - self._opened_at) if self.state == OPEN else 0.0
+        return {
+            "state": self.state,
+            "recent_calls": len(calls),
+            "recent_failures": sum(1 for ok, _ in calls if not ok),
+            "recent_slow": sum(1 for _, slow in calls if slow),
+            "half_open_in": round(max(0.0, reopens_in), 1),
+            "trips": self.trips,
+            "rejected": self.rejected
+        }
+
+
+class CircuitBreakers:
+    """One breaker per provider name, created on first use"""
+
+    def __init__(self, **settings: Any):
+        self._settings = settings
+        self._breakers: Dict[str, CircuitBreaker] = {}
+        self._lock = threading.Lock()
+
+    def get(self, name: str) -> CircuitBreaker:
+        """The provider's breaker"""
+        with self._lock:
+            breaker: Optional[CircuitBreaker] = self._breakers.get(name)
+            if breaker is None:
+                breaker = self._breakers[name] = CircuitBreaker(name, **self._settings)
+            return breaker
+
+    def stats(self) -> Dict[str, Any]:
+        """Every breaker's stats, by provider"""
+        with self._lock:
+            breakers = dict(self._breakers)
+        return {name: breaker.stats() for name, breaker in breakers.items()}
+
+
+# Global breakers for the vision providers
+vision_breakers = CircuitBreakers()
@@ -3,7 +3,6 @@ Claude Vision Integration
 Uses Claude's vision capabilities to identify Magic cards from images
 """
 
-import anthropic
 import base64
 import os
 import logging
@@ -11,28 +10,76 @@ from typing import List, Dict, Any, Optional
 import json
 import re
 
+from provider_registry import provider_registry, CLAUDE_MODEL
+
 logger = logging.getLogger(__name__)
 
-# Initialize Anthropic client
+# The client itself is created once, on first use (see provider_registry)
 ANTHROPIC_API_KEY = os.getenv("ANTHROPIC_API_KEY")
 if not ANTHROPIC_API_KEY:
     logger.warning("ANTHROPIC_API_KEY not set - Claude Vision will not work")
 
-client = anthropic.Anthropic(api_key=ANTHROPIC_API_KEY) if ANTHROPIC_API_KEY else None
+# Markdown code blocks the JSON answer may be wrapped in
+JSON_BLOCK = re.compile(r'```json\s*([\s\S]*?)\s*```')
+CODE_BLOCK = re.compile(r'```\s*([\s\S]*?)\s*```')
+
+# Instructions sent with each photo
+IDENTIFY_PROMPT = """You are analyzing a Magic: The Gathering card photo.
+
+CRITICAL: Read the EXACT card name from the card itself - do not guess or infer.
+
+For each card visible:
+1. Read the card name at the TOP of the card (in the title box)
+2. Look for the set symbol (middle-right side of card)
+3. Look for the collector number at the BOTTOM of the card (format: 123/456)
+
+Return ONLY a JSON array in this exact format:
+[
+  {
+    "name": "Exact Card Name From Title",
+    "set": "SET",
+    "collector_number": "123",
+    "confidence": "high"
+  }
+]
+
+RULES:
+- Read card name EXACTLY as printed - do not abbreviate or change spelling
+- If you cannot read the full card name clearly, use "confidence": "low"
+- Only include set/collector_number if you can READ them on the card
+- If no Magic cards visible, return: []
+- Return ONLY the JSON array, no markdown, no explanations
+
+Example card name locations:
+- Card name: Top of card in large text
+- Set symbol: Right side, middle area (small icon)
+- Collector number: Bottom of card, often with card count (e.g., "34/274")"""
 
 
-def identify_cards_with_vision(image_data: bytes) -> List[Dict[str, Any]]:
+def identify_cards_with_vision(
+    image_data: bytes,
+    raise_errors: bool = False,
+    prompt: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
     Use Claude Vision to identify Magic cards in an image
 
     Args:
         image_data: Raw image bytes
+        raise_errors: Raise on failure instead of returning [] (so callers
+            can tell a failed call from an image without cards)
+        prompt: Instructions to send instead of IDENTIFY_PROMPT (same JSON
+            array answer)
 
     Returns:
         List of identified cards with name, set, and collector_number
     """
-    if not client:
+    try:
+        client = provider_registry.anthropic()
+    except ValueError:
         logger.error("Claude Vision not available - ANTHROPIC_API_KEY not set")
+        if raise_errors:
+            raise RuntimeError("ANTHROPIC_API_KEY not set")
         return []
 
     try:
@@ -50,7 +97,7 @@ def identify_cards_with_vision(image_data: bytes) -> List[Dict[str, Any]]:
 
         # Call Claude Vision API
         message = client.messages.create(
-            model="claude-sonnet-4-5-20250929",
+            model=CLAUDE_MODEL,
             max_tokens=2048,
             messages=[
                 {
@@ -66,36 +113,7 @@ def identify_cards_with_vision(image_data: bytes) -> List[Dict[str, Any]]:
                         },
                         {
                             "type": "text",
-                            "text": """You are analyzing a Magic: The Gathering card photo.
-
-CRITICAL: Read the EXACT card name from the card itself - do not guess or infer.
-
-For each card visible:
-1. Read the card name at the TOP of the card (in the title box)
-2. Look for the set symbol (middle-right side of card)
-3. Look for the collector number at the BOTTOM of the card (format: 123/456)
-
-Return ONLY a JSON array in this exact format:
-[
-  {
-    "name": "Exact Card Name From Title",
-    "set": "SET",
-    "collector_number": "123",
-    "confidence": "high"
-  }
-]
-
-RULES:
-- Read card name EXACTLY as printed - do not abbreviate or change spelling
-- If you cannot read the full card name clearly, use "confidence": "low"
-- Only include set/collector_number if you can READ them on the card
-- If no Magic cards visible, return: []
-- Return ONLY the JSON array, no markdown, no explanations
-
-Example card name locations:
-- Card name: Top of card in large text
-- Set symbol: Right side, middle area (small icon)
-- Collector number: Bottom of card, often with card count (e.g., "34/274")"""
+                            "text": prompt or IDENTIFY_PROMPT
                         }
                     ],
                 }
@@ -110,12 +128,12 @@ Example card name locations:
         # Handle potential markdown code blocks
         if "```json" in response_text:
             # Extract JSON from markdown code block
-            json_match = re.search(r'```json\s*([\s\S]*?)\s*```', response_text)
+            json_match = JSON_BLOCK.search(response_text)
             if json_match:
                 response_text = json_match.group(1)
         elif "```" in response_text:
             # Extract from generic code block
-            json_match = re.search(r'```\s*([\s\S]*?)\s*```', response_text)
+            json_match = CODE_BLOCK.search(response_text)
             if json_match:
                 response_text = json_match.group(1)
 
@@ -123,6 +141,8 @@ Example card name locations:
 
         if not isinstance(cards, list):
             logger.error(f"Expected list from Claude Vision, got: {type(cards)}")
+            if raise_errors:
+                raise ValueError(f"Expected list from Claude Vision, got: {type(cards)}")
             return []
 
         logger.info(f"Claude Vision identified {len(cards)} card(s)")
@@ -131,9 +151,13 @@ Example card name locations:
     except json.JSONDecodeError as e:
         logger.error(f"Failed to parse Claude Vision response as JSON: {e}")
         logger.error(f"Response was: {response_text}")
+        if raise_errors:
+            raise
         return []
     except Exception as e:
         logger.error(f"Error calling Claude Vision API: {e}", exc_info=True)
+        if raise_errors:
+            raise
         return []
 
 
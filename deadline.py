@@ -0,0 +1,108 @@
+"""
+Scan Deadlines
+Per-request time budget checked by every stage of the scan pipeline
+"""
+
+import asyncio
+import logging
+import os
+import time
+from typing import Any, Awaitable, Optional
+
+logger = logging.getLogger(__name__)
+
+# Default /scan budget - below the mobile client's 30s fetch timeout
+SCAN_DEADLINE_SECONDS = float(os.getenv("SCAN_DEADLINE_SECONDS", "25"))
+
+# Bounds for client-supplied deadlines
+MIN_DEADLINE_SECONDS = 1.0
+MAX_DEADLINE_SECONDS = 300.0
+
+# Header clients can use instead of the ?deadline= query param
+DEADLINE_HEADER = "X-Scan-Deadline"
+
+
+class DeadlineExceeded(Exception):
+    """Raised when a stage runs out of time budget"""
+
+    def __init__(self, stage: str):
+        super().__init__(f"Deadline exceeded during {stage}")
+        self.stage = stage
+
+
+class Deadline:
+    """
+    Time budget for one request
+
+    A deadline created with seconds=None never expires (used for
+    background jobs, which have no client waiting on the connection).
+    """
+
+    def __init__(self, seconds: Optional[float] = SCAN_DEADLINE_SECONDS):
+        self.budget = seconds
+        self.expires_at = time.monotonic() + seconds if seconds is not None else None
+
+    def remaining(self) -> float:
+        """Seconds left (infinite for an unbounded deadline)"""
+        if self.expires_at is None:
+            return float('inf')
+        return max(0.0, self.expires_at - time.monotonic())
+
+    def expired(self) -> bool:
+        """Whether the budget is used up"""
+        return self.remaining() <= 0
+
+    def has_budget(self, seconds: float) -> bool:
+        """Whether at least the given number of seconds are left"""
+        return self.remaining() >= seconds
+
+    def timeout(self, default: float) -> float:
+        """Timeout for a single operation, capped by the remaining budget"""
+        return min(default, self.remaining())
+
+    async def run(self, awaitable: Awaitable, stage: str) -> Any:
+        """
+        Await something within the remaining budget
+
+        Args:
+            awaitable: Coroutine or future to await
+            stage: Stage name for logging and the raised exception
+
+        Returns:
+            Result of the awaitable
+
+        Raises:
+            DeadlineExceeded: If the budget runs out first
+        """
+        if self.expires_at is None:
+            return await awaitable
+
+        if self.expired():
+            # Don't leave an un-awaited coroutine behind
+            if asyncio.iscoroutine(awaitable):
+                awaitable.close()
+            raise DeadlineExceeded(stage)
+
+        try:
+            return await asyncio.wait_for(awaitable, timeout=self.remaining())
+        except asyncio.TimeoutError:
+            logger.warning(f"Deadline exceeded during {stage} (budget {self.budget}s)")
+            raise DeadlineExceeded(stage)
+
+
+def parse_deadline(value: Optional[str], default: Optional[float] = SCAN_DEADLINE_SECONDS) -> Deadline:
+    """
+    Build a deadline from a client-supplied value
+
+    Args:
+        value: Seconds from the query param or X-Scan-Deadline header
+        default: Budget when the client didn't send one (None = unbounded)
+
+    Returns:
+        Deadline, clamped to MIN/MAX_DEADLINE_SECONDS
+    """
+    if value is None or str(value).strip() == "":
+        return Deadline(default)
+
+    seconds = float(value)
+    return Deadline(min(MAX_DEADLINE_SECONDS, max(MIN_DEADLINE_SECONDS, seconds)))
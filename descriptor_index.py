@@ -0,0 +1,430 @@
+"""
+Descriptor Index
+ORB keypoint descriptors of every card artwork in a multi-probe LSH index,
+matched with geometric verification: the second-stage matcher for photos
+whole-card perceptual hashes can't handle (sleeves, glare, cards partly
+covered by fingers or other cards)
+
+Build it (after the card store, from images in the image store) with:
+    python descriptor_index.py
+"""
+
+import asyncio
+import json
+import logging
+import os
+import shutil
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import cv2
+import numpy as np
+
+from card_store import card_store
+from image_store import image_store, IMAGE_VARIANT, chunked, is_hashable
+
+logger = logging.getLogger(__name__)
+
+# Index location (overridable through the environment)
+DESCRIPTOR_INDEX_DIR = os.getenv("DESCRIPTOR_INDEX_DIR", str(Path(__file__).parent / "cache" / "descriptor_index"))
+
+# Keypoints kept per indexed artwork, and extracted from a query photo
+# (~32 bytes each on disk plus 4 per LSH table)
+FEATURES_PER_CARD = int(os.getenv("DESCRIPTOR_FEATURES_PER_CARD", "200"))
+QUERY_FEATURES = 500
+
+# Keypoints are detected DETECT_OVERSAMPLING times over and then spread
+# evenly across a columns x rows grid of the card
+DETECT_OVERSAMPLING = 4
+KEYPOINT_GRID = (4, 6)
+
+# LSH: each table hashes a descriptor to a key of sampled bits; key size is
+# picked at build time for about LSH_BUCKET_TARGET descriptors per bucket.
+# Queries also probe every key one bit flip away.
+LSH_TABLES = 4
+LSH_BUCKET_TARGET = 8
+LSH_MIN_KEY_BITS = 12
+LSH_MAX_KEY_BITS = 24
+LSH_MAX_BUCKET = 32  # Overfull buckets (frame features every card has) are truncated
+
+# A descriptor match: Hamming distance at most MAX_HAMMING (of 256 bits),
+# and clearly closer than the best match on any other artwork
+MAX_HAMMING = 64
+RATIO = 0.8
+
+# Artworks with the most matches are verified with a RANSAC homography;
+# a card is identified when enough matches agree on one
+VERIFY_GROUPS = 3
+MIN_MATCHES = 8
+MIN_INLIERS = 12
+RANSAC_THRESHOLD = 8.0  # Pixels, at CARD_SIZE
+
+# Scryfall 'normal' images are 488x680; detected cards are warped to match
+CARD_SIZE = (488, 680)
+
+# Card images processed per chunk while building
+BUILD_CHUNK_SIZE = 200
+
+# Set bits of every 16-bit value, for Hamming distances two bytes at a time
+_POPCOUNT16 = np.array([bin(i).count("1") for i in range(1 << 16)], np.uint8)
+
+
+def artwork_key(card: Dict[str, Any]) -> str:
+    """Printings sharing an artwork are indexed once (illustration ID, else card ID)"""
+    faces = card.get('card_faces') or [{}]
+    return card.get('illustration_id') or faces[0].get('illustration_id') or card['id']
+
+
+def orb_features(card_image: np.ndarray, features: int) -> tuple:
+    """
+    ORB keypoint coordinates and descriptors of a card image
+
+    Args:
+        card_image: Card image of any size (BGR or grayscale)
+        features: Maximum keypoints
+
+    Returns:
+        (points as float32 (N, 2) at CARD_SIZE, descriptors as uint8 (N, 32))
+    """
+    if card_image.shape[1::-1] != CARD_SIZE:
+        card_image = cv2.resize(card_image, CARD_SIZE, interpolation=cv2.INTER_AREA)
+    gray = cv2.cvtColor(card_image, cv2.COLOR_BGR2GRAY) if card_image.ndim == 3 else card_image
+    orb = cv2.ORB_create(nfeatures=features * DETECT_OVERSAMPLING)
+    keypoints = spread_keypoints(orb.detect(gray, None), features)
+    keypoints, descriptors = orb.compute(gray, keypoints)
+    if descriptors is None or not len(keypoints):
+        return np.zeros((0, 2), np.float32), np.zeros((0, 32), np.uint8)
+    return np.float32([kp.pt for kp in keypoints]), descriptors
+
+
+def spread_keypoints(keypoints: list, count: int) -> list:
+    """
+    The strongest keypoints of each grid cell, up to count in total
+
+    Taking the strongest overall would spend most of the budget on frame
+    edges and text every card shares, and leave none where a finger or
+    glare happens not to be.
+    """
+    columns, rows = KEYPOINT_GRID
+    width, height = CARD_SIZE
+    cells: Dict[int, list] = {}
+    for keypoint in sorted(keypoints, key=lambda kp: -kp.response):
+        x, y = keypoint.pt
+        cell = min(int(y * rows / height), rows - 1) * columns + min(int(x * columns / width), columns - 1)
+        cells.setdefault(cell, []).append(keypoint)
+
+    # Round-robin over the cells, strongest first within each
+    selected = []
+    depth = 0
+    while len(selected) < count and any(len(cell) > depth for cell in cells.values()):
+        for cell in cells.values():
+            if depth < len(cell) and len(selected) < count:
+                selected.append(cell[depth])
+        depth += 1
+    return selected
+
+
+def lsh_keys(descriptors: np.ndarray, bits: np.ndarray) -> np.ndarray:
+    """LSH keys of descriptors for one table (bits: descriptor bit positions)"""
+    unpacked = np.unpackbits(descriptors, axis=1)[:, bits]
+    return unpacked.astype(np.int64) @ (np.int64(1) << np.arange(len(bits), dtype=np.int64))
+
+
+class DescriptorIndex:
+    """
+    ORB descriptors of every artwork, with one LSH table set over them
+
+    Stored as a directory of .npy files that are memory-mapped, so the
+    index costs no startup time and only the pages queries touch stay in
+    memory. Rebuilt offline and swapped in; readers pick up the new index
+    on their next query.
+    """
+
+    def __init__(self, path: str = DESCRIPTOR_INDEX_DIR):
+        self.path = Path(path)
+        self._index: Optional[Dict[str, Any]] = None
+        self._loaded_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.queries = 0
+        self.matched = 0
+        self.seconds = 0.0
+
+    def _ensure_loaded(self) -> Optional[Dict[str, Any]]:
+        """Load the index on first use, and reload it after a rebuild"""
+        try:
+            mtime = (self.path / "meta.json").stat().st_mtime
+        except OSError:
+            return self._index
+
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                if mtime != self._loaded_mtime:
+                    try:
+                        meta = json.loads((self.path / "meta.json").read_text())
+                        load = lambda name: np.load(self.path / f"{name}.npy", mmap_mode='r')
+                        self._index = {
+                            "groups": meta['groups'],
+                            "descriptors": load("descriptors"),
+                            "points": load("points"),
+                            "row_groups": load("row_groups"),
+                            "bits": np.load(self.path / "bits.npy"),
+                            "offsets": load("offsets"),
+                            "rows": load("rows")
+                        }
+                        logger.info(
+                            f"Loaded descriptor index: {len(self._index['descriptors'])} descriptors "
+                            f"of {len(meta['groups'])} artworks"
+                        )
+                    except Exception as e:
+                        logger.error(f"Failed to load descriptor index {self.path}: {e}")
+                    self._loaded_mtime = mtime
+        return self._index
+
+    @property
+    def available(self) -> bool:
+        """Whether an index is loaded"""
+        return self._ensure_loaded() is not None
+
+    def _candidates(self, index: Dict[str, Any], descriptors: np.ndarray) -> tuple:
+        """(query descriptor, indexed row) pairs sharing an LSH bucket in any table"""
+        key_bits = index['bits'].shape[1]
+        flips = np.concatenate([[0], np.int64(1) << np.arange(key_bits, dtype=np.int64)])
+        queries, rows = [], []
+        for table, bits in enumerate(index['bits']):
+            probes = (lsh_keys(descriptors, bits)[:, None] ^ flips).ravel()
+            offsets = index['offsets'][table]
+            starts = offsets[probes].astype(np.int64)
+            lengths = np.minimum(offsets[probes + 1] - starts, LSH_MAX_BUCKET)
+            total = int(lengths.sum())
+            if not total:
+                continue
+            # Row positions of every probed bucket, concatenated
+            first = np.cumsum(lengths) - lengths
+            positions = np.repeat(starts - first, lengths) + np.arange(total)
+            queries.append(np.repeat(np.arange(len(probes)) // len(flips), lengths))
+            rows.append(np.asarray(index['rows'][table][positions], np.int64))
+
+        if not queries:
+            return np.zeros(0, np.int64), np.zeros(0, np.int64)
+        # Pairs found by several probes stay duplicated; deduplicating costs more than it saves
+        return np.concatenate(queries), np.concatenate(rows)
+
+    def match(self, card_image: np.ndarray) -> Optional[Dict[str, Any]]:
+        """
+        Identify a card image by keypoints
+
+        Args:
+            card_image: Detected card (BGR, any size and orientation)
+
+        Returns:
+            {"scryfall_id", "scryfall_ids", "inliers", "matches", "confidence"}
+            where scryfall_ids are all printings sharing the matched artwork,
+            or None if no artwork is geometrically confirmed
+        """
+        index = self._ensure_loaded()
+        if index is None:
+            return None
+
+        started = time.perf_counter()
+        try:
+            return self._match(index, card_image)
+        finally:
+            self.queries += 1
+            self.seconds += time.perf_counter() - started
+
+    def _match(self, index: Dict[str, Any], card_image: np.ndarray) -> Optional[Dict[str, Any]]:
+        """match() against a loaded index"""
+        points, descriptors = orb_features(card_image, QUERY_FEATURES)
+        queries, rows = self._candidates(index, descriptors)
+        if not len(rows):
+            return None
+
+        differences = descriptors[queries] ^ np.asarray(index['descriptors'][rows])
+        distances = _POPCOUNT16[differences.view(np.uint16)].sum(axis=1, dtype=np.int32)
+        groups = np.asarray(index['row_groups'][rows], np.int64)
+
+        # Best candidate per query descriptor...
+        order = np.argsort(queries * 512 + distances)
+        queries, rows, distances, groups = queries[order], rows[order], distances[order], groups[order]
+        firsts = np.flatnonzero(np.r_[True, queries[1:] != queries[:-1]])
+        best_of = np.repeat(firsts, np.diff(np.r_[firsts, len(queries)]))
+
+        # ...against the best candidate on any other artwork (ratio test)
+        second = np.full(len(descriptors), 257, np.int32)
+        other = groups != groups[best_of]
+        other_queries, other_first = np.unique(queries[other], return_index=True)
+        second[other_queries] = distances[other][other_first]
+
+        best_queries = queries[firsts]
+        accepted = (distances[firsts] <= MAX_HAMMING) & (distances[firsts] < RATIO * second[best_queries])
+        best_queries, best_rows, best_groups = best_queries[accepted], rows[firsts][accepted], groups[firsts][accepted]
+        if len(best_groups) < MIN_MATCHES:
+            return None
+
+        # Geometric verification of the artworks with the most matches
+        votes = np.bincount(best_groups)
+        best = None
+        for group in np.argsort(votes)[::-1][:VERIFY_GROUPS]:
+            if votes[group] < max(MIN_MATCHES, 4):  # A homography needs four points
+                break
+            selected = best_groups == group
+            source = np.asarray(index['points'][best_rows[selected]], np.float32)
+            target = points[best_queries[selected]]
+            homography, mask = cv2.findHomography(source, target, cv2.RANSAC, RANSAC_THRESHOLD)
+            inliers = int(mask.sum()) if homography is not None else 0
+            if inliers >= MIN_INLIERS and (best is None or inliers > best[1]):
+                best = (int(group), inliers, int(votes[group]))
+
+        if best is None:
+            return None
+        group, inliers, matches = best
+        self.matched += 1
+        scryfall_ids = index['groups'][group]
+        return {
+            "scryfall_id": scryfall_ids[0],
+            "scryfall_ids": scryfall_ids,
+            "inliers": inliers,
+            "matches": matches,
+            "confidence": round(100 * inliers / (inliers + MIN_INLIERS))
+        }
+
+    def build(self, groups: List[List[str]], points: List[np.ndarray], descriptors: List[np.ndarray]) -> int:
+        """
+        Write a new index and swap it in
+
+        Args:
+            groups: Scryfall IDs per artwork (the first is reported on a match)
+            points: Keypoint coordinates per artwork
+            descriptors: ORB descriptors per artwork
+
+        Returns:
+            Number of descriptors indexed
+        """
+        all_descriptors = np.concatenate(descriptors) if descriptors else np.zeros((0, 32), np.uint8)
+        total = len(all_descriptors)
+        key_bits = int(np.clip(round(np.log2(max(total, 1) / LSH_BUCKET_TARGET)), LSH_MIN_KEY_BITS, LSH_MAX_KEY_BITS))
+        rng = np.random.default_rng(0)
+        bits = np.stack([rng.choice(256, key_bits, replace=False) for _ in range(LSH_TABLES)]).astype(np.int64)
+
+        offsets = np.zeros((LSH_TABLES, (1 << key_bits) + 1), np.uint32)
+        rows = np.zeros((LSH_TABLES, total), np.uint32)
+        for table in range(LSH_TABLES):
+            # Chunked: unpacking every descriptor's bits at once takes 256 bytes each
+            keys = np.concatenate([
+                lsh_keys(all_descriptors[start:start + 1_000_000], bits[table])
+                for start in range(0, total, 1_000_000)
+            ]) if total else np.zeros(0, np.int64)
+            rows[table] = np.argsort(keys, kind='stable')
+            offsets[table, 1:] = np.cumsum(np.bincount(keys, minlength=1 << key_bits))
+
+        building = self.path.with_name(f"{self.path.name}.building")
+        shutil.rmtree(building, ignore_errors=True)
+        building.mkdir(parents=True)
+        np.save(building / "descriptors.npy", all_descriptors)
+        np.save(building / "points.npy", np.concatenate(points) if points else np.zeros((0, 2), np.float32))
+        np.save(building / "row_groups.npy", np.repeat(np.arange(len(descriptors), dtype=np.uint32), [len(d) for d in descriptors]))
+        np.save(building / "bits.npy", bits)
+        np.save(building / "offsets.npy", offsets)
+        np.save(building / "rows.npy", rows)
+        (building / "meta.json").write_text(json.dumps({"groups": groups, "key_bits": key_bits, "built_at": time.time()}))
+
+        # Swap directories; a query racing the swap just misses this stage
+        old = self.path.with_name(f"{self.path.name}.old")
+        shutil.rmtree(old, ignore_errors=True)
+        if self.path.exists():
+            os.replace(self.path, old)
+        os.replace(building, self.path)
+        shutil.rmtree(old, ignore_errors=True)
+
+        logger.info(f"✓ Descriptor index built: {total} descriptors of {len(groups)} artworks, {key_bits}-bit LSH keys")
+        return total
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size and match counters"""
+        index = self._index
+        return {
+            "artworks": len(index['groups']) if index else 0,
+            "descriptors": len(index['descriptors']) if index else 0,
+            "queries": self.queries,
+            "matched": self.matched,
+            "avg_ms": round(self.seconds / self.queries * 1000, 1) if self.queries else 0.0
+        }
+
+
+# Global index instance
+descriptor_index = DescriptorIndex()
+
+
+async def build_descriptor_index(limit: Optional[int] = None) -> int:
+    """
+    Build the descriptor index from the card store and image store
+
+    Printings are grouped by artwork, newest first; the newest printing's
+    image is indexed for the group.
+
+    Args:
+        limit: Index at most this many artworks (for testing)
+
+    Returns:
+        Number of descriptors indexed
+    """
+    groups: Dict[str, List[Dict[str, Any]]] = {}
+    for card in card_store.iter_cards():
+        if is_hashable(card):
+            groups.setdefault(artwork_key(card), []).append(card)
+    printings = [
+        sorted(cards, key=lambda c: c.get('released_at') or "", reverse=True)
+        for cards in groups.values()
+    ][:limit]
+    logger.info(f"Indexing keypoints of {len(printings)} artworks...")
+
+    def extract(images):
+        results = []
+        for data in images:
+            image = cv2.imdecode(np.frombuffer(data, np.uint8), cv2.IMREAD_COLOR) if data else None
+            results.append(orb_features(image, FEATURES_PER_CARD) if image is not None else None)
+        return results
+
+    ids, all_points, all_descriptors = [], [], []
+    for chunk in chunked(printings, BUILD_CHUNK_SIZE):
+        images = await asyncio.gather(*(image_store.get(cards[0], IMAGE_VARIANT) for cards in chunk))
+        for cards, features in zip(chunk, await asyncio.to_thread(extract, images)):
+            if features is not None and len(features[1]):
+                ids.append([card['id'] for card in cards])
+                all_points.append(features[0])
+                all_descriptors.append(features[1])
+
+    return await asyncio.to_thread(descriptor_index.build, ids, all_points, all_descriptors)
+
+
+def main():
+    """Main entry point"""
+    import argparse
+    from rate_limiter import background_priority
+    from scryfall_integration import close_http_client
+
+    parser = argparse.ArgumentParser(description="Build the ORB descriptor index")
+    parser.add_argument('--limit', type=int, help='Index at most this many artworks')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    async def run():
+        try:
+            await build_descriptor_index(args.limit)
+        finally:
+            await close_http_client()
+
+    with background_priority():
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,46 +1,17 @@
 """
 Google Gemini Vision API integration for card identification
 """
-import os
 import base64
 import json
 import logging
-from typing import List, Dict, Any
-import google.generativeai as genai
+from typing import List, Dict, Any, Optional
 
-logger = logging.getLogger(__name__)
-
-def _get_gemini_client():
-    """Lazy initialization of Gemini client"""
-    api_key = os.getenv("GEMINI_API_KEY")
-    if not api_key:
-        raise ValueError("GEMINI_API_KEY environment variable is not set")
-    genai.configure(api_key=api_key)
-    return genai.GenerativeModel('gemini-2.0-flash-exp')
-
-def identify_cards_with_gemini(image_data: bytes) -> List[Dict[str, Any]]:
-    """
-    Identify Magic: The Gathering cards using Google Gemini Vision API
+from provider_registry import provider_registry
 
-    Args:
-        image_data: Raw image bytes
-
-    Returns:
-        List of identified cards with name, set, collector_number, and confidence
-    """
-    try:
-        logger.info("Sending image to Gemini Vision API...")
-
-        # Get Gemini client (lazy initialization)
-        model = _get_gemini_client()
-
-        # Prepare image for Gemini
-        import PIL.Image
-        import io
-        image = PIL.Image.open(io.BytesIO(image_data))
+logger = logging.getLogger(__name__)
 
-        # Create prompt
-        prompt = """You are analyzing a Magic: The Gathering card photo.
+# Instructions sent with each photo
+IDENTIFY_PROMPT = """You are analyzing a Magic: The Gathering card photo.
 
 CRITICAL: Read the EXACT card name from the card itself - do not guess or infer.
 
@@ -64,6 +35,38 @@ Confidence should be: "high", "medium", or "low" based on image quality.
 
 Return ONLY the JSON array, no other text."""
 
+def identify_cards_with_gemini(
+    image_data: bytes,
+    raise_errors: bool = False,
+    prompt: Optional[str] = None
+) -> List[Dict[str, Any]]:
+    """
+    Identify Magic: The Gathering cards using Google Gemini Vision API
+
+    Args:
+        image_data: Raw image bytes
+        raise_errors: Raise on failure instead of returning [] (so callers
+            can tell a failed call from an image without cards)
+        prompt: Instructions to send instead of IDENTIFY_PROMPT (same JSON
+            array answer)
+
+    Returns:
+        List of identified cards with name, set, collector_number, and confidence
+    """
+    try:
+        logger.info("Sending image to Gemini Vision API...")
+
+        # Shared Gemini model (configured on first use)
+        model = provider_registry.gemini()
+
+        # Prepare image for Gemini
+        import PIL.Image
+        import io
+        image = PIL.Image.open(io.BytesIO(image_data))
+
+        # Create prompt
+        prompt = prompt or IDENTIFY_PROMPT
+
         # Call Gemini Vision API
         response = model.generate_content([prompt, image])
 
@@ -87,4 +90,6 @@ Return ONLY the JSON array, no other text."""
 
     except Exception as e:
         logger.error(f"Error identifying cards with Gemini Vision: {str(e)}")
+        if raise_errors:
+            raise
         return []
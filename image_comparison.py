@@ -1,39 +1,111 @@
 """
 Image comparison utilities for matching photographed cards with Scryfall images
+
+Editions are picked locally where possible: the card is cropped out of the
+photo and compared against each candidate printing's cached Scryfall image
+by region hashes, color histogram and ORB keypoints. Claude is only asked
+when the local ranking is too close to call.
 """
 import os
+import asyncio
 import base64
+import json
 import logging
+import threading
+from collections import OrderedDict
 from typing import List, Dict, Any, Optional
-import httpx
-from anthropic import Anthropic
+
+import cv2
+import numpy as np
+
+from card_detection import detect_cards_from_image
+from image_store import image_store, image_url
+from provider_registry import provider_registry, CLAUDE_MODEL
+from set_symbol_index import set_symbol_index
 
 logger = logging.getLogger(__name__)
 
+# Local decision thresholds (weighted similarity, 0-1)
+EDITION_MIN_SCORE = float(os.getenv("EDITION_MIN_SCORE", "0.7"))  # Best candidate must score this...
+EDITION_MARGIN = float(os.getenv("EDITION_MARGIN", "0.025"))  # ...and lead the runner-up by this much
+EDITION_MAX_CANDIDATES = int(os.getenv("EDITION_MAX_CANDIDATES", "60"))  # Newest printings compared
+LLM_CANDIDATES = 4  # Leading candidates shown to Claude when the ranking is ambiguous
+
+# Scryfall 'normal' images are 488x680; photo crops are warped to match
+CARD_SIZE = (488, 680)
+THUMBNAIL_SIZE = (244, 340)
+
+# Hashed regions as (x0, y0, x1, y1) fractions of the card
+REGIONS = {
+    'art': (0.08, 0.11, 0.92, 0.55),
+    'type_line': (0.05, 0.55, 0.95, 0.63),  # Includes the set symbol
+    'text': (0.08, 0.63, 0.92, 0.90),
+    'bottom': (0.0, 0.90, 1.0, 1.0)  # Collector line and frame edge
+}
+
+COMPONENT_WEIGHTS = {
+    'art': 0.1, 'type_line': 0.15, 'text': 0.1, 'bottom': 0.15,
+    'color': 0.1, 'frame_color': 0.15, 'orb': 0.25
+}
+
+# Cheap components that depend on the artwork rather than the frame; they
+# decide which card in a multi-card photo a comparison is about
+ART_COMPONENTS = ('art', 'color')
+
+HISTOGRAM_BINS = [16, 8]  # Hue, saturation
+ORB_FEATURES = 500
+ORB_RATIO = 0.75  # Lowe's ratio test
+ORB_FULL_MATCH_FRACTION = 0.5  # Fraction of keypoints matched that counts as a perfect score
+
+FEATURE_CACHE_SIZE = 512  # Candidate images kept as features
+
+# Claude comparison prompt; {intro}, {candidates} and {count} are filled per call
+COMPARE_INTRO_THUMBNAILS = "I will show you the photographed card first, then the Scryfall image of each candidate (labelled with its number)."
+COMPARE_INTRO_TEXT = "I will show you the photographed card first, then describe the candidate matches."
+COMPARE_PROMPT = """You are comparing a photographed Magic: The Gathering card with potential matches from Scryfall.
+
+{intro}
+
+Your task: Identify which candidate card BEST matches the photographed card based on:
+1. Visual appearance (artwork, frame style, colors)
+2. Set symbol (if visible)
+3. Collector number (if visible at bottom of card)
+4. Card frame/border style
+5. Special treatments (foil, showcase, borderless, etc.)
+
+Photographed card is shown in the first image.
+
+Candidate cards:
+{candidates}
+
+Return ONLY a JSON object with this format:
+{{
+  "best_match_index": <number 1-{count}>,
+  "confidence": "<high|medium|low>",
+  "reasoning": "<brief explanation of why this match was chosen>"
+}}
 
-async def download_image(url: str) -> Optional[bytes]:
+If none of the candidates match well, return best_match_index: 0 with low confidence."""
+
+
+async def download_image(card: Dict[str, Any], variant: str = "normal") -> Optional[bytes]:
     """
-    Download an image from a URL
+    Get a card's Scryfall image (read through the shared image store)
 
     Args:
-        url: Image URL
+        card: Scryfall card object
+        variant: Image variant (small, normal, art_crop, ...)
 
     Returns:
-        Image bytes or None if download fails
+        Image bytes or None if the card has no image or the download fails
     """
-    try:
-        async with httpx.AsyncClient() as client:
-            response = await client.get(url, timeout=10.0)
-            response.raise_for_status()
-            return response.content
-    except Exception as e:
-        logger.error(f"Failed to download image from {url}: {e}")
-        return None
+    return await image_store.get(card, variant)
 
 
 def compare_cards_with_vision(
     user_image: bytes,
-    candidate_cards: List[Dict[str, Any]]
+    candidate_cards: List[Dict[str, Any]],
+    candidate_images: Optional[List[Optional[bytes]]] = None
 ) -> Optional[Dict[str, Any]]:
     """
     Use Claude Vision to compare user's photo with candidate Scryfall images
@@ -42,6 +114,8 @@ def compare_cards_with_vision(
     Args:
         user_image: User's photographed card (bytes)
         candidate_cards: List of candidate card objects from Scryfall
+        candidate_images: Optional JPEG thumbnail per candidate, shown to the
+            model after the photo
 
     Returns:
         Best matching card object or None
@@ -49,14 +123,13 @@ def compare_cards_with_vision(
     try:
         logger.info(f"Comparing user image with {len(candidate_cards)} candidate cards using Claude Vision...")
 
-        # Get Anthropic client
-        api_key = os.getenv("ANTHROPIC_API_KEY")
-        if not api_key:
+        # Shared Anthropic client (created on first use)
+        try:
+            client = provider_registry.anthropic()
+        except ValueError:
             logger.error("ANTHROPIC_API_KEY not set")
             return None
 
-        client = Anthropic(api_key=api_key)
-
         # Encode user image
         user_image_base64 = base64.b64encode(user_image).decode('utf-8')
 
@@ -74,30 +147,12 @@ def compare_cards_with_vision(
             for i, card in enumerate(candidate_cards)
         ])
 
-        prompt = f"""You are comparing a photographed Magic: The Gathering card with potential matches from Scryfall.
-
-I will show you the photographed card first, then describe the candidate matches.
-
-Your task: Identify which candidate card BEST matches the photographed card based on:
-1. Visual appearance (artwork, frame style, colors)
-2. Set symbol (if visible)
-3. Collector number (if visible at bottom of card)
-4. Card frame/border style
-5. Special treatments (foil, showcase, borderless, etc.)
-
-Photographed card is shown in the first image.
-
-Candidate cards:
-{candidates_text}
-
-Return ONLY a JSON object with this format:
-{{
-  "best_match_index": <number 1-{len(candidate_cards)}>,
-  "confidence": "<high|medium|low>",
-  "reasoning": "<brief explanation of why this match was chosen>"
-}}
-
-If none of the candidates match well, return best_match_index: 0 with low confidence."""
+        has_thumbnails = bool(candidate_images) and any(candidate_images)
+        prompt = COMPARE_PROMPT.format(
+            intro=COMPARE_INTRO_THUMBNAILS if has_thumbnails else COMPARE_INTRO_TEXT,
+            candidates=candidates_text,
+            count=len(candidate_cards)
+        )
 
         # Create message content with user image
         message_content = [
@@ -108,16 +163,32 @@ If none of the candidates match well, return best_match_index: 0 with low confid
                     "media_type": media_type,
                     "data": user_image_base64,
                 },
-            },
-            {
-                "type": "text",
-                "text": prompt
             }
         ]
 
+        # Candidate thumbnails, each preceded by its label
+        if has_thumbnails:
+            for i, thumbnail in enumerate(candidate_images):
+                if not thumbnail:
+                    continue
+                message_content.append({"type": "text", "text": f"Candidate {i+1}:"})
+                message_content.append({
+                    "type": "image",
+                    "source": {
+                        "type": "base64",
+                        "media_type": "image/jpeg",
+                        "data": base64.b64encode(thumbnail).decode('utf-8'),
+                    },
+                })
+
+        message_content.append({
+            "type": "text",
+            "text": prompt
+        })
+
         # Call Claude Vision
         response = client.messages.create(
-            model="claude-sonnet-4-5-20250929",
+            model=CLAUDE_MODEL,
             max_tokens=500,
             messages=[
                 {
@@ -130,9 +201,6 @@ If none of the candidates match well, return best_match_index: 0 with low confid
         response_text = response.content[0].text
         logger.info(f"Claude Vision comparison response: {response_text}")
 
-        # Parse JSON response
-        import json
-
         # Extract JSON from response
         if "```json" in response_text:
             json_str = response_text.split("```json")[1].split("```")[0].strip()
@@ -159,3 +227,395 @@ If none of the candidates match well, return best_match_index: 0 with low confid
     except Exception as e:
         logger.error(f"Error in vision-based comparison: {e}")
         return None
+
+
+class VisualFeatures:
+    """Comparison features of one card image (warped to CARD_SIZE)"""
+
+    __slots__ = ('region_hashes', 'histograms', 'descriptors')
+
+    def __init__(self, card_image: np.ndarray):
+        gray = cv2.cvtColor(card_image, cv2.COLOR_BGR2GRAY)
+        width, height = CARD_SIZE
+        self.region_hashes = {}
+        for region, (x0, y0, x1, y1) in REGIONS.items():
+            crop = gray[int(y0 * height):int(y1 * height), int(x0 * width):int(x1 * width)]
+            self.region_hashes[region] = difference_hash(crop)
+
+        # Hue/saturation only, so lighting matters less than actual color
+        x0, y0, x1, y1 = REGIONS['art']
+        hsv = cv2.cvtColor(card_image, cv2.COLOR_BGR2HSV)
+        art = hsv[int(y0 * height):int(y1 * height), int(x0 * width):int(x1 * width)]
+        self.histograms = {'color': color_histogram(art), 'frame_color': color_histogram(hsv)}
+
+        # Keypoints from the art only: text and frame are the same across printings
+        _, self.descriptors = _orb().detectAndCompute(gray[int(y0 * height):int(y1 * height), int(x0 * width):int(x1 * width)], None)
+
+
+def color_histogram(hsv: np.ndarray) -> np.ndarray:
+    """Normalized hue/saturation histogram of an HSV image region"""
+    histogram = cv2.calcHist([hsv], [0, 1], None, HISTOGRAM_BINS, [0, 180, 0, 256])
+    return cv2.normalize(histogram, None).flatten()
+
+
+def difference_hash(gray: np.ndarray, hash_size: int = 8) -> np.ndarray:
+    """
+    Difference hash of a grayscale region
+
+    Args:
+        gray: Grayscale image region
+        hash_size: Hash is hash_size x hash_size bits
+
+    Returns:
+        Boolean array of hash bits
+    """
+    resized = cv2.resize(gray, (hash_size + 1, hash_size), interpolation=cv2.INTER_AREA)
+    return (resized[:, 1:] > resized[:, :-1]).flatten()
+
+
+_orb_local = threading.local()
+
+
+def _orb():
+    """ORB detector (one per thread; OpenCV detectors aren't thread-safe)"""
+    detector = getattr(_orb_local, 'detector', None)
+    if detector is None:
+        detector = _orb_local.detector = cv2.ORB_create(nfeatures=ORB_FEATURES)
+    return detector
+
+
+def decode_card_image(image_data: bytes) -> Optional[np.ndarray]:
+    """Decode an image and resize it to CARD_SIZE (None if undecodable)"""
+    image = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    return cv2.resize(image, CARD_SIZE, interpolation=cv2.INTER_AREA)
+
+
+def user_card_crops(image_data: bytes) -> List[List[np.ndarray]]:
+    """
+    Perspective-corrected card crops from a user photo
+
+    Args:
+        image_data: Photo bytes
+
+    Returns:
+        One list per detected card: its warped crop and the crop turned 180
+        degrees (detection's upside-down guess is a brightness heuristic).
+        When at most one card was detected, the whole photo is added to the
+        first list (a close-up is often the card itself).
+    """
+    cards = []
+    for crop in detect_cards_from_image(image_data):
+        crop = cv2.resize(crop, CARD_SIZE, interpolation=cv2.INTER_AREA)
+        cards.append([crop, cv2.rotate(crop, cv2.ROTATE_180)])
+    if len(cards) <= 1:
+        whole = decode_card_image(image_data)
+        if whole is not None:
+            if cards:
+                cards[0].append(whole)
+            else:
+                cards.append([whole])
+    return cards
+
+
+class ScanPhoto:
+    """
+    A user photo's detected cards, shared by every card of one scan
+
+    Cards are detected (and their features computed) once, on first use,
+    however many identified cards need an edition comparison. Each
+    detected card is claimed by the identified card it is compared
+    against, so in a multi-card photo two identified cards aren't both
+    matched against the same crop while another crop goes unused.
+    """
+
+    def __init__(self, image_data: bytes):
+        self.image_data = image_data
+        self._cards: Optional[List[List[tuple]]] = None
+        self._claims: Dict[int, Any] = {}  # Detected card -> identified card it was claimed by
+        self._matched: Dict[Any, np.ndarray] = {}  # Identified card -> crop its candidates were ranked against
+        self._lock = threading.Lock()
+
+    def cards(self) -> List[List[tuple]]:
+        """
+        Detected cards as lists of (crop, VisualFeatures), one per orientation
+
+        Detection runs on the first call; concurrent callers wait for it
+        """
+        with self._lock:
+            if self._cards is None:
+                self._cards = [
+                    [(crop, VisualFeatures(crop)) for crop in orientations]
+                    for orientations in user_card_crops(self.image_data)
+                ]
+            return self._cards
+
+    def claim(self, ranked: List[int], owner: Any) -> Optional[int]:
+        """
+        Claim the first detected card in `ranked` no other owner holds
+
+        Args:
+            ranked: Detected card numbers, best match first
+            owner: Who claims (e.g. the identified card's index)
+
+        Returns:
+            The claimed card number - or, if every one is taken, the best
+            one unclaimed (None only if `ranked` is empty)
+        """
+        with self._lock:
+            for number in ranked:
+                if self._claims.get(number, owner) == owner:
+                    self._claims[number] = owner
+                    return number
+        return ranked[0] if ranked else None
+
+    def record_match(self, owner: Any, crop: np.ndarray) -> None:
+        """Remember the crop (and orientation) an identified card was ranked against"""
+        with self._lock:
+            self._matched[owner] = crop
+
+    def matched_image(self, owner: Any) -> bytes:
+        """
+        Image to show the LLM for an identified card
+
+        Returns:
+            JPEG of the crop its candidates were ranked against, or the
+            whole photo if none was chosen
+        """
+        with self._lock:
+            crop = self._matched.get(owner)
+        if crop is not None:
+            ok, encoded = cv2.imencode(".jpg", crop, [cv2.IMWRITE_JPEG_QUALITY, 90])
+            if ok:
+                return encoded.tobytes()
+        return self.image_data
+
+
+def compare_features(photo: VisualFeatures, candidate: VisualFeatures, keypoints: bool = True) -> Dict[str, float]:
+    """
+    Per-component similarity (0-1) of a photo crop and a candidate image
+
+    Args:
+        photo: Features of the user's crop
+        candidate: Features of the candidate's Scryfall image
+        keypoints: Include ORB keypoint matching (the expensive part)
+
+    Returns:
+        Similarity per region hash, color histogram and (optionally) ORB keypoints
+    """
+    components = {
+        region: 1.0 - np.count_nonzero(photo.region_hashes[region] != candidate.region_hashes[region]) / photo.region_hashes[region].size
+        for region in REGIONS
+    }
+    for name, histogram in photo.histograms.items():
+        components[name] = max(0.0, 1.0 - cv2.compareHist(histogram, candidate.histograms[name], cv2.HISTCMP_BHATTACHARYYA))
+    if not keypoints:
+        return components
+
+    good = 0
+    if photo.descriptors is not None and candidate.descriptors is not None and len(candidate.descriptors) >= 2:
+        matcher = cv2.BFMatcher(cv2.NORM_HAMMING)
+        for pair in matcher.knnMatch(photo.descriptors, candidate.descriptors, k=2):
+            if len(pair) == 2 and pair[0].distance < ORB_RATIO * pair[1].distance:
+                good += 1
+        components['orb'] = min(1.0, good / (min(len(photo.descriptors), len(candidate.descriptors)) * ORB_FULL_MATCH_FRACTION))
+    else:
+        components['orb'] = 0.0
+    return components
+
+
+def weighted_score(components: Dict[str, float]) -> float:
+    """Weighted similarity over the components present"""
+    return sum(COMPONENT_WEIGHTS[name] * value for name, value in components.items())
+
+
+def art_similarity(components: Dict[str, float]) -> float:
+    """Similarity of the art alone (hash and colors), which tells one card from another"""
+    return sum(COMPONENT_WEIGHTS[name] * components[name] for name in ART_COMPONENTS) / sum(
+        COMPONENT_WEIGHTS[name] for name in ART_COMPONENTS
+    )
+
+
+class EditionMatcher:
+    """
+    Picks the printing in a photo from a card's candidate printings
+
+    Candidates are ranked locally against their cached Scryfall images;
+    only when the best two are too close to call (or the best is a weak
+    match) is Claude asked - with the top candidates' images attached.
+    """
+
+    def __init__(self, margin: float = EDITION_MARGIN, min_score: float = EDITION_MIN_SCORE):
+        self.margin = margin
+        self.min_score = min_score
+        self._features: "OrderedDict[tuple, VisualFeatures]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.local_decisions = 0
+        self.llm_consults = 0
+        self.undecided = 0
+
+    def _candidate_features(self, card: Dict[str, Any], image_data: bytes) -> Optional[VisualFeatures]:
+        """Features of a candidate image (memoized by card and image version)"""
+        key = (card['id'], image_url(card))
+        with self._lock:
+            features = self._features.get(key)
+            if features is not None:
+                self._features.move_to_end(key)
+                return features
+
+        image = decode_card_image(image_data)
+        if image is None:
+            return None
+        features = VisualFeatures(image)
+        with self._lock:
+            self._features[key] = features
+            while len(self._features) > FEATURE_CACHE_SIZE:
+                self._features.popitem(last=False)
+        return features
+
+    def rank(
+        self,
+        photo: ScanPhoto,
+        candidates: List[Dict[str, Any]],
+        candidate_images: List[Optional[bytes]],
+        owner: Any = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Rank candidates by visual similarity to the photo (CPU-bound)
+
+        The detected card (and orientation) whose art best matches any
+        candidate is taken to be the card in question; the art is what
+        differs between cards, while frames and type lines look alike.
+        Cards already claimed by another identified card of the same photo
+        are passed over. When the set symbol confidently matches one
+        set's template, only that set's printings are ranked.
+
+        Args:
+            photo: The scan's photo
+            candidates: Candidate printings
+            candidate_images: Scryfall image per candidate (None if unavailable)
+            owner: Identified card the comparison is for (claims its crop)
+
+        Returns:
+            Ranked candidates: {"card", "score", "margin", "components"},
+            where margin is the lead over the next candidate
+        """
+        scored = [
+            (card, features)
+            for card, data in zip(candidates, candidate_images)
+            if data and (features := self._candidate_features(card, data)) is not None
+        ]
+        if not scored:
+            return []
+
+        # Pick the detected card and orientation by art on the cheap components first...
+        by_card = []  # (art similarity, detected card number, (crop, features))
+        for number, orientations in enumerate(photo.cards()):
+            for crop, features in orientations:
+                similarity = max(art_similarity(compare_features(features, candidate, keypoints=False)) for _, candidate in scored)
+                by_card.append((similarity, number, (crop, features)))
+        if not by_card:
+            return []
+
+        by_card.sort(key=lambda entry: entry[0], reverse=True)
+        number = photo.claim(list(dict.fromkeys(entry[1] for entry in by_card)), owner)
+        best_crop, best_photo = next(entry[2] for entry in by_card if entry[1] == number)
+        photo.record_match(owner, best_crop)
+
+        # The set symbol usually settles the set, leaving only that set's
+        # printings (variants, promos) for the slower comparison
+        if len({card.get('set') for card, _ in scored}) > 1:
+            kept = {card['id'] for card in set_symbol_index.narrow(best_crop, [card for card, _ in scored])}
+            scored = [(card, features) for card, features in scored if card['id'] in kept]
+
+        # ...then rank every candidate against it with keypoints too
+        best = []
+        for card, features in scored:
+            components = compare_features(best_photo, features)
+            best.append({
+                "card": card,
+                "score": round(weighted_score(components), 4),
+                "components": {name: round(float(value), 3) for name, value in components.items()}
+            })
+        best.sort(key=lambda r: r['score'], reverse=True)
+
+        for i, result in enumerate(best):
+            following = best[i + 1]['score'] if i + 1 < len(best) else 0.0
+            result['margin'] = round(result['score'] - following, 4)
+        return best
+
+    async def choose(
+        self,
+        photo: ScanPhoto,
+        candidates: List[Dict[str, Any]],
+        owner: Any = None
+    ) -> Optional[Dict[str, Any]]:
+        """
+        Pick the printing in the photo
+
+        Args:
+            photo: The scan's photo (shared by its cards, so detection runs once)
+            candidates: Candidate printings (newest first)
+            owner: Identified card the comparison is for (see rank())
+
+        Returns:
+            Best matching card object, or None if no confident match
+        """
+        candidates = candidates[:EDITION_MAX_CANDIDATES]
+        candidate_images = await asyncio.gather(*(image_store.get(card) for card in candidates))
+        ranked = await asyncio.to_thread(self.rank, photo, candidates, list(candidate_images), owner)
+
+        if ranked:
+            top = ranked[0]
+            logger.info(
+                f"Local edition ranking: {top['card']['set'].upper()}/{top['card'].get('collector_number')} "
+                f"score {top['score']:.3f}, margin {top['margin']:.3f} over {len(ranked) - 1} others"
+            )
+            if top['score'] >= self.min_score and top['margin'] >= self.margin:
+                self.local_decisions += 1
+                return top['card']
+
+        # Too close to call locally: show Claude the leading candidates
+        self.llm_consults += 1
+        shortlist = ranked[:LLM_CANDIDATES] if ranked else [{"card": card} for card in candidates[:LLM_CANDIDATES]]
+        images = {card['id']: data for card, data in zip(candidates, candidate_images)}
+        thumbnails = await asyncio.to_thread(
+            lambda: [make_thumbnail(images.get(r['card']['id'])) for r in shortlist]
+        )
+        # Show the card that was matched, not the whole (possibly multi-card) photo
+        user_image = await asyncio.to_thread(photo.matched_image, owner)
+        choice = await asyncio.to_thread(
+            compare_cards_with_vision, user_image, [r['card'] for r in shortlist], thumbnails
+        )
+        if choice is None:
+            self.undecided += 1
+        return choice
+
+    def stats(self) -> Dict[str, Any]:
+        """How often editions were decided locally vs. by the LLM"""
+        decisions = self.local_decisions + self.llm_consults
+        return {
+            "local_decisions": self.local_decisions,
+            "llm_consults": self.llm_consults,
+            "undecided": self.undecided,
+            "local_rate": round(self.local_decisions / decisions, 3) if decisions else 0.0,
+            "cached_features": len(self._features)
+        }
+
+
+def make_thumbnail(image_data: Optional[bytes]) -> Optional[bytes]:
+    """Downscaled JPEG of a candidate image for the LLM (None if unavailable)"""
+    if not image_data:
+        return None
+    image = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+    if image is None:
+        return None
+    ok, encoded = cv2.imencode(".jpg", cv2.resize(image, THUMBNAIL_SIZE, interpolation=cv2.INTER_AREA), [cv2.IMWRITE_JPEG_QUALITY, 85])
+    return encoded.tobytes() if ok else None
+
+
+# Global matcher instance
+edition_matcher = EditionMatcher()
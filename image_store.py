@@ -0,0 +1,294 @@
+"""
+Card Image Store
+On-disk store of Scryfall card images shared by every component that needs
+them (hash database builds, edition comparison), so each image crosses the
+network once
+
+Images are keyed by Scryfall ID, variant (small/normal/large/png/art_crop/
+border_crop) and the image version Scryfall puts in every image URI, so a
+replaced scan is fetched again while an unchanged one never is.
+"""
+
+import asyncio
+import hashlib
+import itertools
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from scryfall_integration import get_http_client
+
+logger = logging.getLogger(__name__)
+
+# Store configuration (overridable through the environment)
+IMAGE_STORE_DIR = os.getenv("IMAGE_STORE_DIR", str(Path(__file__).parent / "cache" / "images"))
+IMAGE_STORE_MAX_MB = float(os.getenv("IMAGE_STORE_MAX_MB", "8192"))  # ~100k 'normal' images
+IMAGE_PREFETCH_CONCURRENCY = int(os.getenv("IMAGE_PREFETCH_CONCURRENCY", "8"))  # Downloads in flight
+
+IMAGE_VARIANTS = ('small', 'normal', 'large', 'png', 'art_crop', 'border_crop')
+IMAGE_VARIANT = "normal"  # Variant the card indexes (hash database, descriptors) are built from
+
+# Eviction trims the store to this fraction of its budget, so it doesn't
+# run again on the very next write
+EVICT_TO_FRACTION = 0.9
+
+
+def image_url(card: Dict[str, Any], variant: str = "normal") -> Optional[str]:
+    """
+    Image URL of a card (front face for multi-faced cards)
+
+    Args:
+        card: Scryfall card object
+        variant: Image variant
+
+    Returns:
+        URL, or None if the card has no image
+    """
+    if 'image_uris' in card:
+        return card['image_uris'].get(variant)
+    faces = card.get('card_faces') or []
+    if faces and 'image_uris' in faces[0]:
+        return faces[0]['image_uris'].get(variant)
+    return None
+
+
+def is_hashable(card: Dict[str, Any], skip_tokens: bool = True) -> bool:
+    """Whether a card belongs in the image-based indexes"""
+    # Skip tokens if requested
+    if skip_tokens and card.get('layout') == 'token':
+        return False
+    # Skip cards without images
+    return image_url(card, IMAGE_VARIANT) is not None
+
+
+def chunked(items: Iterable[Any], size: int) -> Iterable[List[Any]]:
+    """Split an iterable into lists of up to `size` items"""
+    iterator = iter(items)
+    while True:
+        chunk = list(itertools.islice(iterator, size))
+        if not chunk:
+            return
+        yield chunk
+
+
+class ImageStore:
+    """
+    Size-bounded directory of card images
+
+    Writes go to a temporary file that is renamed into place, so readers
+    never see a partial image. When the store grows past its budget the
+    least recently used images (by mtime, which reads refresh) are evicted.
+    Concurrent requests for the same image share one download.
+    """
+
+    def __init__(
+        self,
+        root: str = IMAGE_STORE_DIR,
+        max_bytes: int = int(IMAGE_STORE_MAX_MB * 1024 * 1024),
+        concurrency: int = IMAGE_PREFETCH_CONCURRENCY
+    ):
+        self.root = Path(root)
+        self.max_bytes = max_bytes
+        self.concurrency = concurrency
+        self._lock = threading.Lock()
+        self._used_bytes: Optional[int] = None  # Scanned from disk on first write
+        self._downloads: Dict[Path, asyncio.Future] = {}
+        self._semaphore: Optional[asyncio.Semaphore] = None
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+        self.failures = 0
+        self.bytes_downloaded = 0
+        self.evicted = 0
+
+    def path_for(self, scryfall_id: str, url: str, variant: str = "normal") -> Path:
+        """
+        Location of an image in the store
+
+        Args:
+            scryfall_id: Scryfall UUID
+            url: Image URL (its version query string is part of the key)
+            variant: Image variant
+
+        Returns:
+            Path (which may not exist yet)
+        """
+        version = hashlib.blake2b(url.encode(), digest_size=6).hexdigest()
+        extension = Path(url.split("?", 1)[0]).suffix or ".jpg"
+        return self.root / variant / scryfall_id[:2] / f"{scryfall_id}-{version}{extension}"
+
+    async def get(self, card: Dict[str, Any], variant: str = "normal") -> Optional[bytes]:
+        """
+        Image bytes of a card, downloading it on first use
+
+        Args:
+            card: Scryfall card object
+            variant: Image variant
+
+        Returns:
+            Image bytes, or None if the card has no image or the download failed
+        """
+        url = image_url(card, variant)
+        if not url:
+            return None
+        path = self.path_for(card['id'], url, variant)
+
+        data = await asyncio.to_thread(self._read, path)
+        if data is not None:
+            self.hits += 1
+            return data
+
+        self.misses += 1
+        download = self._downloads.get(path)
+        if download is None:
+            download = asyncio.ensure_future(self._download(url, path))
+            self._downloads[path] = download
+            download.add_done_callback(lambda _: self._downloads.pop(path, None))
+        # Shield so one caller's cancellation doesn't cancel the shared download
+        return await asyncio.shield(download)
+
+    async def prefetch(self, cards: Iterable[Dict[str, Any]], variant: str = "normal") -> Dict[str, int]:
+        """
+        Make sure the images of many cards are stored
+
+        Args:
+            cards: Scryfall card objects
+            variant: Image variant
+
+        Returns:
+            Counts: {"cached", "downloaded", "failed"}
+        """
+        counts = {"cached": 0, "downloaded": 0, "failed": 0}
+
+        async def fetch(card):
+            url = image_url(card, variant)
+            if not url:
+                return
+            if await asyncio.to_thread(self.path_for(card['id'], url, variant).exists):
+                counts["cached"] += 1
+            elif await self.get(card, variant) is not None:
+                counts["downloaded"] += 1
+            else:
+                counts["failed"] += 1
+
+        await asyncio.gather(*(fetch(card) for card in cards))
+        return counts
+
+    def _read(self, path: Path) -> Optional[bytes]:
+        """Read a stored image, marking it recently used"""
+        try:
+            data = path.read_bytes()
+        except OSError:
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    async def _download(self, url: str, path: Path) -> Optional[bytes]:
+        """Download an image into the store (at most `concurrency` at a time)"""
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+
+        async with self._semaphore:
+            try:
+                response = await get_http_client().get(url, timeout=30.0)
+                response.raise_for_status()
+                data = response.content
+            except Exception as e:
+                self.failures += 1
+                logger.error(f"Failed to download image from {url}: {e}")
+                return None
+
+        self.bytes_downloaded += len(data)
+        try:
+            await asyncio.to_thread(self._write, path, data)
+        except OSError as e:
+            logger.error(f"Failed to store image {path}: {e}")
+        return data
+
+    def _write(self, path: Path, data: bytes) -> None:
+        """Atomically store an image, dropping older versions of it"""
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = path.with_name(f"{path.name}.{os.getpid()}.{threading.get_ident()}.part")
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+
+        freed = 0
+        scryfall_id = path.name.rsplit("-", 1)[0]
+        for old in path.parent.glob(f"{scryfall_id}-*"):
+            if old != path and not old.name.endswith(".part"):
+                try:
+                    freed += old.stat().st_size
+                    old.unlink()
+                except OSError:
+                    pass
+
+        with self._lock:
+            if self._used_bytes is None:
+                self._used_bytes = self._scan()[0]
+            else:
+                self._used_bytes += len(data) - freed
+            if self._used_bytes > self.max_bytes:
+                self._evict()
+
+    def _scan(self) -> Tuple[int, list]:
+        """Total size and (mtime, size, path) of every stored image"""
+        total = 0
+        files = []
+        for directory, _, names in os.walk(self.root):
+            for name in names:
+                if name.endswith(".part"):
+                    continue
+                path = os.path.join(directory, name)
+                try:
+                    stat = os.stat(path)
+                except OSError:
+                    continue
+                total += stat.st_size
+                files.append((stat.st_mtime, stat.st_size, path))
+        return total, files
+
+    def _evict(self) -> None:
+        """Delete least recently used images until back under budget (lock held)"""
+        started = time.time()
+        total, files = self._scan()
+        target = self.max_bytes * EVICT_TO_FRACTION
+        evicted = 0
+        for _, size, path in sorted(files):
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            evicted += 1
+
+        self._used_bytes = total
+        self.evicted += evicted
+        logger.info(f"Image store evicted {evicted} images in {time.time() - started:.1f}s ({total / 1e6:.0f} MB kept)")
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss and download counters"""
+        lookups = self.hits + self.misses
+        return {
+            "used_mb": round(self._used_bytes / 1e6, 1) if self._used_bytes is not None else None,
+            "max_mb": round(self.max_bytes / 1e6, 1),
+            "hits": self.hits,
+            "misses": self.misses,
+            "failures": self.failures,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+            "mb_downloaded": round(self.bytes_downloaded / 1e6, 1),
+            "evicted": self.evicted
+        }
+
+
+# Global store instance
+image_store = ImageStore()
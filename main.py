@@ -3,22 +3,52 @@ MagicScanner Backend API
 FastAPI server for Magic card detection and recognition
 """
 
-from fastapi import FastAPI, File, UploadFile, HTTPException
+from fastapi import FastAPI, File, UploadFile, HTTPException, Header
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import JSONResponse
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
+import asyncio
 import logging
+import zipfile
 from datetime import datetime
 
-from claude_vision import identify_cards_with_vision
-from multi_vision import identify_cards_pro
-from scryfall_integration import get_card_details, get_card_prices, search_card_by_name, get_card_details_by_set, get_all_printings
-from image_comparison import compare_cards_with_vision
+from scryfall_integration import get_card_details, get_card_prices, get_request_stats, open_http_client, close_http_client
+from scan_cache import scan_cache
+from response_cache import response_cache
+from card_store import card_store
+from name_index import name_index
+from printings_index import printings_index
+from image_store import image_store
+from image_comparison import edition_matcher
+from set_symbol_index import set_symbol_index
+from descriptor_index import descriptor_index
+from multi_vision import provider_stats
+from mosaic_batcher import mosaic_batcher
+from provider_registry import provider_registry, PROVIDER_WARMUP
+from card_detection import detect_cards_from_image
+from card_matching import load_card_database, match_cards
+from scan_pipeline import scan_image, scan_batch, extract_zip_images, BATCH_MAX_IMAGES
+from deadline import parse_deadline, Deadline, SCAN_DEADLINE_SECONDS
+from scan_jobs import submit_job, get_job_queue, format_job, start_workers, stop_workers, check_callback_url, QueueFullError, CallbackURLError
 
 # Setup logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# Upload content types treated as zip archives by /scan/batch
+ZIP_CONTENT_TYPES = ("application/zip", "application/x-zip-compressed")
+
+# Perceptual hash database used by /identify-single (loaded on first use)
+CARD_DATABASE: Optional[Dict[str, Dict[str, Any]]] = None
+
+
+def get_card_database() -> Dict[str, Dict[str, Any]]:
+    """The card hash database, loaded from cache on first call"""
+    global CARD_DATABASE
+    if CARD_DATABASE is None:
+        CARD_DATABASE = load_card_database()
+    return CARD_DATABASE
+
 # Initialize FastAPI app
 app = FastAPI(
     title="MagicScanner API",
@@ -40,6 +70,24 @@ async def startup_event():
     """Startup event"""
     logger.info("MagicScanner API starting up...")
     logger.info("Using Claude Vision for card identification")
+    await open_http_client()
+    await start_workers()
+    # Build the name and printings indexes in the background; lookups use
+    # them once ready and pick up later card store syncs on their own
+    asyncio.get_running_loop().run_in_executor(None, name_index.load)
+    asyncio.get_running_loop().run_in_executor(None, printings_index.load)
+    # Import the provider SDKs and create their clients before the first scan needs them
+    if PROVIDER_WARMUP:
+        asyncio.get_running_loop().run_in_executor(None, provider_registry.warm_up)
+
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Shutdown event"""
+    await stop_workers()
+    await close_http_client()
+    provider_registry.close()
+    response_cache.flush()  # Commit queued Scryfall cache writes
 
 
 @app.get("/")
@@ -59,14 +107,53 @@ async def health_check():
     return {
         "status": "healthy",
         "vision_enabled": True,
+        "scan_cache": scan_cache.stats(),
+        "scryfall": get_request_stats(),
+        "card_store": card_store.stats(),
+        "name_index": name_index.stats(),
+        "printings_index": printings_index.stats(),
+        "image_store": image_store.stats(),
+        "edition_matcher": edition_matcher.stats(),
+        "set_symbol_index": set_symbol_index.stats(),
+        "descriptor_index": descriptor_index.stats(),
+        "vision_providers": provider_stats(),
+        "mosaic_batcher": mosaic_batcher.stats(),
+        "provider_clients": provider_registry.stats(),
         "timestamp": datetime.now().isoformat()
     }
 
 
+def request_deadline(
+    deadline: Optional[float],
+    header_value: Optional[str],
+    default: Optional[float] = SCAN_DEADLINE_SECONDS
+) -> Deadline:
+    """
+    Build the time budget for a request from the query param or header
+
+    Args:
+        deadline: ?deadline= query param (seconds)
+        header_value: X-Scan-Deadline header (seconds)
+        default: Budget when neither is given (None = unbounded)
+
+    Returns:
+        Deadline for the request
+    """
+    try:
+        return parse_deadline(deadline if deadline is not None else header_value, default)
+    except ValueError:
+        raise HTTPException(
+            status_code=400,
+            detail="deadline must be a number of seconds"
+        )
+
+
 @app.post("/scan")
 async def scan_cards(
     file: UploadFile = File(...),
-    scan_mode: str = "default"
+    scan_mode: str = "default",
+    deadline: Optional[float] = None,
+    x_scan_deadline: Optional[str] = Header(None)
 ) -> Dict[str, Any]:
     """
     Scan an image containing Magic cards using AI Vision
@@ -74,9 +161,12 @@ async def scan_cards(
     Args:
         file: Image file containing Magic cards
         scan_mode: "default" (Claude only) or "pro" (Claude + OpenAI parallel validation)
+        deadline: Time budget in seconds (or X-Scan-Deadline header); server default if omitted
 
     Returns:
-        JSON with identified cards and their details
+        JSON with identified cards and their details. If the budget runs
+        out, whatever was resolved is returned with "partial": true and
+        per-card "incomplete" markers.
     """
     try:
         # Validate file type
@@ -93,172 +183,196 @@ async def scan_cards(
                 detail="scan_mode must be 'default' or 'pro'"
             )
 
-        logger.info(f"Processing image: {file.filename} (mode: {scan_mode})")
+        scan_deadline = request_deadline(deadline, x_scan_deadline)
+
+        logger.info(f"Processing image: {file.filename} (mode: {scan_mode}, deadline: {scan_deadline.budget}s)")
 
         # Read image data
         image_data = await file.read()
 
-        # Step 1: Identify cards using selected mode
-        if scan_mode == "pro":
-            logger.info("Using Pro Scan (Claude + OpenAI parallel validation)...")
-            identified_cards = identify_cards_pro(image_data)
-        else:
-            logger.info("Using Default Scan (Claude Vision only)...")
-            identified_cards = identify_cards_with_vision(image_data)
+        return await scan_image(image_data, scan_mode, deadline=scan_deadline)
 
-        if not identified_cards:
-            return {
-                "success": True,
-                "cards_found": 0,
-                "cards": [],
-                "message": "No cards identified in image"
-            }
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing image: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing image: {str(e)}"
+        )
 
-        logger.info(f"Vision API identified {len(identified_cards)} card(s)")
 
-        # Step 2: Get detailed information for each identified card
-        logger.info("Fetching card details from Scryfall...")
-        results = []
+@app.post("/scan/batch")
+async def scan_cards_batch(
+    files: List[UploadFile] = File(...),
+    scan_mode: str = "default",
+    deadline: Optional[float] = None,
+    x_scan_deadline: Optional[str] = Header(None)
+) -> Dict[str, Any]:
+    """
+    Scan many photos in one request
+
+    Accepts any number of image files and/or zip archives of images.
+    Images are pipelined through identification and Scryfall resolution
+    with bounded concurrency, and lookups are shared across the batch.
+
+    Args:
+        files: Image files and/or zip archives containing images
+        scan_mode: "default" (Claude only) or "pro" (Claude + OpenAI parallel validation)
+        deadline: Optional time budget in seconds for the whole batch (or X-Scan-Deadline header)
+
+    Returns:
+        JSON with per-image results and aggregate timings
+    """
+    try:
+        # Validate scan_mode
+        if scan_mode not in ["default", "pro"]:
+            raise HTTPException(
+                status_code=400,
+                detail="scan_mode must be 'default' or 'pro'"
+            )
+
+        # Batches have no deadline unless the client asks for one
+        batch_deadline = request_deadline(deadline, x_scan_deadline, default=None)
+
+        # Collect images from plain uploads and zip archives
+        images = []
+        for upload in files:
+            data = await upload.read()
+            content_type = upload.content_type or ''
+            filename = upload.filename or f"image_{len(images) + 1}"
+
+            if content_type in ZIP_CONTENT_TYPES or filename.lower().endswith('.zip'):
+                try:
+                    images.extend(extract_zip_images(data))
+                except zipfile.BadZipFile:
+                    raise HTTPException(
+                        status_code=400,
+                        detail=f"{filename} is not a valid zip archive"
+                    )
+            elif content_type.startswith('image/'):
+                images.append((filename, data))
+            else:
+                raise HTTPException(
+                    status_code=400,
+                    detail=f"{filename} must be an image or a zip of images"
+                )
+
+        if not images:
+            raise HTTPException(
+                status_code=400,
+                detail="No images found in upload"
+            )
+
+        if len(images) > BATCH_MAX_IMAGES:
+            raise HTTPException(
+                status_code=400,
+                detail=f"Batch is limited to {BATCH_MAX_IMAGES} images (got {len(images)})"
+            )
+
+        return await scan_batch(images, scan_mode, batch_deadline)
 
-        for i, card_info in enumerate(identified_cards):
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error(f"Error processing batch: {e}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"Error processing batch: {str(e)}"
+        )
+
+
+@app.post("/scan/jobs", status_code=202)
+async def create_scan_job(
+    file: UploadFile = File(...),
+    scan_mode: str = "default",
+    callback_url: Optional[str] = None
+) -> Dict[str, Any]:
+    """
+    Queue a scan for background processing
+
+    Returns immediately with a job id. Poll GET /scan/jobs/{job_id} for the
+    result, or pass callback_url to have the finished job POSTed to you.
+
+    Args:
+        file: Image file containing Magic cards
+        scan_mode: "default" (Claude only) or "pro" (Claude + OpenAI parallel validation)
+        callback_url: Optional public http(s) URL notified when the job finishes
+
+    Returns:
+        JSON with the job id and where to poll for status
+    """
+    try:
+        if not file.content_type.startswith('image/'):
+            raise HTTPException(
+                status_code=400,
+                detail="File must be an image"
+            )
+
+        if scan_mode not in ["default", "pro"]:
+            raise HTTPException(
+                status_code=400,
+                detail="scan_mode must be 'default' or 'pro'"
+            )
+
+        if callback_url:
             try:
-                card_name = card_info.get('name')
-                set_code = card_info.get('set')
-                collector_number = card_info.get('collector_number')
-                confidence = card_info.get('confidence', 'medium')
-
-                # Clean up collector number
-                if collector_number:
-                    # Remove format like "048/168" -> just keep "48"
-                    if '/' in collector_number:
-                        collector_number = collector_number.split('/')[0]
-                    # Remove leading zeros (Scryfall uses "483" not "0483")
-                    if collector_number.isdigit():
-                        collector_number = str(int(collector_number))
-
-                logger.info(f"Looking up card: {card_name} (set: {set_code}, number: {collector_number})")
-
-                # Search for card on Scryfall
-                card_details = None
-
-                # Collect all set/number combinations to try
-                set_number_attempts = []
-                if set_code and collector_number:
-                    set_number_attempts.append((set_code, collector_number))
-
-                # Add alternative set/numbers from Pro Scan if available
-                set_alternatives = card_info.get('set_alternatives', [])
-                for alt in set_alternatives:
-                    alt_set = alt.get('set')
-                    alt_number = alt.get('collector_number')
-                    if alt_number and '/' in alt_number:
-                        alt_number = alt_number.split('/')[0]
-                    if alt_number and alt_number.isdigit():
-                        alt_number = str(int(alt_number))
-                    if alt_set and alt_number:
-                        set_number_attempts.append((alt_set, alt_number))
-                        logger.info(f"Alternative from Pro Scan: {alt_set}/{alt_number}")
-
-                # Try each set/number combination
-                for attempt_set, attempt_number in set_number_attempts:
-                    logger.info(f"Trying lookup: {attempt_set}/{attempt_number}")
-                    card_details = await get_card_details_by_set(attempt_set, attempt_number)
-
-                    # Validate that the found card matches the identified name
-                    if card_details:
-                        found_name = card_details.get('name', '')
-                        if found_name.lower() == card_name.lower():
-                            logger.info(f"✓ Found exact match: {attempt_set}/{attempt_number}")
-                            break  # Found the right card!
-                        else:
-                            logger.info(f"✗ Name mismatch: found '{found_name}' but expected '{card_name}'")
-                            card_details = None
-                    else:
-                        logger.info(f"✗ Not found: {attempt_set}/{attempt_number}")
-
-                # Fallback to name search if all specific lookups failed
-                if not card_details:
-                    logger.info(f"All set/number attempts failed, falling back to name search")
-                    card_details = await search_card_by_name(card_name, None)
-
-                # If name search found something but we're not confident, use image comparison
-                # This helps when there are multiple editions of the same card
-                if card_details and (confidence == 'medium' or confidence == 'low' or len(set_number_attempts) == 0):
-                    logger.info(f"Using image comparison to verify edition (confidence: {confidence})...")
-
-                    # Get all printings of this card
-                    all_printings = await get_all_printings(card_name, limit=10)
-
-                    if len(all_printings) > 1:
-                        logger.info(f"Found {len(all_printings)} printings - using Vision to compare")
-
-                        # Use Vision to compare user's photo with candidate cards
-                        best_match = compare_cards_with_vision(image_data, all_printings)
-
-                        if best_match:
-                            logger.info(f"✓ Image comparison selected: {best_match['set'].upper()}/{best_match.get('collector_number')}")
-                            card_details = best_match
-                            confidence = 'high'  # Upgrade confidence since we verified with image comparison
-                        else:
-                            logger.info("Image comparison didn't find a confident match, keeping name search result")
-                    else:
-                        logger.info(f"Only 1 printing found, skipping image comparison")
-
-                if card_details:
-                    # Get current prices
-                    prices = await get_card_prices(card_details['id'])
-
-                    results.append({
-                        "card_number": i + 1,
-                        "matched": True,
-                        "confidence": confidence,
-                        "name": card_details['name'],
-                        "set": card_details['set_name'],
-                        "set_code": card_details['set'],
-                        "collector_number": card_details.get('collector_number'),
-                        "rarity": card_details.get('rarity'),
-                        "image_url": card_details.get('image_uris', {}).get('normal'),
-                        "scryfall_id": card_details['id'],
-                        "prices": prices,
-                        "scryfall_uri": card_details.get('scryfall_uri')
-                    })
-                else:
-                    results.append({
-                        "card_number": i + 1,
-                        "matched": False,
-                        "identified_name": card_name,
-                        "message": "Card identified but not found in Scryfall"
-                    })
-
-            except Exception as e:
-                logger.error(f"Error processing card {i+1} ({card_name}): {e}")
-                results.append({
-                    "card_number": i + 1,
-                    "matched": False,
-                    "identified_name": card_name,
-                    "error": str(e)
-                })
+                await check_callback_url(callback_url)
+            except CallbackURLError as e:
+                raise HTTPException(
+                    status_code=400,
+                    detail=str(e)
+                )
+
+        image_data = await file.read()
+        job_id = submit_job(image_data, scan_mode, callback_url)
 
         return {
             "success": True,
-            "cards_found": len(identified_cards),
-            "cards_matched": sum(1 for r in results if r.get('matched')),
-            "cards": results,
-            "scan_mode": scan_mode,
-            "method": "pro_scan" if scan_mode == "pro" else "claude_vision",
+            "job_id": job_id,
+            "status": "queued",
+            "status_url": f"/scan/jobs/{job_id}",
             "timestamp": datetime.now().isoformat()
         }
 
     except HTTPException:
         raise
+    except QueueFullError as e:
+        logger.warning(f"Rejecting scan job: {e}")
+        raise HTTPException(
+            status_code=503,
+            detail="Scan queue is full, please retry later"
+        )
     except Exception as e:
-        logger.error(f"Error processing image: {e}", exc_info=True)
+        logger.error(f"Error queueing scan job: {e}", exc_info=True)
         raise HTTPException(
             status_code=500,
-            detail=f"Error processing image: {str(e)}"
+            detail=f"Error queueing scan job: {str(e)}"
         )
 
 
+@app.get("/scan/jobs/{job_id}")
+async def get_scan_job(job_id: str) -> Dict[str, Any]:
+    """
+    Get the status of a queued scan, including its result once completed
+
+    Args:
+        job_id: Id returned by POST /scan/jobs
+
+    Returns:
+        JSON with job status, timestamps and result/error
+    """
+    job = get_job_queue().get(job_id)
+
+    if job is None:
+        raise HTTPException(
+            status_code=404,
+            detail="Scan job not found"
+        )
+
+    return format_job(job)
+
+
 @app.post("/identify-single")
 async def identify_single_card(file: UploadFile = File(...)) -> Dict[str, Any]:
     """
@@ -275,7 +389,7 @@ async def identify_single_card(file: UploadFile = File(...)) -> Dict[str, Any]:
         image_data = await file.read()
         
         # Detect cards (should be just one)
-        detected_cards = detect_cards_from_image(image_data)
+        detected_cards = await asyncio.to_thread(detect_cards_from_image, image_data)
         
         if not detected_cards:
             return {
@@ -287,7 +401,8 @@ async def identify_single_card(file: UploadFile = File(...)) -> Dict[str, Any]:
             logger.warning(f"Multiple cards detected ({len(detected_cards)}), using first one")
         
         # Match the first (or only) card
-        matched_cards = match_cards([detected_cards[0]], CARD_DATABASE)
+        database = await asyncio.to_thread(get_card_database)
+        matched_cards = await asyncio.to_thread(match_cards, [detected_cards[0]], database)
         match = matched_cards[0]
         
         if not match['matched']:
@@ -298,11 +413,12 @@ async def identify_single_card(file: UploadFile = File(...)) -> Dict[str, Any]:
         
         # Get full details
         card_details = await get_card_details(match['scryfall_id'])
-        prices = await get_card_prices(match['scryfall_id'])
+        prices = await get_card_prices(match['scryfall_id'], card_details)
         
         return {
             "success": True,
             "confidence": match['confidence'],
+            "method": match['method'],
             "card": {
                 "name": card_details['name'],
                 "set": card_details['set_name'],
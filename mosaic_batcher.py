@@ -0,0 +1,295 @@
+"""
+Mosaic Batching
+Gathers the card crops of uploads that arrive within a short window,
+tiles them into one numbered mosaic and identifies them with a single
+vision call, so concurrent one- or two-card scans share a provider call
+
+Opt-in with MOSAIC_BATCHING=1. Only default scans of uploads with at most
+MOSAIC_MAX_CARDS detected cards are batched; anything else (and any batch
+that fails) is identified on its own as before.
+"""
+
+import asyncio
+import logging
+import math
+import os
+import time
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from card_detection import detect_cards_from_image
+from multi_vision import identify_with_prompt
+
+logger = logging.getLogger(__name__)
+
+MOSAIC_BATCHING = os.getenv("MOSAIC_BATCHING", "0") == "1"
+MOSAIC_WINDOW_MS = float(os.getenv("MOSAIC_WINDOW_MS", "150"))  # How long the first crop waits for company
+MOSAIC_MAX_TILES = int(os.getenv("MOSAIC_MAX_TILES", "9"))  # A full mosaic is sent right away
+MOSAIC_MAX_CARDS = 2  # Uploads with more detected cards are identified on their own
+
+# Tiles are card-shaped; a 3x3 mosaic stays under the size vision APIs
+# downscale at, so names and collector numbers remain legible
+TILE_SIZE = (366, 510)
+LABEL_HEIGHT = 56
+MOSAIC_JPEG_QUALITY = 90
+
+MOSAIC_PROMPT = """You are analyzing a grid of {count} numbered tiles. Each tile shows one Magic: The Gathering card, with the tile's number printed in the white band above it.
+
+CRITICAL: Read the EXACT card name from each card itself - do not guess or infer.
+
+For each tile:
+1. Read the card name at the TOP of the card (in the title box)
+2. Look for the set symbol (middle-right side of card)
+3. Look for the collector number at the BOTTOM of the card (format: 123/456)
+
+Return ONLY a JSON array with one object per tile in this exact format:
+[
+  {{
+    "tile": 1,
+    "name": "Exact Card Name From Title",
+    "set": "SET",
+    "collector_number": "123",
+    "confidence": "high"
+  }}
+]
+
+RULES:
+- "tile" is the number above the card
+- Only include set/collector_number if you can READ them on the card
+- Leave out tiles that don't show a Magic card
+- Return ONLY the JSON array, no markdown, no explanations"""
+
+
+def build_mosaic(crops: List[np.ndarray]) -> bytes:
+    """
+    Tile card crops into one JPEG, each under a band labelled 1, 2, ...
+
+    Args:
+        crops: Card images (BGR); landscape crops are turned upright
+
+    Returns:
+        JPEG bytes
+    """
+    columns = math.ceil(math.sqrt(len(crops)))
+    rows = math.ceil(len(crops) / columns)
+    width, height = TILE_SIZE
+    cell_height = height + LABEL_HEIGHT
+    mosaic = np.full((rows * cell_height, columns * width, 3), 255, np.uint8)
+
+    for i, crop in enumerate(crops):
+        if crop.shape[1] > crop.shape[0]:
+            crop = cv2.rotate(crop, cv2.ROTATE_90_CLOCKWISE)
+        x, y = (i % columns) * width, (i // columns) * cell_height
+        mosaic[y + LABEL_HEIGHT:y + cell_height, x:x + width] = cv2.resize(crop, TILE_SIZE, interpolation=cv2.INTER_AREA)
+        cv2.putText(mosaic, str(i + 1), (x + 12, y + LABEL_HEIGHT - 12), cv2.FONT_HERSHEY_SIMPLEX, 1.5, (0, 0, 0), 3)
+        cv2.rectangle(mosaic, (x, y), (x + width - 1, y + cell_height - 1), (0, 0, 0), 2)
+
+    ok, encoded = cv2.imencode(".jpg", mosaic, [cv2.IMWRITE_JPEG_QUALITY, MOSAIC_JPEG_QUALITY])
+    if not ok:
+        raise RuntimeError("Failed to encode mosaic")
+    return encoded.tobytes()
+
+
+def cards_by_tile(cards: List[Dict[str, Any]], tile_count: int) -> Dict[int, List[Dict[str, Any]]]:
+    """
+    Split a mosaic answer by tile number
+
+    Args:
+        cards: Provider answer (cards carrying a "tile" number)
+        tile_count: Tiles in the mosaic
+
+    Returns:
+        Tile index (0-based) -> its cards, without the "tile" field
+    """
+    by_tile: Dict[int, List[Dict[str, Any]]] = {}
+    for card in cards:
+        if not isinstance(card, dict):
+            continue
+        card = dict(card)
+        try:
+            tile = int(card.pop('tile', 0)) - 1
+        except (TypeError, ValueError):
+            tile = -1
+        if tile < 0 and tile_count == 1:
+            tile = 0
+        if 0 <= tile < tile_count:
+            by_tile.setdefault(tile, []).append(card)
+        else:
+            logger.warning(f"Mosaic answer for unknown tile dropped: {card.get('name')}")
+    return by_tile
+
+
+class MosaicBatcher:
+    """
+    Collects crops from concurrent requests and identifies them together
+
+    The first crop to arrive opens a window of MOSAIC_WINDOW_MS; when it
+    closes (or MOSAIC_MAX_TILES crops are waiting) the waiting requests'
+    crops go out as one mosaic, and each request gets back the cards from
+    its own tiles. A request's crops are never split across mosaics, and
+    a request that found no company is sent back to be identified on its
+    own, from the original photo. Each request waits at most its own time
+    budget; the mosaic call gets the longest budget among its requests.
+    """
+
+    def __init__(
+        self,
+        identify: Callable[[bytes, str, Optional[float]], List[Dict[str, Any]]] = identify_with_prompt,
+        window: float = MOSAIC_WINDOW_MS / 1000,
+        max_tiles: int = MOSAIC_MAX_TILES
+    ):
+        self.identify_mosaic = identify
+        self.window = window
+        self.max_tiles = max_tiles
+        # (crops, future, queued at, give up at or None), oldest first
+        self._pending: List[Tuple[List[np.ndarray], asyncio.Future, float, Optional[float]]] = []
+        self._timer: Optional[asyncio.TimerHandle] = None
+
+        # Statistics
+        self.batches = 0
+        self.solo = 0
+        self.requests = 0
+        self.tiles = 0
+        self.failures = 0
+        self.fallbacks = 0
+        self.waited_seconds = 0.0
+
+    async def identify(self, crops: List[np.ndarray], timeout: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Identify one request's card crops as part of the next mosaic
+
+        Args:
+            crops: Card images (BGR), at most max_tiles
+            timeout: Optional seconds to wait, batching window included
+
+        Returns:
+            Cards identified on the request's tiles, in tile order - or
+            None if no other request arrived within the window
+
+        Raises:
+            asyncio.TimeoutError: If the mosaic wasn't identified in time
+            Exception: Whatever made the batched vision call fail
+        """
+        loop = asyncio.get_running_loop()
+        future = loop.create_future()
+        queued = time.perf_counter()
+        self._pending.append((crops[:self.max_tiles], future, queued, queued + timeout if timeout is not None else None))
+
+        if sum(len(entry[0]) for entry in self._pending) >= self.max_tiles:
+            self._flush()
+        elif self._timer is None:
+            self._timer = loop.call_later(self.window, self._flush)
+        if timeout is None:
+            return await future
+        # Shielded: the mosaic still answers the other requests in it
+        return await asyncio.wait_for(asyncio.shield(future), timeout)
+
+    def _flush(self) -> None:
+        """Send out the waiting crops, a full mosaic at a time"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        while self._pending:
+            batch, tiles = [], 0
+            while self._pending and tiles + len(self._pending[0][0]) <= self.max_tiles:
+                entry = self._pending.pop(0)
+                batch.append(entry)
+                tiles += len(entry[0])
+            asyncio.ensure_future(self._run(batch))
+
+    async def _run(self, batch: List[Tuple[List[np.ndarray], asyncio.Future, float, Optional[float]]]) -> None:
+        """Identify one mosaic and hand each request its tiles' cards"""
+        if len(batch) == 1:
+            self.solo += 1
+            if not batch[0][1].done():
+                batch[0][1].set_result(None)
+            return
+
+        crops = [crop for entry_crops, _, _, _ in batch for crop in entry_crops]
+        started = time.perf_counter()
+        self.batches += 1
+        self.requests += len(batch)
+        self.tiles += len(crops)
+        self.waited_seconds += sum(started - queued for _, _, queued, _ in batch)
+
+        # The call may take as long as the most patient request allows
+        give_up_at = [entry[3] for entry in batch]
+        timeout = None if None in give_up_at else max(0.0, max(give_up_at) - started)
+
+        try:
+            mosaic = await asyncio.to_thread(build_mosaic, crops)
+            cards = await asyncio.to_thread(self.identify_mosaic, mosaic, MOSAIC_PROMPT.format(count=len(crops)), timeout)
+            by_tile = cards_by_tile(cards if isinstance(cards, list) else [], len(crops))
+        except Exception as e:
+            self.failures += 1
+            logger.error(f"✗ Mosaic of {len(crops)} tiles failed: {e}")
+            for _, future, _, _ in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        logger.info(f"✓ Mosaic of {len(crops)} tiles from {len(batch)} request(s) identified in {time.perf_counter() - started:.1f}s")
+        first_tile = 0
+        for entry_crops, future, _, _ in batch:
+            if not future.done():
+                future.set_result([
+                    card for tile in range(first_tile, first_tile + len(entry_crops))
+                    for card in by_tile.get(tile, [])
+                ])
+            first_tile += len(entry_crops)
+
+    async def identify_image(self, image_data: bytes, timeout: Optional[float] = None) -> Optional[List[Dict[str, Any]]]:
+        """
+        Identify an upload through the batcher, if it can be batched
+
+        Args:
+            image_data: Raw image bytes
+            timeout: Optional seconds identification may take (card
+                detection, batching window and mosaic call)
+
+        Returns:
+            Identified cards, or None if the upload should be identified
+            on its own (no or too many cards detected, no other upload to
+            batch with, batch failed or timed out, or no card found on
+            its tiles)
+        """
+        started = time.perf_counter()
+        crops = await asyncio.to_thread(detect_cards_from_image, image_data)
+        if not 0 < len(crops) <= MOSAIC_MAX_CARDS:
+            return None
+        try:
+            cards = await self.identify(crops, None if timeout is None else max(0.0, timeout - (time.perf_counter() - started)))
+        except asyncio.TimeoutError:
+            logger.warning(f"Mosaic not identified within {timeout:.1f}s")
+            cards = []
+        except Exception:
+            cards = []
+        if cards is None:
+            return None
+        if not cards:
+            self.fallbacks += 1
+            return None
+        return cards
+
+    def stats(self) -> Dict[str, Any]:
+        """Batching counters"""
+        return {
+            "enabled": MOSAIC_BATCHING,
+            "window_ms": round(self.window * 1000),
+            "batches": self.batches,
+            "solo": self.solo,
+            "requests": self.requests,
+            "tiles": self.tiles,
+            "requests_per_call": round(self.requests / self.batches, 2) if self.batches else 0.0,
+            "tiles_per_call": round(self.tiles / self.batches, 2) if self.batches else 0.0,
+            "avg_wait_ms": round(self.waited_seconds / self.requests * 1000, 1) if self.requests else 0.0,
+            "failures": self.failures,
+            "fallbacks": self.fallbacks
+        }
+
+
+# Global batcher instance
+mosaic_batcher = MosaicBatcher()
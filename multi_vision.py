@@ -1,93 +1,603 @@
 """
 Multi-provider vision API integration with parallel validation
 """
-import asyncio
+import concurrent.futures
+import json
 import logging
-from typing import List, Dict, Any
+import os
+import random
+import threading
+import time
+from collections import Counter, deque
+from typing import Callable, List, Dict, Any, Optional
 from claude_vision import identify_cards_with_vision as identify_with_claude
 from openai_vision import identify_cards_with_openai
 from gemini_vision import identify_cards_with_gemini
+from circuit_breaker import vision_breakers
+from name_index import fuzzy_key
+from result_alignment import align_results
 
 logger = logging.getLogger(__name__)
 
-def identify_cards_pro(image_data: bytes) -> List[Dict[str, Any]]:
+# Vision providers by name, in voting order; each is called as
+# provider(image_data, raise_errors=True, prompt=None)
+PROVIDERS: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+    "Claude": identify_with_claude,
+    "OpenAI": identify_cards_with_openai,
+    "Gemini": identify_cards_with_gemini,
+}
+
+# Pro Scan returns as soon as this many providers agree on every card
+# position (a third answer can't outvote two agreeing ones)
+PRO_SCAN_QUORUM = int(os.getenv("PRO_SCAN_QUORUM", "2"))
+
+# Default scan: one provider, picked per request by the router (see
+# ProviderRouter). With a hedging backup configured, it is asked too if the
+# first provider hasn't answered within its HEDGE_PERCENTILE latency, and
+# whichever answers first is used.
+HEDGE_BACKUP_PROVIDER = os.getenv("HEDGE_BACKUP_PROVIDER", "")  # A provider, "auto" (router's next pick) or empty = no hedging
+HEDGE_PERCENTILE = float(os.getenv("HEDGE_PERCENTILE", "0.9"))
+HEDGE_DEFAULT_DELAY = 10.0  # Seconds, until enough latencies are recorded
+HEDGE_MIN_SAMPLES = 20
+
+# Successful calls remembered per provider for latency percentiles
+LATENCY_WINDOW = 200
+
+# Adaptive routing: providers are scored on agreement with the voted Pro
+# Scan result, error rate and latency, and the best is asked first - except
+# for ROUTER_EXPLORATION of requests, which go to a random provider so
+# every provider's stats stay current (the exploration floor)
+ADAPTIVE_ROUTING = os.getenv("ADAPTIVE_ROUTING", "1") != "0"  # "0" = always registry order
+ROUTER_EXPLORATION = float(os.getenv("ROUTER_EXPLORATION", "0.1"))
+ROUTER_LATENCY_COST = float(os.getenv("ROUTER_LATENCY_COST", "0.01"))  # Score lost per second of latency
+ROUTER_MIN_SAMPLES = 10  # Providers with fewer recorded calls are tried first
+OUTCOME_WINDOW = 200  # Calls and Pro Scan votes remembered per provider
+
+# Append one JSON line per Pro Scan with every provider's latency, success
+# and agreement (replayable with benchmarks/router_simulation.py)
+PROVIDER_TRACE_FILE = os.getenv("PROVIDER_TRACE_FILE", "")
+
+
+class LatencyTracker:
+    """
+    Latencies of recent successful calls, per provider
+
+    Calls are timed in the worker thread, so slow calls nobody waited for
+    (Pro Scan stragglers, hedged primaries) are still recorded and don't
+    bias the percentiles towards fast answers.
+    """
+
+    def __init__(self, window: int = LATENCY_WINDOW):
+        self.window = window
+        self._samples: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+    def record(self, provider: str, seconds: float) -> None:
+        """Record the latency of a successful call"""
+        with self._lock:
+            self._samples.setdefault(provider, deque(maxlen=self.window)).append(seconds)
+
+    def percentile(self, provider: str, fraction: float, min_samples: int = HEDGE_MIN_SAMPLES) -> Optional[float]:
+        """
+        Latency below which `fraction` of a provider's recent calls finished
+
+        Args:
+            provider: Provider name
+            fraction: Percentile as a fraction (0.9 = p90)
+            min_samples: Return None with fewer recorded calls than this
+
+        Returns:
+            Seconds, or None if there aren't enough samples
+        """
+        with self._lock:
+            samples = sorted(self._samples.get(provider, ()))
+        if len(samples) < max(1, min_samples):
+            return None
+        return samples[min(len(samples) - 1, int(fraction * len(samples)))]
+
+    def stats(self) -> Dict[str, Any]:
+        """p50/p90/p99 per provider"""
+        return {
+            provider: {
+                "samples": len(self._samples.get(provider, ())),
+                "p50": self.percentile(provider, 0.5, min_samples=1),
+                "p90": self.percentile(provider, 0.9, min_samples=1),
+                "p99": self.percentile(provider, 0.99, min_samples=1)
+            }
+            for provider in list(self._samples)
+        }
+
+
+# Global tracker instance
+latency_tracker = LatencyTracker()
+
+
+class ProviderRouter:
+    """
+    Picks which provider answers a request, epsilon-greedy
+
+    A provider's score is its rate of successful calls times its agreement
+    with the voted result of Pro Scans, minus a cost per second of latency
+    (the mean of its p50 and p95). Providers are asked best first; with
+    probability `exploration` a random provider goes first instead, so a
+    provider that got slow or inaccurate and then recovered is noticed.
+    Until a provider has ROUTER_MIN_SAMPLES calls it is tried first.
+    """
+
+    def __init__(
+        self,
+        latency: LatencyTracker = latency_tracker,
+        exploration: float = ROUTER_EXPLORATION,
+        latency_cost: float = ROUTER_LATENCY_COST,
+        window: int = OUTCOME_WINDOW,
+        enabled: bool = ADAPTIVE_ROUTING,
+        rng: Optional[random.Random] = None
+    ):
+        self.latency = latency
+        self.exploration = exploration
+        self.latency_cost = latency_cost
+        self.window = window
+        self.enabled = enabled
+        self._rng = rng or random.Random()
+        self._outcomes: Dict[str, deque] = {}
+        self._agreement: Dict[str, deque] = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.picks: Counter = Counter()
+        self.explorations = 0
+
+    def record_outcome(self, provider: str, ok: bool) -> None:
+        """Record whether a call succeeded"""
+        with self._lock:
+            self._outcomes.setdefault(provider, deque(maxlen=self.window)).append(ok)
+
+    def record_agreement(self, provider: str, agreement: float) -> None:
+        """Record how much of a provider's answer the Pro Scan vote kept (0-1)"""
+        with self._lock:
+            self._agreement.setdefault(provider, deque(maxlen=self.window)).append(agreement)
+
+    def _provider_stats(self, provider: str) -> Dict[str, Any]:
+        """Success rate, agreement, latency and score of one provider"""
+        with self._lock:
+            outcomes = list(self._outcomes.get(provider, ()))
+            agreement = list(self._agreement.get(provider, ()))
+        p50 = self.latency.percentile(provider, 0.5, min_samples=1)
+        p95 = self.latency.percentile(provider, 0.95, min_samples=1)
+
+        # Unknowns count as perfect, so new providers get tried
+        success_rate = sum(outcomes) / len(outcomes) if outcomes else 1.0
+        agreement_rate = sum(agreement) / len(agreement) if agreement else 1.0
+        latency = (p50 + p95) / 2 if p50 is not None else 0.0
+        return {
+            "calls": len(outcomes),
+            "error_rate": round(1 - success_rate, 3),
+            "agreement": round(agreement_rate, 3),
+            "votes": len(agreement),
+            "p50": round(p50, 3) if p50 is not None else None,
+            "p95": round(p95, 3) if p95 is not None else None,
+            "score": round(success_rate * agreement_rate - self.latency_cost * latency, 4)
+        }
+
+    def rank(self, providers: Optional[List[str]] = None, explore: bool = True) -> List[str]:
+        """
+        Providers in the order they should be asked
+
+        Args:
+            providers: Candidates (default: every registered provider)
+            explore: Allow an exploration pick to go first
+
+        Returns:
+            Provider names, first choice first
+        """
+        providers = list(providers or PROVIDERS)
+        if not self.enabled or len(providers) < 2:
+            return providers
+
+        stats = {name: self._provider_stats(name) for name in providers}
+        ranked = sorted(
+            providers,
+            key=lambda name: (stats[name]['calls'] >= ROUTER_MIN_SAMPLES, -stats[name]['score'])
+        )
+        if explore and self._rng.random() < self.exploration:
+            choice = self._rng.choice(providers)
+            ranked.remove(choice)
+            ranked.insert(0, choice)
+            self.explorations += 1
+        return ranked
+
+    def select(self, providers: Optional[List[str]] = None) -> List[str]:
+        """rank(), counting the first choice as a pick"""
+        ranked = self.rank(providers)
+        if ranked:
+            self.picks[ranked[0]] += 1
+        return ranked
+
+    def stats(self) -> Dict[str, Any]:
+        """Per-provider routing stats and pick counts"""
+        return {
+            "enabled": self.enabled,
+            "exploration": self.exploration,
+            "explorations": self.explorations,
+            "providers": {
+                name: {**self._provider_stats(name), "picks": self.picks[name]}
+                for name in PROVIDERS
+            }
+        }
+
+
+# Global router instance
+provider_router = ProviderRouter()
+
+# Early exits and hedges, for /health
+scan_counters = {
+    "pro_scans": 0,
+    "quorum_exits": 0,
+    "hedged_scans": 0,
+    "hedges_fired": 0,
+    "backup_wins": 0
+}
+
+
+def provider_stats() -> Dict[str, Any]:
+    """Provider latencies, routing and breaker stats plus early-exit and hedging counters"""
+    return {
+        "latency": latency_tracker.stats(),
+        "routing": provider_router.stats(),
+        "breakers": vision_breakers.stats(),
+        **scan_counters
+    }
+
+
+def _timed_call(provider: str, image_data: bytes) -> List[Dict[str, Any]]:
+    """
+    Call a provider (raising on failure), recording its outcome and latency
+
+    The provider's breaker must have allowed the call (see available()).
+    """
+    started = time.perf_counter()
+    try:
+        cards = PROVIDERS[provider](image_data, raise_errors=True)
+    except Exception:
+        vision_breakers.get(provider).record(False, time.perf_counter() - started)
+        provider_router.record_outcome(provider, False)
+        raise
+    seconds = time.perf_counter() - started
+    vision_breakers.get(provider).record(True, seconds)
+    latency_tracker.record(provider, seconds)
+    provider_router.record_outcome(provider, True)
+    return cards
+
+
+def available(providers: List[str]) -> List[str]:
+    """
+    Providers whose breaker lets a call through, in the given order
+
+    Every provider returned must be called: a half-open breaker counts its
+    trial call from here.
+    """
+    allowed = [name for name in providers if vision_breakers.get(name).allow()]
+    skipped = [name for name in providers if name not in allowed]
+    if skipped:
+        logger.info(f"Skipping {', '.join(skipped)} (circuit breaker open)")
+    return allowed
+
+
+def _card_names(cards: List[Dict[str, Any]]) -> tuple:
+    """
+    Card names of one provider's answer, by position, as the vote compares
+    them (fuzzy_key: case, accents and punctuation ignored), so the quorum
+    exit, routing agreement and vote_on_results() agree on what agreeing is
+    """
+    return tuple(fuzzy_key((card or {}).get('name') or '') for card in cards)
+
+
+def quorum_reached(provider_results: Dict[str, List[Dict[str, Any]]], quorum: int) -> bool:
+    """
+    Whether at least `quorum` providers agree on every card name (in any order,
+    names compared as in the vote)
+
+    Args:
+        provider_results: Cards per provider that has answered
+        quorum: Providers that must agree
+
+    Returns:
+        True if the remaining providers can't change the vote
+    """
+    agreeing = Counter(tuple(sorted(_card_names(cards))) for cards in provider_results.values())
+    return bool(agreeing) and max(agreeing.values()) >= quorum
+
+
+def _take_available(queue: List[str]) -> Optional[str]:
+    """Pop providers off the front of the queue until one's breaker allows a call"""
+    while queue:
+        name = queue.pop(0)
+        if vision_breakers.get(name).allow():
+            return name
+        logger.info(f"Skipping {name} (circuit breaker open)")
+    return None
+
+
+def identify_cards_pro(
+    image_data: bytes,
+    timeout: Optional[float] = None,
+    quorum: int = PRO_SCAN_QUORUM
+) -> List[Dict[str, Any]]:
     """
     Pro Scan: Use Claude, OpenAI, and Gemini Vision APIs in parallel and validate results
 
     Strategy:
     1. Call all three APIs simultaneously
-    2. Compare card names - if majority agrees, high confidence
-    3. Collect all set/number combinations as alternatives
-    4. If only one provider succeeds, use that result
+    2. Stop waiting as soon as a quorum agrees on every card (or at the timeout)
+    3. Compare card names - if majority agrees, high confidence
+    4. Collect all set/number combinations as alternatives
+    5. If only one provider succeeds, use that result
 
     Args:
         image_data: Raw image bytes
+        timeout: Optional seconds to wait for providers; stragglers are ignored
+        quorum: Providers that must agree on every card to return early
 
     Returns:
         List of identified cards with validated data
     """
-    logger.info("Starting Pro Scan with parallel validation (Claude + OpenAI + Gemini)...")
+    # Best-scoring provider first: its set/number wins among agreeing answers.
+    # Providers with an open breaker are left out and the vote is among the rest.
+    providers = available(provider_router.rank(explore=False))
+    if not providers:
+        logger.error("Pro Scan: every vision provider's circuit breaker is open")
+        return []
+    logger.info(f"Starting Pro Scan with parallel validation ({' + '.join(providers)})...")
+    scan_counters["pro_scans"] += 1
+    started = time.monotonic()
+    give_up_at = started + timeout if timeout is not None else None
 
-    # Call all three APIs in parallel
-    import concurrent.futures
+    results: Dict[str, List[Dict[str, Any]]] = {}
+    trace: Dict[str, Dict[str, Any]] = {}
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=len(providers))
+    try:
+        futures = {executor.submit(_timed_call, name, image_data): name for name in providers}
+        pending = set(futures)
 
-    claude_results = []
-    openai_results = []
-    gemini_results = []
+        while pending:
+            remaining = give_up_at - time.monotonic() if give_up_at is not None else None
+            if remaining is not None and remaining <= 0:
+                break
+            done, pending = concurrent.futures.wait(
+                pending, timeout=remaining, return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                name = futures[future]
+                trace[name] = {"seconds": round(time.monotonic() - started, 3), "ok": True}
+                try:
+                    results[name] = future.result()
+                except Exception as e:
+                    trace[name]["ok"] = False
+                    logger.error(f"{name} Vision failed: {e}")
 
-    with concurrent.futures.ThreadPoolExecutor(max_workers=3) as executor:
-        # Submit all three tasks
-        claude_future = executor.submit(identify_with_claude, image_data)
-        openai_future = executor.submit(identify_cards_with_openai, image_data)
-        gemini_future = executor.submit(identify_cards_with_gemini, image_data)
+            if pending and quorum_reached(results, quorum):
+                scan_counters["quorum_exits"] += 1
+                logger.info(f"✓ {quorum} providers agree, not waiting for {', '.join(futures[f] for f in pending)}")
+                pending = set()
 
-        # Wait for all to complete and handle errors
-        try:
-            claude_results = claude_future.result()
-        except Exception as e:
-            logger.error(f"Claude Vision failed: {e}")
+        for future in pending:
+            logger.warning(f"{futures[future]} Vision did not answer within {timeout:.1f}s, ignoring")
+    finally:
+        # Don't block on stragglers - their results are simply dropped
+        executor.shutdown(wait=False, cancel_futures=True)
 
-        try:
-            openai_results = openai_future.result()
-        except Exception as e:
-            logger.error(f"OpenAI Vision failed: {e}")
+    # Combine and validate results using majority voting (in provider order)
+    validated_cards = vote_on_results({name: results[name] for name in providers if name in results})
+    logger.info(f"Pro Scan validated {len(validated_cards)} card(s)")
+
+    # With two or more answers, the vote says how accurate each provider was
+    if len(results) >= 2:
+        for name, cards in results.items():
+            trace[name]["agreement"] = agreement_with(cards, validated_cards)
+            provider_router.record_agreement(name, trace[name]["agreement"])
+    if PROVIDER_TRACE_FILE:
+        _append_trace(trace)
+    return validated_cards
+
+
+def agreement_with(cards: List[Dict[str, Any]], validated_cards: List[Dict[str, Any]]) -> float:
+    """
+    Share of card names on which a provider's answer and the vote agree
+
+    Args:
+        cards: One provider's answer
+        validated_cards: The voted result
+
+    Returns:
+        0-1 (1.0 if both are empty)
+    """
+    mine = Counter(name for name in _card_names(cards) if name)
+    final = Counter(name for name in _card_names(validated_cards) if name)
+    largest = max(sum(mine.values()), sum(final.values()))
+    return round(sum((mine & final).values()) / largest, 3) if largest else 1.0
+
+
+def _append_trace(trace: Dict[str, Dict[str, Any]]) -> None:
+    """Append a Pro Scan's per-provider outcomes to PROVIDER_TRACE_FILE"""
+    try:
+        with open(PROVIDER_TRACE_FILE, "a") as f:
+            f.write(json.dumps({"time": round(time.time(), 3), "providers": trace}) + "\n")
+    except OSError as e:
+        logger.error(f"Failed to write provider trace {PROVIDER_TRACE_FILE}: {e}")
+
+
+def identify_cards_hedged(
+    image_data: bytes,
+    timeout: Optional[float] = None,
+    primary: Optional[str] = None,
+    backup: str = HEDGE_BACKUP_PROVIDER
+) -> List[Dict[str, Any]]:
+    """
+    Default scan: one routed provider, with failover and optional hedging
+
+    The router's first choice is asked first. If it fails, the next is
+    asked. Providers whose circuit breaker is open are passed over. If a
+    backup is configured and the first provider hasn't answered within its
+    learned HEDGE_PERCENTILE latency, the backup is asked as well, and the
+    first successful answer wins - only the slowest calls pay for a second
+    request.
+
+    Args:
+        image_data: Raw image bytes
+        timeout: Optional seconds to wait in total
+        primary: Provider asked first (default: the router's choice)
+        backup: Provider asked when the first is slow ("auto" = the router's
+            next choice, "" = never)
+
+    Returns:
+        List of identified cards ([] if no provider answered)
+    """
+    # The first provider whose breaker allows a call goes first
+    others = provider_router.select() if primary is None else [primary] + [n for n in PROVIDERS if n != primary]
+    primary = _take_available(others)
+    if primary is None:
+        logger.error("Every vision provider's circuit breaker is open")
+        return []
+
+    # The backup is chosen against the provider actually asked first
+    if backup == "auto":
+        backup = others[0] if others else ""
+    elif backup and backup not in PROVIDERS:
+        logger.error(f"Unknown hedge backup provider '{backup}', not hedging")
+        backup = ""
+    if backup == primary:
+        backup = ""
+    if backup:
+        scan_counters["hedged_scans"] += 1
+        others = [backup] + [name for name in others if name != backup]
+
+    started = time.monotonic()
+    give_up_at = started + timeout if timeout is not None else None
+    hedge_delay = latency_tracker.percentile(primary, HEDGE_PERCENTILE)
+    hedge_at = started + (hedge_delay if hedge_delay is not None else HEDGE_DEFAULT_DELAY)
+
+    executor = concurrent.futures.ThreadPoolExecutor(max_workers=2)
+    try:
+        futures = {executor.submit(_timed_call, primary, image_data): primary}
+        pending = set(futures)
+        hedged = not backup
+
+        while pending:
+            # Wake for whichever comes first: an answer, the hedge, or the timeout
+            wake_at = [t for t in (give_up_at, None if hedged else hedge_at) if t is not None]
+            done, pending = concurrent.futures.wait(
+                pending,
+                timeout=max(0.0, min(wake_at) - time.monotonic()) if wake_at else None,
+                return_when=concurrent.futures.FIRST_COMPLETED
+            )
+            for future in done:
+                name = futures[future]
+                try:
+                    cards = future.result()
+                except Exception as e:
+                    logger.error(f"{name} Vision failed: {e}")
+                    continue
+                if name == backup:
+                    scan_counters["backup_wins"] += 1
+                logger.info(f"{name} identified {len(cards)} card(s) in {time.monotonic() - started:.1f}s")
+                return cards
+
+            if give_up_at is not None and time.monotonic() >= give_up_at:
+                logger.warning(f"No vision provider answered within {timeout:.1f}s")
+                break
+
+            # Fail over when everything asked so far failed; hedge (once)
+            # when the first provider is slower than usual
+            if not pending and others:
+                next_provider = _take_available(others)
+                if next_provider:
+                    logger.info(f"{', '.join(futures.values())} failed, asking {next_provider}")
+            elif not hedged and time.monotonic() >= hedge_at and others:
+                next_provider = _take_available(others)
+                if next_provider:
+                    scan_counters["hedges_fired"] += 1
+                    logger.info(f"{primary} slow after {time.monotonic() - started:.1f}s, also asking {next_provider}")
+            else:
+                continue
+            hedged = True
+            if next_provider is None:
+                continue
+            future = executor.submit(_timed_call, next_provider, image_data)
+            futures[future] = next_provider
+            pending.add(future)
+        return []
+    finally:
+        executor.shutdown(wait=False, cancel_futures=True)
+
+
+def identify_with_prompt(image_data: bytes, prompt: str, timeout: Optional[float] = None) -> List[Dict[str, Any]]:
+    """
+    Ask one routed provider with custom instructions, failing over on errors
+
+    Used for batched (mosaic) requests. Breakers and routing outcomes are
+    updated as for any call, but latencies aren't recorded: a batched call
+    is slower than a single photo and would skew hedging.
+
+    Args:
+        image_data: Raw image bytes
+        prompt: Instructions sent instead of the provider's own
+        timeout: Optional seconds in total; no further provider is asked
+            once they are used up
+
+    Returns:
+        The first successful provider's answer
 
+    Raises:
+        RuntimeError: If no provider answered (in time)
+    """
+    give_up_at = time.monotonic() + timeout if timeout is not None else None
+    queue = provider_router.select()
+    while True:
+        if give_up_at is not None and time.monotonic() >= give_up_at:
+            raise RuntimeError(f"No vision provider answered within {timeout:.1f}s")
+        name = _take_available(queue)
+        if name is None:
+            raise RuntimeError("No vision provider available")
+        started = time.perf_counter()
         try:
-            gemini_results = gemini_future.result()
+            cards = PROVIDERS[name](image_data, raise_errors=True, prompt=prompt)
         except Exception as e:
-            logger.error(f"Gemini Vision failed: {e}")
+            vision_breakers.get(name).record(False, time.perf_counter() - started)
+            provider_router.record_outcome(name, False)
+            logger.error(f"{name} Vision failed: {e}")
+            continue
+        vision_breakers.get(name).record(True, time.perf_counter() - started)
+        provider_router.record_outcome(name, True)
+        return cards
 
-    logger.info(f"Claude identified {len(claude_results)} card(s)")
-    logger.info(f"OpenAI identified {len(openai_results)} card(s)")
-    logger.info(f"Gemini identified {len(gemini_results)} card(s)")
 
-    # Combine and validate results using majority voting
-    validated_cards = []
+def vote_on_results(provider_results: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Any]]:
+    """
+    Combine providers' answers by majority vote on each card
 
-    # Try to match cards from all three providers
-    max_cards = max(len(claude_results), len(openai_results), len(gemini_results))
+    Cards are matched up across providers by name and position (see
+    align_results()), not by list index.
 
-    for i in range(max_cards):
-        claude_card = claude_results[i] if i < len(claude_results) else None
-        openai_card = openai_results[i] if i < len(openai_results) else None
-        gemini_card = gemini_results[i] if i < len(gemini_results) else None
+    Args:
+        provider_results: Cards per provider that answered, in priority order
+            (the first agreeing provider's set/number becomes the primary)
 
-        # Collect all provider results for this card position
-        provider_cards = []
-        if claude_card:
-            provider_cards.append(('Claude', claude_card))
-        if openai_card:
-            provider_cards.append(('OpenAI', openai_card))
-        if gemini_card:
-            provider_cards.append(('Gemini', gemini_card))
+    Returns:
+        List of identified cards with validated data
+    """
+    for name, cards in provider_results.items():
+        logger.info(f"{name} identified {len(cards)} card(s)")
 
-        if not provider_cards:
-            continue
+    validated_cards = []
+
+    # Match up the providers' cards, then vote within each physical card
+    for group in align_results(provider_results):
+        provider_cards = list(group.items())
 
-        # Count votes for each card name (case-insensitive)
+        # Count votes for each card name (ignoring case, accents and punctuation)
         name_votes = {}
         for provider_name, card in provider_cards:
-            card_name = card.get('name', '').lower().strip()
+            card_name = fuzzy_key(card.get('name') or '')
             if card_name:
                 if card_name not in name_votes:
                     name_votes[card_name] = {'count': 0, 'providers': [], 'cards': []}
@@ -146,5 +656,4 @@ def identify_cards_pro(image_data: bytes) -> List[Dict[str, Any]]:
                 'provider_votes': f"{vote_count}/{len(provider_cards)}"
             })
 
-    logger.info(f"Pro Scan validated {len(validated_cards)} card(s)")
     return validated_cards
@@ -0,0 +1,264 @@
+"""
+Fuzzy Card Name Index
+In-memory trigram index over every card and face name in the local card
+store, used to correct names the vision models misread ("Lightning Bolts",
+a dropped comma, wrong accents) without a network round trip
+"""
+
+import heapq
+import logging
+import os
+import re
+import threading
+import time
+from array import array
+from collections import defaultdict
+from typing import Any, Dict, List, Optional, Tuple
+
+from card_store import card_store, normalize_name
+
+logger = logging.getLogger(__name__)
+
+# Lowest score (1.0 = identical) accepted as a correction
+NAME_MATCH_MIN_SCORE = float(os.getenv("NAME_MATCH_MIN_SCORE", "0.8"))
+
+# Trigram-ranked candidates passed to the edit-distance verifier
+VERIFY_CANDIDATES = 24
+
+# Seconds between background checks for a rebuilt or re-synced card store
+NAME_INDEX_CHECK_INTERVAL = 30.0
+
+_PUNCTUATION = re.compile(r"[^\w\s]")
+
+
+def fuzzy_key(name: str) -> str:
+    """
+    Key used for fuzzy matching: normalized name without punctuation
+
+    Args:
+        name: Card name
+
+    Returns:
+        Key ("Jace, Vryn's Prodigy" -> "jace vryns prodigy")
+    """
+    return " ".join(_PUNCTUATION.sub("", normalize_name(name)).split())
+
+
+def trigrams(key: str) -> set:
+    """Padded character trigrams of a key"""
+    padded = f"  {key} "
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+def edit_distance(a: str, b: str, limit: Optional[int] = None) -> int:
+    """
+    Optimal string alignment distance (Levenshtein plus adjacent transpositions)
+
+    Args:
+        a: First string
+        b: Second string
+        limit: Stop early and return limit + 1 once the distance must exceed it
+
+    Returns:
+        Number of edits turning a into b
+    """
+    if a == b:
+        return 0
+    if limit is not None and abs(len(a) - len(b)) > limit:
+        return limit + 1
+
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost)
+            if (previous_previous is not None and i > 1 and j > 1
+                    and a[i - 1] == b[j - 2] and a[i - 2] == b[j - 1]):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if limit is not None and min(current) > limit:
+            return limit + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class NameIndex:
+    """
+    Trigram postings over card names with an edit-distance verifier
+
+    Built from the card store at startup and rebuilt in a background
+    thread whenever the store is rebuilt or re-synced; searches keep using
+    the previous index until the new one is swapped in, so they never wait
+    on a build. Face names of split and double-faced cards are indexed
+    too, and map back to the full card name.
+    """
+
+    def __init__(self):
+        # (keys, full names, key -> position, trigram postings), swapped as one
+        self._index: Tuple[List[str], List[str], Dict[str, int], Dict[str, array]] = ([], [], {}, {})
+        self._version: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self._checked_at = float('-inf')
+
+        # Statistics
+        self.queries = 0
+        self.exact = 0
+        self.corrected = 0
+        self.unmatched = 0
+        self.query_seconds = 0.0
+
+    def load(self) -> None:
+        """
+        (Re)build from the card store if it changed since the last build
+
+        Blocks for the whole build, so call it from a worker thread (startup
+        does); searches go through refresh() instead.
+        """
+        meta = card_store.current_meta()
+        version = (meta.get('built_at'), meta.get('synced_at'))
+        if version == self._version:
+            return
+
+        with self._lock:
+            if version == self._version:
+                return
+            started = time.perf_counter()
+            keys, names, by_key = [], [], {}
+            postings = defaultdict(lambda: array('I'))
+
+            for normalized, card_name in card_store.lookup_names():
+                key = fuzzy_key(normalized)
+                if not key or key in by_key:
+                    continue
+                index = len(keys)
+                by_key[key] = index
+                keys.append(key)
+                names.append(card_name)
+                for gram in trigrams(key):
+                    postings[gram].append(index)
+
+            self._index = (keys, names, by_key, dict(postings))
+            self._version = version
+            if keys:
+                logger.info(f"✓ Name index built: {len(keys)} names in {(time.perf_counter() - started) * 1000:.0f}ms")
+
+    def refresh(self) -> None:
+        """Rebuild in a background thread if the card store may have changed (never blocks)"""
+        now = time.monotonic()
+        if now - self._checked_at < NAME_INDEX_CHECK_INTERVAL or self._lock.locked():
+            return
+        self._checked_at = now
+        threading.Thread(target=self._load_in_background, name="name-index", daemon=True).start()
+
+    def _load_in_background(self) -> None:
+        """load() for refresh()'s thread"""
+        try:
+            self.load()
+        except Exception as e:
+            logger.error(f"✗ Name index build failed: {e}", exc_info=True)
+
+    def search(self, query: str, limit: int = 5, min_score: float = 0.0) -> List[Dict[str, Any]]:
+        """
+        Ranked candidate names for a (possibly misread) name
+
+        Args:
+            query: Name as read by the vision model
+            limit: Maximum candidates to return
+            min_score: Drop candidates scoring below this
+
+        Returns:
+            Candidates, best first: {"name", "matched", "score", "distance"}
+            where "name" is the full card name and "matched" the indexed
+            (possibly face) name key that matched
+        """
+        self.refresh()
+        key = fuzzy_key(query)
+        keys, names, by_key, postings = self._index
+        if not key or not keys:
+            return []
+
+        # Exact key match: only punctuation, case or accents differ
+        index = by_key.get(key)
+        if index is not None:
+            return [{"name": names[index], "matched": key, "score": 1.0, "distance": 0}]
+
+        # Edits allowed at min_score bound the candidates: a name within k
+        # edits has a length within k of the query and misses at most 3k of
+        # its trigrams, so it shares one of the query's 3k + 1 rarest
+        query_grams = sorted(trigrams(key), key=lambda gram: len(postings.get(gram, ())))
+        max_edits = None
+        if min_score > 0:
+            max_edits = int(len(key) * (1 - min_score) / min_score + 1e-9)
+            query_grams = query_grams[:3 * max_edits + 1]
+
+        # Rank by shared trigrams...
+        shared = defaultdict(int)
+        for gram in query_grams:
+            for index in postings.get(gram, ()):
+                shared[index] += 1
+
+        if max_edits is not None:
+            shared = {
+                index: count for index, count in shared.items()
+                if abs(len(keys[index]) - len(key)) <= max_edits
+            }
+        ranked = heapq.nlargest(
+            VERIFY_CANDIDATES, shared.items(),
+            key=lambda item: item[1] / (len(keys[item[0]]) + len(key))
+        )
+
+        # ...then score the best by edit distance
+        candidates = []
+        for index, _ in ranked:
+            candidate = keys[index]
+            distance = edit_distance(key, candidate, max_edits)
+            if max_edits is not None and distance > max_edits:
+                continue
+            score = 1 - distance / max(len(key), len(candidate))
+            if score >= min_score:
+                candidates.append({"name": names[index], "matched": candidate, "score": round(score, 3), "distance": distance})
+
+        candidates.sort(key=lambda c: (-c['score'], c['distance']))
+        return candidates[:limit]
+
+    def correct(self, query: str, min_score: float = NAME_MATCH_MIN_SCORE) -> Optional[str]:
+        """
+        Best-matching real card name for a misread name
+
+        Args:
+            query: Name as read by the vision model
+            min_score: Lowest score accepted
+
+        Returns:
+            Full card name, or None if nothing is close enough
+        """
+        started = time.perf_counter()
+        candidates = self.search(query, limit=1, min_score=min_score)
+
+        self.queries += 1
+        self.query_seconds += time.perf_counter() - started
+        if not candidates:
+            self.unmatched += 1
+            return None
+        if candidates[0]['distance'] == 0:
+            self.exact += 1
+        else:
+            self.corrected += 1
+        logger.info(f"Name index: '{query}' -> '{candidates[0]['name']}' (score {candidates[0]['score']})")
+        return candidates[0]['name']
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size and correction counters"""
+        return {
+            "names": len(self._index[0]),
+            "queries": self.queries,
+            "exact": self.exact,
+            "corrected": self.corrected,
+            "unmatched": self.unmatched,
+            "avg_query_us": round(self.query_seconds / self.queries * 1e6, 1) if self.queries else 0.0
+        }
+
+
+# Global index instance
+name_index = NameIndex()
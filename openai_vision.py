@@ -1,28 +1,52 @@
 """
 OpenAI Vision API integration for card identification
 """
-import os
 import base64
 import json
 import logging
 from typing import List, Dict, Any, Optional
-from openai import OpenAI
+
+from provider_registry import provider_registry, OPENAI_MODEL
 
 logger = logging.getLogger(__name__)
 
-def _get_openai_client():
-    """Lazy initialization of OpenAI client"""
-    api_key = os.getenv("OPENAI_API_KEY")
-    if not api_key:
-        raise ValueError("OPENAI_API_KEY environment variable is not set")
-    return OpenAI(api_key=api_key)
+# Instructions sent with each photo
+IDENTIFY_PROMPT = """You are analyzing a Magic: The Gathering card photo.
+
+CRITICAL: Read the EXACT card name from the card itself - do not guess or infer.
+
+For each card visible:
+1. Read the card name at the TOP of the card (in the title box)
+2. Look for the set symbol (middle-right side of card)
+3. Look for the collector number at the BOTTOM of the card (format: 123/456)
+
+Return ONLY a JSON array in this exact format:
+[
+  {
+    "name": "Exact Card Name From Title",
+    "set": "SET",
+    "collector_number": "123",
+    "confidence": "high"
+  }
+]
+
+If you cannot read the set or collector_number clearly, omit those fields.
+Confidence should be: "high", "medium", or "low" based on image quality."""
 
-def identify_cards_with_openai(image_data: bytes) -> List[Dict[str, Any]]:
+def identify_cards_with_openai(
+    image_data: bytes,
+    raise_errors: bool = False,
+    prompt: Optional[str] = None
+) -> List[Dict[str, Any]]:
     """
     Identify Magic: The Gathering cards using OpenAI Vision API
 
     Args:
         image_data: Raw image bytes
+        raise_errors: Raise on failure instead of returning [] (so callers
+            can tell a failed call from an image without cards)
+        prompt: Instructions to send instead of IDENTIFY_PROMPT (same JSON
+            array answer)
 
     Returns:
         List of identified cards with name, set, collector_number, and confidence
@@ -30,8 +54,8 @@ def identify_cards_with_openai(image_data: bytes) -> List[Dict[str, Any]]:
     try:
         logger.info("Sending image to OpenAI Vision API...")
 
-        # Get OpenAI client (lazy initialization)
-        client = _get_openai_client()
+        # Shared OpenAI client (created on first use)
+        client = provider_registry.openai()
 
         # Encode image to base64
         image_base64 = base64.b64encode(image_data).decode('utf-8')
@@ -46,7 +70,7 @@ def identify_cards_with_openai(image_data: bytes) -> List[Dict[str, Any]]:
 
         # Call OpenAI Vision API
         response = client.chat.completions.create(
-            model="gpt-4o",  # Latest vision model
+            model=OPENAI_MODEL,
             messages=[
                 {
                     "role": "user",
@@ -59,32 +83,12 @@ def identify_cards_with_openai(image_data: bytes) -> List[Dict[str, Any]]:
                         },
                         {
                             "type": "text",
-                            "text": """You are analyzing a Magic: The Gathering card photo.
-
-CRITICAL: Read the EXACT card name from the card itself - do not guess or infer.
-
-For each card visible:
-1. Read the card name at the TOP of the card (in the title box)
-2. Look for the set symbol (middle-right side of card)
-3. Look for the collector number at the BOTTOM of the card (format: 123/456)
-
-Return ONLY a JSON array in this exact format:
-[
-  {
-    "name": "Exact Card Name From Title",
-    "set": "SET",
-    "collector_number": "123",
-    "confidence": "high"
-  }
-]
-
-If you cannot read the set or collector_number clearly, omit those fields.
-Confidence should be: "high", "medium", or "low" based on image quality."""
+                            "text": prompt or IDENTIFY_PROMPT
                         }
                     ],
                 }
             ],
-            max_tokens=500
+            max_tokens=500 if prompt is None else 2048  # Batched prompts answer for many cards
         )
 
         # Parse response
@@ -107,4 +111,6 @@ Confidence should be: "high", "medium", or "low" based on image quality."""
 
     except Exception as e:
         logger.error(f"Error identifying cards with OpenAI Vision: {str(e)}")
+        if raise_errors:
+            raise
         return []
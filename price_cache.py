@@ -0,0 +1,94 @@
+"""
+Price Cache
+Card prices on their own expiry schedule, separate from card metadata
+(which rarely changes and is cached long-term by the card store)
+"""
+
+import os
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Optional
+
+# Scryfall refreshes prices about once a day
+PRICE_CACHE_TTL = float(os.getenv("PRICE_CACHE_TTL", "21600"))  # Seconds
+PRICE_CACHE_SIZE = int(os.getenv("PRICE_CACHE_SIZE", "20000"))  # Cards
+
+PRICE_FIELDS = ('usd', 'usd_foil', 'eur', 'tix')
+
+
+def extract_prices(prices: Optional[Dict[str, Any]]) -> Dict[str, Optional[str]]:
+    """
+    The price fields the API returns, from a Scryfall prices object
+
+    Args:
+        prices: Card's 'prices' field (may be None)
+
+    Returns:
+        Dictionary of prices (usd, usd_foil, eur, tix)
+    """
+    prices = prices or {}
+    return {field: prices.get(field) for field in PRICE_FIELDS}
+
+
+class PriceCache:
+    """LRU of card prices by Scryfall ID, with a TTL"""
+
+    def __init__(self, ttl: float = PRICE_CACHE_TTL, max_entries: int = PRICE_CACHE_SIZE):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, scryfall_id: str) -> Optional[Dict[str, Optional[str]]]:
+        """
+        Cached prices for a card
+
+        Args:
+            scryfall_id: Scryfall UUID
+
+        Returns:
+            Copy of the prices, or None if missing or expired
+        """
+        with self._lock:
+            entry = self._entries.get(scryfall_id)
+            if entry is None or entry[0] <= time.monotonic():
+                self.misses += 1
+                return None
+            self._entries.move_to_end(scryfall_id)
+            self.hits += 1
+            return dict(entry[1])
+
+    def put(self, scryfall_id: str, prices: Dict[str, Optional[str]]) -> None:
+        """
+        Cache prices for a card
+
+        Args:
+            scryfall_id: Scryfall UUID
+            prices: Prices as returned by extract_prices()
+        """
+        with self._lock:
+            self._entries[scryfall_id] = (time.monotonic() + self.ttl, dict(prices))
+            self._entries.move_to_end(scryfall_id)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and size"""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "ttl": self.ttl,
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0
+            }
+
+
+# Global cache instance
+price_cache = PriceCache()
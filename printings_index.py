@@ -0,0 +1,291 @@
+"""
+Printings Index
+Every printing of every card, grouped by oracle ID in compact in-memory
+arrays, so edition candidates come back instantly - all of them, not the
+first page of a /cards/search - and can be narrowed by frame, finish and
+border before any image comparison
+"""
+
+import json
+import logging
+import threading
+import time
+from array import array
+from typing import Any, Dict, List, Optional
+
+from card_store import card_store, normalize_name
+from name_index import name_index
+
+logger = logging.getLogger(__name__)
+
+# Finishes packed into one bitmask per printing
+FINISH_BITS = {'nonfoil': 1, 'foil': 2, 'etched': 4, 'glossy': 8}
+
+# Seconds between background checks for a rebuilt or re-synced card store
+PRINTINGS_INDEX_CHECK_INTERVAL = 30.0
+
+
+def _release_day(released_at: Optional[str]) -> int:
+    """Release date as a sortable YYYYMMDD integer (0 if unknown)"""
+    try:
+        return int((released_at or "").replace("-", ""))
+    except ValueError:
+        return 0
+
+
+class _Columns:
+    """Column-wise printings, filled once and then only read"""
+
+    def __init__(self):
+        self.groups: Dict[str, int] = {}  # oracle ID -> group number
+        self.names: Dict[str, int] = {}  # normalized name -> group number
+        self.group_start = array('I', [0])  # group -> first row (plus an end sentinel)
+        self.oracle_ids: List[str] = []
+        self.ids: List[str] = []
+        self.numbers: List[str] = []
+        self.images: List[Optional[str]] = []
+        self.released = array('I')
+        self.set_codes = array('I')
+        self.set_names = array('I')
+        self.frames = array('I')
+        self.frame_effects = array('I')
+        self.borders = array('I')
+        self.finishes = array('B')
+        self.strings: List[str] = []
+        self.string_codes: Dict[str, int] = {}
+
+    def intern(self, value: Optional[str]) -> int:
+        """Number of a repeated string in the string table"""
+        value = value or ""
+        code = self.string_codes.get(value)
+        if code is None:
+            code = self.string_codes[value] = len(self.strings)
+            self.strings.append(value)
+        return code
+
+    def add(self, scryfall_id, oracle_id, set_code, set_name, number, released_at,
+            frame, frame_effects, border, finishes, image_uri) -> None:
+        """Append a printing (rows arrive grouped by oracle ID)"""
+        if oracle_id not in self.groups:
+            if self.ids:
+                self.group_start.append(len(self.ids))
+            self.groups[oracle_id] = len(self.oracle_ids)
+            self.oracle_ids.append(oracle_id)
+
+        finish_bits = 0
+        for finish in json.loads(finishes or "[]"):
+            finish_bits |= FINISH_BITS.get(finish, 0)
+
+        self.ids.append(scryfall_id)
+        self.numbers.append(number)
+        self.images.append(image_uri)
+        self.released.append(_release_day(released_at))
+        self.set_codes.append(self.intern(set_code))
+        self.set_names.append(self.intern(set_name))
+        self.frames.append(self.intern(frame))
+        self.frame_effects.append(self.intern(",".join(json.loads(frame_effects or "[]"))))
+        self.borders.append(self.intern(border))
+        self.finishes.append(finish_bits)
+
+    def printing(self, group: int, row: int) -> Dict[str, Any]:
+        """Decode one row"""
+        released = self.released[row]
+        effects = self.strings[self.frame_effects[row]]
+        return {
+            "id": self.ids[row],
+            "oracle_id": self.oracle_ids[group],
+            "set": self.strings[self.set_codes[row]],
+            "set_name": self.strings[self.set_names[row]],
+            "collector_number": self.numbers[row],
+            "released_at": f"{released // 10000:04d}-{released // 100 % 100:02d}-{released % 100:02d}" if released else None,
+            "frame": self.strings[self.frames[row]] or None,
+            "frame_effects": effects.split(",") if effects else [],
+            "border_color": self.strings[self.borders[row]] or None,
+            "finishes": [finish for finish, bit in FINISH_BITS.items() if self.finishes[row] & bit],
+            "image_uri": self.images[row]
+        }
+
+
+class PrintingsIndex:
+    """
+    oracle_id -> printings, stored column-wise
+
+    Printings of one card occupy a contiguous, newest-first run of rows;
+    repeated strings (set codes and names, frames, borders, frame effects)
+    are interned once and referenced by number. Built from the card store
+    at startup and rebuilt in a background thread whenever the store is
+    rebuilt or re-synced; a rebuild fills new columns and swaps them in,
+    so lookups keep serving the previous columns and never see a partial
+    index or wait on a build.
+    """
+
+    def __init__(self):
+        self._columns = _Columns()
+        self._version: Optional[tuple] = None
+        self._lock = threading.Lock()
+        self._checked_at = float('-inf')
+
+        # Statistics
+        self.queries = 0
+        self.hits = 0
+        self.build_seconds = 0.0
+
+    def load(self) -> None:
+        """
+        (Re)build from the card store if it changed since the last build
+
+        Blocks for the whole build, so call it from a worker thread (startup
+        does); lookups go through refresh() instead.
+        """
+        meta = card_store.current_meta()
+        version = (meta.get('built_at'), meta.get('synced_at'))
+        if version == self._version:
+            return
+
+        with self._lock:
+            if version == self._version:
+                return
+            started = time.perf_counter()
+            columns = _Columns()
+            for row in card_store.printing_rows():
+                columns.add(*row)
+            if columns.ids:
+                columns.group_start.append(len(columns.ids))
+            columns.names = {
+                name: columns.groups[oracle_id]
+                for name, oracle_id in card_store.oracle_names()
+                if oracle_id in columns.groups
+            }
+
+            self._columns = columns
+            self._version = version
+            self.build_seconds = time.perf_counter() - started
+            if columns.ids:
+                logger.info(
+                    f"✓ Printings index built: {len(columns.ids)} printings of {len(columns.oracle_ids)} cards "
+                    f"in {self.build_seconds * 1000:.0f}ms"
+                )
+
+    def refresh(self) -> None:
+        """Rebuild in a background thread if the card store may have changed (never blocks)"""
+        now = time.monotonic()
+        if now - self._checked_at < PRINTINGS_INDEX_CHECK_INTERVAL or self._lock.locked():
+            return
+        self._checked_at = now
+        threading.Thread(target=self._load_in_background, name="printings-index", daemon=True).start()
+
+    def _load_in_background(self) -> None:
+        """load() for refresh()'s thread"""
+        try:
+            self.load()
+        except Exception as e:
+            logger.error(f"✗ Printings index build failed: {e}", exc_info=True)
+
+    def oracle_id_for(self, card_name: str) -> Optional[str]:
+        """
+        Oracle ID of a card by name, correcting misread names
+
+        Args:
+            card_name: Full or face name
+
+        Returns:
+            Oracle ID or None
+        """
+        self.refresh()
+        columns = self._columns
+        group = columns.names.get(normalize_name(card_name))
+        if group is None:
+            corrected = name_index.correct(card_name)
+            if corrected:
+                group = columns.names.get(normalize_name(corrected))
+        return columns.oracle_ids[group] if group is not None else None
+
+    def printings(
+        self,
+        oracle_id: str,
+        frame: Optional[str] = None,
+        finish: Optional[str] = None,
+        border: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Printings of a card, newest first
+
+        Args:
+            oracle_id: Scryfall oracle ID
+            frame: Only this frame ("1993", "1997", "2003", "2015", "future")
+            finish: Only printings available in this finish ("nonfoil", "foil", "etched")
+            border: Only this border color ("black", "white", "borderless", ...)
+
+        Returns:
+            Printings: {"id", "set", "set_name", "collector_number",
+            "released_at", "frame", "frame_effects", "border_color",
+            "finishes", "image_uri"}
+        """
+        self.refresh()
+        columns = self._columns
+        self.queries += 1
+        group = columns.groups.get(oracle_id)
+        if group is None:
+            return []
+        self.hits += 1
+
+        frame_code = columns.string_codes.get(frame, -1) if frame else None
+        border_code = columns.string_codes.get(border, -1) if border else None
+        finish_bit = FINISH_BITS.get(finish, 0) if finish else None
+
+        results = []
+        for row in range(columns.group_start[group], columns.group_start[group + 1]):
+            if frame_code is not None and columns.frames[row] != frame_code:
+                continue
+            if border_code is not None and columns.borders[row] != border_code:
+                continue
+            if finish_bit is not None and not columns.finishes[row] & finish_bit:
+                continue
+            results.append(columns.printing(group, row))
+        return results
+
+    def printings_for_name(
+        self,
+        card_name: str,
+        frame: Optional[str] = None,
+        finish: Optional[str] = None,
+        border: Optional[str] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Printings of a card by name (see printings())
+
+        Args:
+            card_name: Full or face name (misreads are corrected)
+            frame: Optional frame filter
+            finish: Optional finish filter
+            border: Optional border color filter
+
+        Returns:
+            Printings, newest first ([] if the card is unknown)
+        """
+        oracle_id = self.oracle_id_for(card_name)
+        if oracle_id is None:
+            return []
+        return self.printings(oracle_id, frame=frame, finish=finish, border=border)
+
+    @property
+    def available(self) -> bool:
+        """Whether the index holds any printings"""
+        self.refresh()
+        return bool(self._columns.ids)
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size and lookup counters"""
+        columns = self._columns
+        return {
+            "cards": len(columns.oracle_ids),
+            "printings": len(columns.ids),
+            "strings": len(columns.strings),
+            "build_ms": round(self.build_seconds * 1000),
+            "queries": self.queries,
+            "hits": self.hits
+        }
+
+
+# Global index instance
+printings_index = PrintingsIndex()
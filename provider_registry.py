@@ -0,0 +1,156 @@
+"""
+Vision Provider Registry
+One long-lived client per vision provider SDK, created on first use (or
+warmed up at startup) over a pooled keep-alive HTTP transport
+
+The SDK modules are imported the first time their provider is needed, so
+importing the app (and the CLI tools that share its modules) doesn't pay
+for SDKs a run never calls.
+"""
+
+import logging
+import os
+import threading
+import time
+from typing import Any, Callable, Dict
+
+import httpx
+
+logger = logging.getLogger(__name__)
+
+# Models used by each provider
+CLAUDE_MODEL = os.getenv("CLAUDE_MODEL", "claude-sonnet-4-5-20250929")
+OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-4o")
+GEMINI_MODEL = os.getenv("GEMINI_MODEL", "gemini-2.0-flash-exp")
+
+# Connection pool shared by the calls to one provider
+PROVIDER_MAX_CONNECTIONS = int(os.getenv("PROVIDER_MAX_CONNECTIONS", "20"))
+PROVIDER_MAX_KEEPALIVE = int(os.getenv("PROVIDER_MAX_KEEPALIVE", "10"))
+PROVIDER_KEEPALIVE_EXPIRY = 60.0  # Seconds an idle connection is kept
+PROVIDER_TIMEOUT = float(os.getenv("PROVIDER_TIMEOUT", "60"))  # Seconds per API call
+
+# Create the clients of configured providers in the background at startup
+PROVIDER_WARMUP = os.getenv("PROVIDER_WARMUP", "1") != "0"
+
+
+def create_provider_http_client() -> httpx.Client:
+    """
+    Create a pooled, keep-alive HTTP client for one provider SDK
+
+    Returns:
+        httpx client (sync - the SDKs are called from worker threads)
+    """
+    return httpx.Client(
+        limits=httpx.Limits(
+            max_connections=PROVIDER_MAX_CONNECTIONS,
+            max_keepalive_connections=PROVIDER_MAX_KEEPALIVE,
+            keepalive_expiry=PROVIDER_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(PROVIDER_TIMEOUT, connect=10.0)
+    )
+
+
+class ProviderRegistry:
+    """
+    Lazily created, shared clients for the Anthropic, OpenAI and Gemini SDKs
+
+    Each client is built once (under a lock, so concurrent first calls
+    don't race) and reused by every request; the Anthropic client is shared
+    by card identification and edition comparison. Missing API keys raise
+    ValueError on use, as the per-call clients did.
+    """
+
+    def __init__(self):
+        self._clients: Dict[str, Any] = {}
+        self._http_clients: Dict[str, httpx.Client] = {}
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.setup_seconds: Dict[str, float] = {}
+        self.uses: Dict[str, int] = {}
+
+    def _get(self, name: str, create: Callable[[], Any]) -> Any:
+        """The named client, created on first use"""
+        client = self._clients.get(name)
+        if client is None:
+            with self._lock:
+                client = self._clients.get(name)
+                if client is None:
+                    started = time.perf_counter()
+                    client = self._clients[name] = create()
+                    self.setup_seconds[name] = time.perf_counter() - started
+                    logger.info(f"✓ {name} client ready in {self.setup_seconds[name]:.2f}s")
+        self.uses[name] = self.uses.get(name, 0) + 1
+        return client
+
+    @staticmethod
+    def _api_key(variable: str) -> str:
+        """An API key from the environment (ValueError if unset)"""
+        api_key = os.getenv(variable)
+        if not api_key:
+            raise ValueError(f"{variable} environment variable is not set")
+        return api_key
+
+    def anthropic(self) -> Any:
+        """Shared anthropic.Anthropic client"""
+        def create():
+            api_key = self._api_key("ANTHROPIC_API_KEY")
+            import anthropic
+            http_client = self._http_clients["anthropic"] = create_provider_http_client()
+            return anthropic.Anthropic(api_key=api_key, http_client=http_client, timeout=PROVIDER_TIMEOUT)
+        return self._get("anthropic", create)
+
+    def openai(self) -> Any:
+        """Shared openai.OpenAI client"""
+        def create():
+            api_key = self._api_key("OPENAI_API_KEY")
+            import openai
+            http_client = self._http_clients["openai"] = create_provider_http_client()
+            return openai.OpenAI(api_key=api_key, http_client=http_client, timeout=PROVIDER_TIMEOUT)
+        return self._get("openai", create)
+
+    def gemini(self) -> Any:
+        """Shared Gemini GenerativeModel (genai.configure runs once)"""
+        def create():
+            api_key = self._api_key("GEMINI_API_KEY")
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            return genai.GenerativeModel(GEMINI_MODEL)
+        return self._get("gemini", create)
+
+    def warm_up(self) -> None:
+        """Create the clients of every provider with an API key (startup)"""
+        for name, variable, getter in (
+            ("anthropic", "ANTHROPIC_API_KEY", self.anthropic),
+            ("openai", "OPENAI_API_KEY", self.openai),
+            ("gemini", "GEMINI_API_KEY", self.gemini),
+        ):
+            if os.getenv(variable):
+                try:
+                    getter()
+                    self.uses[name] -= 1  # Warming up isn't a use
+                except Exception as e:
+                    logger.error(f"Failed to create {name} client: {e}")
+
+    def close(self) -> None:
+        """Close the pooled HTTP clients (shutdown)"""
+        with self._lock:
+            for http_client in self._http_clients.values():
+                http_client.close()
+            self._http_clients.clear()
+            self._clients.clear()
+
+    def stats(self) -> Dict[str, Any]:
+        """Which clients exist, how long they took to create and how often they were used"""
+        return {
+            name: {
+                "ready": name in self._clients,
+                "setup_ms": round(self.setup_seconds[name] * 1000, 1) if name in self.setup_seconds else None,
+                "uses": self.uses.get(name, 0)
+            }
+            for name in ("anthropic", "openai", "gemini")
+        }
+
+
+# Global registry instance
+provider_registry = ProviderRegistry()
@@ -0,0 +1,182 @@
+"""
+Rate Limiting
+Async token bucket with priority lanes, shared by all Scryfall API traffic
+"""
+
+import asyncio
+import logging
+import os
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Any, Optional
+
+logger = logging.getLogger(__name__)
+
+# Scryfall asks for at most ~10 requests per second. Rate + burst is the
+# most that can go out in any one-second window.
+SCRYFALL_RATE = float(os.getenv("SCRYFALL_RATE", "8"))  # Tokens per second
+SCRYFALL_BURST = int(os.getenv("SCRYFALL_BURST", "2"))  # Bucket capacity
+
+# Priority lanes (lower value is served first)
+INTERACTIVE = 0  # /scan and other user-facing lookups
+BACKGROUND = 1  # Bulk / database jobs
+LANES = (INTERACTIVE, BACKGROUND)
+
+_priority: ContextVar[int] = ContextVar("scryfall_priority", default=INTERACTIVE)
+
+
+def current_priority() -> int:
+    """Priority lane of the current task"""
+    return _priority.get()
+
+
+@contextmanager
+def background_priority():
+    """
+    Run Scryfall traffic in the background lane
+
+    Usage:
+        with background_priority():
+            await build_database()
+    """
+    token = _priority.set(BACKGROUND)
+    try:
+        yield
+    finally:
+        _priority.reset(token)
+
+
+class TokenBucket:
+    """
+    Token bucket rate limiter
+
+    Waiters are served FIFO within a lane, and a waiting interactive
+    request is always served before any background one. A Retry-After
+    from the server pauses the whole bucket.
+    """
+
+    def __init__(self, rate: float = SCRYFALL_RATE, burst: int = SCRYFALL_BURST):
+        self.rate = rate
+        self.capacity = burst
+        self._tokens = float(burst)
+        self._updated = time.monotonic()
+        self._paused_until = 0.0
+        self._lanes: Dict[int, deque] = {lane: deque() for lane in LANES}
+        self._dispatcher: Optional[asyncio.Task] = None
+
+        # Statistics
+        self.acquired = {lane: 0 for lane in LANES}
+        self.waited_seconds = {lane: 0.0 for lane in LANES}
+        self.pauses = 0
+
+    def _refill(self) -> None:
+        """Add tokens for the time elapsed since the last refill"""
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def _try_take(self) -> bool:
+        """Take a token if one is available and the bucket isn't paused"""
+        if time.monotonic() < self._paused_until:
+            return False
+        self._refill()
+        if self._tokens >= 1:
+            self._tokens -= 1
+            return True
+        return False
+
+    def _wait_time(self) -> float:
+        """Seconds until the next token could be available"""
+        now = time.monotonic()
+        if now < self._paused_until:
+            return self._paused_until - now
+        return max(0.001, (1 - self._tokens) / self.rate)
+
+    async def acquire(self, priority: Optional[int] = None) -> None:
+        """
+        Wait for a token
+
+        Args:
+            priority: Lane to wait in (defaults to the current task's lane)
+        """
+        priority = current_priority() if priority is None else priority
+        loop = asyncio.get_running_loop()
+
+        # Waiters from a previous event loop (e.g. an earlier asyncio.run) can never be served
+        if self._dispatcher is not None and self._dispatcher.get_loop() is not loop:
+            self._lanes = {lane: deque() for lane in LANES}
+            self._dispatcher = None
+
+        # Fast path: nobody is queued ahead of us
+        if not any(self._lanes[lane] for lane in LANES if lane <= priority) and self._try_take():
+            self.acquired[priority] += 1
+            return
+
+        started = time.monotonic()
+        future = loop.create_future()
+        self._lanes[priority].append(future)
+
+        if self._dispatcher is None or self._dispatcher.done():
+            self._dispatcher = loop.create_task(self._dispatch())
+
+        await future
+        self.acquired[priority] += 1
+        self.waited_seconds[priority] += time.monotonic() - started
+
+    async def _dispatch(self) -> None:
+        """Hand out tokens to queued waiters, highest priority lane first"""
+        while True:
+            lane = next((lane for lane in LANES if self._lanes[lane]), None)
+            if lane is None:
+                return
+
+            future = self._lanes[lane][0]
+            if future.done():
+                # Waiter was cancelled
+                self._lanes[lane].popleft()
+                continue
+
+            if self._try_take():
+                self._lanes[lane].popleft()
+                future.set_result(None)
+                continue
+
+            await asyncio.sleep(self._wait_time())
+
+    def pause(self, seconds: float) -> None:
+        """
+        Stop handing out tokens for a while (e.g. after a 429 Retry-After)
+
+        Args:
+            seconds: How long to pause
+        """
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+        self._tokens = 0.0
+        self._updated = time.monotonic()
+        self.pauses += 1
+        logger.warning(f"Scryfall rate limiter paused for {seconds:.1f}s")
+
+    def stats(self) -> Dict[str, Any]:
+        """Lane counters and current state"""
+        self._refill()
+        return {
+            "rate": self.rate,
+            "burst": self.capacity,
+            "tokens": round(self._tokens, 2),
+            "paused_for": round(max(0.0, self._paused_until - time.monotonic()), 2),
+            "pauses": self.pauses,
+            "lanes": {
+                name: {
+                    "waiting": len(self._lanes[lane]),
+                    "acquired": self.acquired[lane],
+                    "avg_wait_ms": round(self.waited_seconds[lane] / self.acquired[lane] * 1000, 1) if self.acquired[lane] else 0.0
+                }
+                for name, lane in (("interactive", INTERACTIVE), ("background", BACKGROUND))
+            }
+        }
+
+
+# Shared bucket for all Scryfall API traffic in this process
+scryfall_rate_limiter = TokenBucket()
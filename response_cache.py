@@ -0,0 +1,411 @@
+"""
+Scryfall Response Cache
+Two-tier (memory LRU + SQLite) cache of Scryfall API GET responses with
+per-endpoint TTLs and conditional revalidation of stale entries
+
+Disk writes are queued and committed in batches by a background thread,
+so storing responses never waits on SQLite in the request path.
+"""
+
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+from urllib.parse import urlencode
+
+from price_cache import PRICE_CACHE_TTL
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration (all overridable through the environment)
+RESPONSE_CACHE_ENABLED = os.getenv("SCRYFALL_CACHE", "1") != "0"
+RESPONSE_CACHE_MEMORY_MB = float(os.getenv("SCRYFALL_CACHE_MEMORY_MB", "32"))  # Memory tier budget
+RESPONSE_CACHE_DB = os.getenv("SCRYFALL_CACHE_DB", str(Path(__file__).parent / "cache" / "scryfall_responses.sqlite3"))
+RESPONSE_CACHE_DISK_MB = float(os.getenv("SCRYFALL_CACHE_DISK_MB", "512"))  # Disk tier budget
+RESPONSE_CACHE_STALE_KEEP = 7 * 86400  # Seconds an expired entry is kept for revalidation
+
+# Seconds before a response must be revalidated, by endpoint kind.
+# Override with e.g. SCRYFALL_CACHE_TTLS="search=600,card=86400"
+DEFAULT_TTLS = {
+    'search': 3600,  # /cards/search, /cards/named - new printings appear
+    'card': 7 * 86400,  # /cards/{id}, /cards/{set}/{number} - printings don't change
+    'set': 86400,  # /sets/...
+    'bulk': 300,  # /bulk-data - drives the sync, so keep it short
+    'default': 3600
+}
+
+# First matching rule decides the endpoint kind
+TTL_RULES = (
+    ('search', re.compile(r'^/cards/(search|named|autocomplete)\b')),
+    ('bulk', re.compile(r'^/bulk-data')),
+    ('set', re.compile(r'^/sets\b')),
+    ('card', re.compile(r'^/cards/')),
+)
+
+# Disk writes between pruning passes
+PRUNE_INTERVAL = 500
+
+# Seconds queued disk writes gather before they're committed together
+RESPONSE_CACHE_FLUSH_DELAY = float(os.getenv("SCRYFALL_CACHE_FLUSH_DELAY", "0.5"))
+
+
+def parse_ttls(value: Optional[str]) -> Dict[str, float]:
+    """
+    Parse a TTL override string
+
+    Args:
+        value: Comma-separated kind=seconds pairs
+
+    Returns:
+        DEFAULT_TTLS with the overrides applied
+    """
+    ttls = dict(DEFAULT_TTLS)
+    for part in (value or "").split(","):
+        if "=" in part:
+            kind, seconds = part.split("=", 1)
+            try:
+                ttls[kind.strip()] = float(seconds)
+            except ValueError:
+                logger.warning(f"Ignoring invalid Scryfall cache TTL: {part}")
+    return ttls
+
+
+def endpoint_kind(endpoint: str) -> str:
+    """Endpoint kind used to pick a TTL"""
+    for kind, pattern in TTL_RULES:
+        if pattern.match(endpoint):
+            return kind
+    return 'default'
+
+
+def cache_key(endpoint: str, params: Optional[Dict] = None) -> str:
+    """Stable key for an endpoint and its query params"""
+    if not params:
+        return endpoint
+    return f"{endpoint}?{urlencode(sorted(params.items()))}"
+
+
+def strip_prices(data: Any) -> Any:
+    """Remove prices from a card or list-of-cards response"""
+    if isinstance(data, dict):
+        if data.get('object') == 'card':
+            data.pop('prices', None)
+        elif data.get('object') == 'list':
+            for item in data.get('data', []):
+                if isinstance(item, dict):
+                    item.pop('prices', None)
+    return data
+
+
+class CachedResponse:
+    """A cached response body and its validators"""
+
+    __slots__ = ('body', 'stored_at', 'expires_at', 'etag', 'last_modified')
+
+    def __init__(self, body: bytes, stored_at: float, expires_at: float, etag: Optional[str], last_modified: Optional[str]):
+        self.body = body
+        self.stored_at = stored_at
+        self.expires_at = expires_at
+        self.etag = etag
+        self.last_modified = last_modified
+
+    def fresh(self, max_age: Optional[float] = None) -> bool:
+        """Whether the entry can be served without revalidation"""
+        now = time.time()
+        if now >= self.expires_at:
+            return False
+        return max_age is None or now - self.stored_at <= max_age
+
+    def conditional_headers(self) -> Dict[str, str]:
+        """Headers for a conditional revalidation request"""
+        headers = {}
+        if self.etag:
+            headers['If-None-Match'] = self.etag
+        if self.last_modified:
+            headers['If-Modified-Since'] = self.last_modified
+        return headers
+
+    def data(self) -> Any:
+        """
+        Decoded response (a fresh object per call)
+
+        Prices in a response older than the price TTL are stale, so they're
+        removed and callers fetch current ones.
+        """
+        data = json.loads(self.body)
+        if time.time() - self.stored_at > PRICE_CACHE_TTL:
+            strip_prices(data)
+        return data
+
+
+class ResponseCache:
+    """
+    Memory LRU over an optional SQLite tier, keyed by endpoint + params
+
+    Entries past their TTL are not served directly but kept (for up to
+    RESPONSE_CACHE_STALE_KEEP) so they can be revalidated with
+    If-None-Match / If-Modified-Since; a 304 refreshes them without a body.
+    """
+
+    def __init__(
+        self,
+        memory_bytes: int = int(RESPONSE_CACHE_MEMORY_MB * 1024 * 1024),
+        db_path: Optional[str] = RESPONSE_CACHE_DB,
+        disk_bytes: int = int(RESPONSE_CACHE_DISK_MB * 1024 * 1024),
+        ttls: Optional[Dict[str, float]] = None,
+        enabled: bool = RESPONSE_CACHE_ENABLED
+    ):
+        self.enabled = enabled
+        self.memory_bytes = memory_bytes
+        self.disk_bytes = disk_bytes
+        self.ttls = ttls or parse_ttls(os.getenv("SCRYFALL_CACHE_TTLS"))
+        self._entries: "OrderedDict[str, CachedResponse]" = OrderedDict()
+        self._memory_used = 0
+        self._lock = threading.Lock()
+        self._db = self._open_db(db_path) if db_path and enabled else None
+        self._writes = 0
+
+        # Disk writes waiting for the writer thread (key -> latest entry), and
+        # the batch it is committing; lookups check both before the disk
+        self._pending: Dict[str, CachedResponse] = {}
+        self._flushing: Dict[str, CachedResponse] = {}
+        self._write_db = self._open_db(db_path, log=False) if self._db is not None else None
+        self._write_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._writer: Optional[threading.Thread] = None
+
+        # Statistics
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+        self.stale = 0  # Expired entries found (then revalidated or re-fetched)
+        self.revalidated = 0
+        self.bytes_served = 0
+        self.bytes_fetched = 0
+
+    def _open_db(self, db_path: str, log: bool = True) -> Optional[sqlite3.Connection]:
+        """Open (and create if needed) the disk tier"""
+        try:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(db_path, check_same_thread=False, timeout=30.0)
+            # Lookups keep reading while the writer thread commits
+            db.execute("PRAGMA journal_mode = WAL")
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    body BLOB NOT NULL,
+                    stored_at REAL NOT NULL,
+                    expires_at REAL NOT NULL,
+                    etag TEXT,
+                    last_modified TEXT
+                )
+            """)
+            db.commit()
+            if log:
+                logger.info(f"Scryfall response cache disk tier: {db_path}")
+            return db
+        except Exception as e:
+            logger.error(f"Failed to open Scryfall response cache {db_path}: {e}")
+            return None
+
+    def ttl_for(self, endpoint: str) -> float:
+        """TTL for an endpoint"""
+        return self.ttls.get(endpoint_kind(endpoint), self.ttls['default'])
+
+    def lookup(self, key: str, max_age: Optional[float] = None) -> Tuple[Optional[CachedResponse], bool]:
+        """
+        Look up an entry in memory, then on disk
+
+        Args:
+            key: Key from cache_key()
+            max_age: Optional stricter age limit than the TTL (seconds)
+
+        Returns:
+            (entry or None, whether it can be served without revalidation)
+        """
+        if not self.enabled:
+            return None, False
+
+        with self._lock:
+            entry = self._entries.get(key)
+            tier = 'memory'
+            if entry is not None:
+                self._entries.move_to_end(key)
+            elif self._db is not None:
+                entry = self._lookup_disk(key)
+                tier = 'disk'
+
+            if entry is None:
+                self.misses += 1
+                return None, False
+
+            if not entry.fresh(max_age):
+                self.stale += 1
+                return entry, False
+
+            if tier == 'memory':
+                self.memory_hits += 1
+            else:
+                self.disk_hits += 1
+            self.bytes_served += len(entry.body)
+            return entry, True
+
+    def _lookup_disk(self, key: str) -> Optional[CachedResponse]:
+        """Read an entry from the disk tier and promote it to memory"""
+        entry = self._pending.get(key) or self._flushing.get(key)
+        if entry is not None:
+            self._put_memory(key, entry)
+            return entry
+
+        try:
+            row = self._db.execute(
+                "SELECT body, stored_at, expires_at, etag, last_modified FROM responses WHERE key = ?",
+                (key,)
+            ).fetchone()
+        except sqlite3.Error as e:
+            logger.error(f"Scryfall response cache disk lookup failed: {e}")
+            return None
+
+        if row is None:
+            return None
+        entry = CachedResponse(*row)
+        self._put_memory(key, entry)
+        return entry
+
+    def store(self, endpoint: str, key: str, body: bytes, etag: Optional[str], last_modified: Optional[str]) -> None:
+        """
+        Store a fresh response
+
+        Args:
+            endpoint: API endpoint (picks the TTL)
+            key: Key from cache_key()
+            body: Raw JSON body
+            etag: ETag response header
+            last_modified: Last-Modified response header
+        """
+        if not self.enabled:
+            return
+
+        now = time.time()
+        entry = CachedResponse(body, now, now + self.ttl_for(endpoint), etag, last_modified)
+        with self._lock:
+            self.bytes_fetched += len(body)
+            self._put_memory(key, entry)
+            self._write_disk(key, entry)
+
+    def refresh(self, endpoint: str, key: str, entry: CachedResponse) -> None:
+        """
+        Mark a stale entry current after a 304 Not Modified
+
+        Args:
+            endpoint: API endpoint (picks the TTL)
+            key: Key from cache_key()
+            entry: The revalidated entry
+        """
+        now = time.time()
+        with self._lock:
+            entry.stored_at = now
+            entry.expires_at = now + self.ttl_for(endpoint)
+            self.revalidated += 1
+            self.bytes_served += len(entry.body)
+            self._write_disk(key, entry)
+
+    def _put_memory(self, key: str, entry: CachedResponse) -> None:
+        """Insert into the LRU tier, evicting least recently used entries over budget"""
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self._memory_used -= len(old.body)
+        self._entries[key] = entry
+        self._memory_used += len(entry.body)
+        while self._memory_used > self.memory_bytes and len(self._entries) > 1:
+            _, evicted = self._entries.popitem(last=False)
+            self._memory_used -= len(evicted.body)
+
+    def _write_disk(self, key: str, entry: CachedResponse) -> None:
+        """Queue a write to the disk tier (caller holds the lock)"""
+        if self._db is None:
+            return
+        self._pending[key] = entry
+        if self._writer is None:
+            self._writer = threading.Thread(target=self._write_loop, name="response-cache-writer", daemon=True)
+            self._writer.start()
+        self._wakeup.set()
+
+    def _write_loop(self) -> None:
+        """Commit queued writes in batches (writer thread)"""
+        while True:
+            self._wakeup.wait()
+            time.sleep(RESPONSE_CACHE_FLUSH_DELAY)  # Let a burst of stores share one commit
+            self._wakeup.clear()
+            self.flush()
+
+    def flush(self) -> None:
+        """Commit every queued disk write now, pruning the tier now and then"""
+        if self._write_db is None:
+            return
+        with self._write_lock:
+            with self._lock:
+                self._flushing, self._pending = self._pending, {}
+            if not self._flushing:
+                return
+            try:
+                self._write_db.executemany(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)",
+                    [(key, entry.body, entry.stored_at, entry.expires_at, entry.etag, entry.last_modified)
+                     for key, entry in self._flushing.items()]
+                )
+                previous, self._writes = self._writes, self._writes + len(self._flushing)
+                if previous // PRUNE_INTERVAL != self._writes // PRUNE_INTERVAL:
+                    self._prune_disk()
+                self._write_db.commit()
+            except sqlite3.Error as e:
+                self._write_db.rollback()
+                logger.error(f"Scryfall response cache disk write failed: {e}")
+            finally:
+                with self._lock:
+                    self._flushing = {}
+
+    def _prune_disk(self) -> None:
+        """Drop long-expired entries, then the oldest ones over the size budget (writer connection)"""
+        self._write_db.execute("DELETE FROM responses WHERE expires_at < ?", (time.time() - RESPONSE_CACHE_STALE_KEEP,))
+        total = self._write_db.execute("SELECT COALESCE(SUM(LENGTH(body)), 0) FROM responses").fetchone()[0]
+        if total > self.disk_bytes:
+            excess = total - self.disk_bytes
+            self._write_db.execute("""
+                DELETE FROM responses WHERE key IN (
+                    SELECT key FROM (
+                        SELECT key, SUM(LENGTH(body)) OVER (ORDER BY stored_at) AS running FROM responses
+                    ) WHERE running <= ?
+                )
+            """, (excess,))
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss and byte counters"""
+        with self._lock:
+            hits = self.memory_hits + self.disk_hits
+            lookups = hits + self.misses + self.stale
+            return {
+                "enabled": self.enabled,
+                "memory_entries": len(self._entries),
+                "memory_bytes": self._memory_used,
+                "disk_tier": self._db is not None,
+                "disk_writes_pending": len(self._pending),
+                "memory_hits": self.memory_hits,
+                "disk_hits": self.disk_hits,
+                "misses": self.misses,
+                "stale": self.stale,
+                "revalidated": self.revalidated,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "bytes_served": self.bytes_served,
+                "bytes_fetched": self.bytes_fetched
+            }
+
+
+# Global cache instance
+response_cache = ResponseCache()
@@ -0,0 +1,218 @@
+"""
+Result Alignment
+Matches up the cards in different vision providers' answers before they
+are voted on, by name similarity (and by position in the photo when the
+providers return bounding boxes) rather than by list index, so a provider
+listing the same cards in another order still agrees
+"""
+
+import logging
+import os
+from functools import lru_cache
+from typing import Any, Dict, List, Optional, Sequence
+
+from name_index import edit_distance, fuzzy_key
+
+logger = logging.getLogger(__name__)
+
+# Cards can only be paired when they are in the same spot: with bounding
+# boxes, boxes overlapping by ALIGN_MIN_OVERLAP; without, names at least
+# this similar (1.0 = same name) or the same list slot - providers
+# disagreeing about one card rather than seeing different cards
+ALIGN_MIN_SIMILARITY = float(os.getenv("ALIGN_MIN_SIMILARITY", "0.7"))
+ALIGN_MIN_OVERLAP = 0.3  # Bounding box IoU that counts as the same spot
+
+# Weight of bounding box overlap against name similarity, when both cards
+# have a box, and of list order (breaks ties between copies of a card)
+BBOX_WEIGHT = 0.5
+ORDER_WEIGHT = 0.1
+
+
+@lru_cache(maxsize=4096)
+def name_similarity(a: str, b: str) -> float:
+    """
+    Similarity of two card names, ignoring case, accents and punctuation
+
+    Args:
+        a: First name
+        b: Second name
+
+    Returns:
+        1 - edit distance / length of the longer name (0 if either is
+        empty, or if they are less than ALIGN_MIN_SIMILARITY alike)
+    """
+    a, b = fuzzy_key(a or ""), fuzzy_key(b or "")
+    if not a or not b:
+        return 0.0
+    longest = max(len(a), len(b))
+    max_edits = int(longest * (1 - ALIGN_MIN_SIMILARITY) + 1e-9)
+    distance = edit_distance(a, b, max_edits)
+    return 1 - distance / longest if distance <= max_edits else 0.0
+
+
+def box_overlap(a: Optional[Sequence[float]], b: Optional[Sequence[float]]) -> Optional[float]:
+    """
+    Intersection over union of two [x0, y0, x1, y1] boxes
+
+    Returns:
+        IoU, or None unless both boxes are given
+    """
+    try:
+        ax0, ay0, ax1, ay1 = (float(v) for v in a)
+        bx0, by0, bx1, by1 = (float(v) for v in b)
+    except (TypeError, ValueError):
+        return None
+    width = max(0.0, min(ax1, bx1) - max(ax0, bx0))
+    height = max(0.0, min(ay1, by1) - max(ay0, by0))
+    union = (ax1 - ax0) * (ay1 - ay0) + (bx1 - bx0) * (by1 - by0) - width * height
+    return width * height / union if union > 0 else 0.0
+
+
+def assign(scores: List[List[float]]) -> List[Optional[int]]:
+    """
+    Maximum-score one-to-one assignment (Hungarian algorithm)
+
+    Args:
+        scores: scores[row][column], rows and columns of any count
+
+    Returns:
+        Column assigned to each row (None for rows left over when there
+        are more rows than columns)
+    """
+    rows = len(scores)
+    columns = len(scores[0]) if rows else 0
+    if not rows or not columns:
+        return [None] * rows
+    if rows > columns:
+        transposed = assign([list(column) for column in zip(*scores)])
+        assignment: List[Optional[int]] = [None] * rows
+        for column, row in enumerate(transposed):
+            assignment[row] = column
+        return assignment
+
+    # Shortest augmenting paths with potentials on a cost (= -score) matrix,
+    # 1-based with row/column 0 as the virtual start
+    infinity = float("inf")
+    u = [0.0] * (rows + 1)
+    v = [0.0] * (columns + 1)
+    row_of = [0] * (columns + 1)  # Row assigned to each column (0 = none)
+    way = [0] * (columns + 1)
+    for row in range(1, rows + 1):
+        row_of[0] = row
+        column = 0
+        min_slack = [infinity] * (columns + 1)
+        used = [False] * (columns + 1)
+        while row_of[column]:
+            used[column] = True
+            current_row = row_of[column]
+            delta, next_column = infinity, 0
+            for j in range(1, columns + 1):
+                if not used[j]:
+                    slack = -scores[current_row - 1][j - 1] - u[current_row] - v[j]
+                    if slack < min_slack[j]:
+                        min_slack[j], way[j] = slack, column
+                    if min_slack[j] < delta:
+                        delta, next_column = min_slack[j], j
+            for j in range(columns + 1):
+                if used[j]:
+                    u[row_of[j]] += delta
+                    v[j] -= delta
+                else:
+                    min_slack[j] -= delta
+            column = next_column
+        while column:
+            previous = way[column]
+            row_of[column] = row_of[previous]
+            column = previous
+
+    assignment = [None] * rows
+    for column in range(1, columns + 1):
+        if row_of[column]:
+            assignment[row_of[column] - 1] = column - 1
+    return assignment
+
+
+def _position(index: int, count: int) -> float:
+    """Relative position of a card in a provider's list (0-1)"""
+    return (index + 0.5) / count
+
+
+def align_results(provider_results: Dict[str, List[Dict[str, Any]]]) -> List[Dict[str, Dict[str, Any]]]:
+    """
+    Group the providers' cards into the physical cards they describe
+
+    Providers are aligned one at a time against the groups so far: each
+    card joins the group it scores best against (the assignment maximizes
+    the total), or starts a new group when it matches none.
+
+    Args:
+        provider_results: Cards per provider, in priority order
+
+    Returns:
+        Groups (provider name -> that provider's card), in list order
+    """
+    groups: List[Dict[str, Any]] = []  # {"cards": {provider: (index, count, card)}}
+    for provider, cards in provider_results.items():
+        cards = [(i, card) for i, card in enumerate(cards) if card]
+        count = len(provider_results[provider])
+        if not groups:
+            groups = [{"cards": {provider: (i, count, card)}} for i, card in cards]
+            continue
+
+        # Score every (group, card) pair by its best match among the group's cards
+        scores, same_spot = [], []
+        for group in groups:
+            row_scores, row_spots = [], []
+            for i, card in cards:
+                best, spot = -1.0, False
+                for other_index, other_count, other in group["cards"].values():
+                    similarity = name_similarity(card.get('name') or '', other.get('name') or '')
+                    overlap = box_overlap(card.get('bbox'), other.get('bbox'))
+                    order = 1 - abs(_position(i, count) - _position(other_index, other_count))
+                    score = similarity if overlap is None else (1 - BBOX_WEIGHT) * similarity + BBOX_WEIGHT * overlap
+                    if overlap is not None:
+                        here = overlap >= ALIGN_MIN_OVERLAP
+                    else:
+                        here = similarity >= ALIGN_MIN_SIMILARITY or (count == other_count and i == other_index)
+                    if here:
+                        best = max(best, score + ORDER_WEIGHT * order)
+                        spot = True
+                row_scores.append(best)
+                row_spots.append(spot)
+            scores.append(row_scores)
+            same_spot.append(row_spots)
+
+        matched = set()
+        for group_index, card_index in enumerate(assign(scores)):
+            if card_index is not None and same_spot[group_index][card_index]:
+                i, card = cards[card_index]
+                first_index = next(iter(groups[group_index]["cards"].values()))[0]
+                if i != first_index:
+                    logger.debug(f"Aligned {provider} card {i + 1} ('{card.get('name')}') with card {first_index + 1}")
+                groups[group_index]["cards"][provider] = (i, count, card)
+                matched.add(card_index)
+
+        # A provider that saw no more cards than are known, without boxes to
+        # say where, misread the cards it couldn't match: pair those with the
+        # remaining groups by list position
+        open_groups = [group for group in groups if provider not in group["cards"]]
+        leftover = [card_index for card_index in range(len(cards)) if card_index not in matched]
+        if leftover and open_groups and len(cards) <= len(groups) and not any(card.get('bbox') for _, card in cards):
+            scores = [
+                [-abs(_position(cards[card_index][0], count) - _position(*next(iter(group["cards"].values()))[:2]))
+                 for card_index in leftover]
+                for group in open_groups
+            ]
+            for group, column in zip(open_groups, assign(scores)):
+                if column is not None:
+                    i, card = cards[leftover[column]]
+                    group["cards"][provider] = (i, count, card)
+                    matched.add(leftover[column])
+        groups.extend(
+            {"cards": {provider: (i, count, card)}}
+            for card_index, (i, card) in enumerate(cards) if card_index not in matched
+        )
+
+    # In the order the highest-priority provider in each group listed it
+    groups.sort(key=lambda group: _position(*next(iter(group["cards"].values()))[:2]))
+    return [{provider: card for provider, (_, _, card) in group["cards"].items()} for group in groups]
@@ -0,0 +1,345 @@
+"""
+Scan Result Cache
+Content-addressed cache for /scan results, so re-uploads and near-identical
+retakes skip the vision + Scryfall pipeline
+"""
+
+import hashlib
+import io
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from PIL import Image, ImageOps
+
+logger = logging.getLogger(__name__)
+
+# Cache configuration (all overridable through the environment)
+SCAN_CACHE_SIZE = int(os.getenv("SCAN_CACHE_SIZE", "256"))  # In-memory entries
+SCAN_CACHE_TTL = float(os.getenv("SCAN_CACHE_TTL", "86400"))  # Seconds
+SCAN_CACHE_HAMMING = int(os.getenv("SCAN_CACHE_HAMMING", "12"))  # Max bit distance for near duplicates
+SCAN_CACHE_DB = os.getenv("SCAN_CACHE_DB")  # Optional SQLite file for the disk tier
+SCAN_CACHE_DISK_SIZE = int(os.getenv("SCAN_CACHE_DISK_SIZE", "5000"))  # Disk tier entries
+
+# Perceptual hash size (HASH_SIZE x HASH_SIZE bits)
+HASH_SIZE = 16
+
+# Cache key: (sha256 digest of the upload, perceptual hash or None)
+ScanKey = Tuple[str, Optional[int]]
+
+
+def image_digest(image_data: bytes) -> str:
+    """
+    Exact content digest of an upload
+
+    Args:
+        image_data: Raw image bytes
+
+    Returns:
+        Hex SHA-256 digest
+    """
+    return hashlib.sha256(image_data).hexdigest()
+
+
+def perceptual_hash(image_data: bytes, hash_size: int = HASH_SIZE) -> Optional[int]:
+    """
+    Difference hash of the normalized image
+
+    The image is EXIF-rotated, converted to grayscale and shrunk before
+    hashing, so re-encodes and retakes of the same scene land within a
+    few bits of each other.
+
+    Args:
+        image_data: Raw image bytes
+        hash_size: Hash side length in bits
+
+    Returns:
+        Hash as an integer, or None if the image can't be decoded
+    """
+    try:
+        image = Image.open(io.BytesIO(image_data))
+        image = ImageOps.exif_transpose(image)
+        image = image.convert("L").resize((hash_size + 1, hash_size), Image.LANCZOS)
+        pixels = list(image.getdata())
+    except Exception as e:
+        logger.warning(f"Could not compute perceptual hash: {e}")
+        return None
+
+    value = 0
+    for row in range(hash_size):
+        offset = row * (hash_size + 1)
+        for col in range(hash_size):
+            value = (value << 1) | (pixels[offset + col] > pixels[offset + col + 1])
+    return value
+
+
+def hamming_distance(a: int, b: int) -> int:
+    """Number of differing bits between two hashes"""
+    return (a ^ b).bit_count()
+
+
+class ScanCache:
+    """
+    Two-tier LRU cache of scan results
+
+    Entries are looked up by exact upload digest first, then by perceptual
+    hash within a Hamming tolerance. The memory tier is an LRU; the optional
+    disk tier (SQLite) survives restarts. Both tiers honour the same TTL.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = SCAN_CACHE_SIZE,
+        ttl: float = SCAN_CACHE_TTL,
+        max_distance: int = SCAN_CACHE_HAMMING,
+        db_path: Optional[str] = SCAN_CACHE_DB,
+        max_disk_entries: int = SCAN_CACHE_DISK_SIZE
+    ):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.max_distance = max_distance
+        self.max_disk_entries = max_disk_entries
+        self._entries: "OrderedDict[Tuple[str, str], Dict[str, Any]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db = self._open_db(db_path) if db_path else None
+
+        # Statistics
+        self.exact_hits = 0
+        self.near_hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def _open_db(self, db_path: str) -> Optional[sqlite3.Connection]:
+        """Open (and create if needed) the disk tier"""
+        try:
+            Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+            db = sqlite3.connect(db_path, check_same_thread=False)
+            db.execute("""
+                CREATE TABLE IF NOT EXISTS scan_cache (
+                    digest TEXT NOT NULL,
+                    scan_mode TEXT NOT NULL,
+                    phash TEXT,
+                    created_at REAL NOT NULL,
+                    compute_seconds REAL NOT NULL,
+                    result TEXT NOT NULL,
+                    PRIMARY KEY (digest, scan_mode)
+                )
+            """)
+            db.commit()
+            logger.info(f"Scan cache disk tier: {db_path}")
+            return db
+        except Exception as e:
+            logger.error(f"Failed to open scan cache database {db_path}: {e}")
+            return None
+
+    def key_for(self, image_data: bytes) -> ScanKey:
+        """Compute the cache key for an upload"""
+        return image_digest(image_data), perceptual_hash(image_data)
+
+    def lookup(self, key: ScanKey, scan_mode: str) -> Optional[Dict[str, Any]]:
+        """
+        Find a cached result for an upload
+
+        Args:
+            key: Key from key_for()
+            scan_mode: Scan mode the result must have been produced with
+
+        Returns:
+            Entry with 'result', 'compute_seconds', 'match' ('exact' or 'near')
+            and 'distance', or None on a miss
+        """
+        digest, phash = key
+        now = time.time()
+
+        with self._lock:
+            entry = self._lookup_memory(digest, phash, scan_mode, now)
+            if entry is None and self._db is not None:
+                entry = self._lookup_disk(digest, phash, scan_mode, now)
+
+            if entry is None:
+                self.misses += 1
+                return None
+
+            if entry['match'] == 'exact':
+                self.exact_hits += 1
+            else:
+                self.near_hits += 1
+
+        # Hand out a copy so callers can refresh prices without touching the cache
+        return dict(entry, result=json.loads(json.dumps(entry['result'])))
+
+    def _lookup_memory(
+        self,
+        digest: str,
+        phash: Optional[int],
+        scan_mode: str,
+        now: float
+    ) -> Optional[Dict[str, Any]]:
+        """Exact then near-duplicate lookup in the LRU tier"""
+        entry = self._entries.get((digest, scan_mode))
+        if entry and now - entry['created_at'] <= self.ttl:
+            self._entries.move_to_end((digest, scan_mode))
+            return dict(entry, match='exact', distance=0)
+
+        if phash is None:
+            return None
+
+        best_key, best_distance = None, None
+        for cache_key, candidate in self._entries.items():
+            if cache_key[1] != scan_mode or candidate['phash'] is None:
+                continue
+            if now - candidate['created_at'] > self.ttl:
+                continue
+            distance = hamming_distance(phash, candidate['phash'])
+            if distance <= self.max_distance and (best_distance is None or distance < best_distance):
+                best_key, best_distance = cache_key, distance
+
+        if best_key is None:
+            return None
+
+        self._entries.move_to_end(best_key)
+        return dict(self._entries[best_key], match='near', distance=best_distance)
+
+    def _lookup_disk(
+        self,
+        digest: str,
+        phash: Optional[int],
+        scan_mode: str,
+        now: float
+    ) -> Optional[Dict[str, Any]]:
+        """Exact then near-duplicate lookup in the disk tier"""
+        try:
+            cutoff = now - self.ttl
+            row = self._db.execute(
+                "SELECT digest, phash, created_at, compute_seconds, result FROM scan_cache "
+                "WHERE digest = ? AND scan_mode = ? AND created_at >= ?",
+                (digest, scan_mode, cutoff)
+            ).fetchone()
+            match, distance = 'exact', 0
+
+            if row is None and phash is not None:
+                best_digest = None
+                for candidate_digest, candidate_phash in self._db.execute(
+                    "SELECT digest, phash FROM scan_cache "
+                    "WHERE scan_mode = ? AND created_at >= ? AND phash IS NOT NULL",
+                    (scan_mode, cutoff)
+                ):
+                    candidate_distance = hamming_distance(phash, int(candidate_phash, 16))
+                    if candidate_distance <= self.max_distance and (best_digest is None or candidate_distance < distance):
+                        best_digest, distance = candidate_digest, candidate_distance
+
+                if best_digest is not None:
+                    row = self._db.execute(
+                        "SELECT digest, phash, created_at, compute_seconds, result FROM scan_cache "
+                        "WHERE digest = ? AND scan_mode = ?",
+                        (best_digest, scan_mode)
+                    ).fetchone()
+                    match = 'near'
+
+            if row is None:
+                return None
+
+            entry = {
+                'phash': int(row[1], 16) if row[1] else None,
+                'created_at': row[2],
+                'compute_seconds': row[3],
+                'result': json.loads(row[4])
+            }
+            # Promote to the memory tier
+            self._put_memory(row[0], scan_mode, entry)
+            return dict(entry, match=match, distance=distance)
+
+        except Exception as e:
+            logger.error(f"Scan cache disk lookup failed: {e}")
+            return None
+
+    def store(
+        self,
+        key: ScanKey,
+        scan_mode: str,
+        result: Dict[str, Any],
+        compute_seconds: float
+    ) -> None:
+        """
+        Store a scan result
+
+        Args:
+            key: Key from key_for()
+            scan_mode: Scan mode the result was produced with
+            result: JSON-serializable scan response
+            compute_seconds: How long the full pipeline took (used for saved-latency stats)
+        """
+        digest, phash = key
+        entry = {
+            'phash': phash,
+            'created_at': time.time(),
+            'compute_seconds': compute_seconds,
+            'result': json.loads(json.dumps(result))
+        }
+
+        with self._lock:
+            self._put_memory(digest, scan_mode, entry)
+
+            if self._db is not None:
+                try:
+                    self._db.execute(
+                        "INSERT OR REPLACE INTO scan_cache VALUES (?, ?, ?, ?, ?, ?)",
+                        (
+                            digest,
+                            scan_mode,
+                            format(phash, 'x') if phash is not None else None,
+                            entry['created_at'],
+                            compute_seconds,
+                            json.dumps(entry['result'])
+                        )
+                    )
+                    self._db.execute(
+                        "DELETE FROM scan_cache WHERE created_at < ?",
+                        (entry['created_at'] - self.ttl,)
+                    )
+                    self._db.execute(
+                        "DELETE FROM scan_cache WHERE rowid NOT IN "
+                        "(SELECT rowid FROM scan_cache ORDER BY created_at DESC LIMIT ?)",
+                        (self.max_disk_entries,)
+                    )
+                    self._db.commit()
+                except Exception as e:
+                    logger.error(f"Scan cache disk write failed: {e}")
+
+    def _put_memory(self, digest: str, scan_mode: str, entry: Dict[str, Any]) -> None:
+        """Insert into the LRU tier, evicting the least recently used entry"""
+        self._entries[(digest, scan_mode)] = entry
+        self._entries.move_to_end((digest, scan_mode))
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def record_saved(self, seconds: float) -> None:
+        """Record pipeline time avoided by a cache hit"""
+        with self._lock:
+            self.saved_seconds += max(0.0, seconds)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit rate and saved latency"""
+        with self._lock:
+            hits = self.exact_hits + self.near_hits
+            lookups = hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "disk_tier": self._db is not None,
+                "exact_hits": self.exact_hits,
+                "near_hits": self.near_hits,
+                "misses": self.misses,
+                "hit_rate": round(hits / lookups, 3) if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 2),
+                "avg_saved_seconds": round(self.saved_seconds / hits, 2) if hits else 0.0
+            }
+
+
+# Global cache instance
+scan_cache = ScanCache()
@@ -0,0 +1,437 @@
+"""
+Scan Job Queue
+Background processing of scans so long Pro Scans don't hit client timeouts
+
+Jobs are submitted with POST /scan/jobs, processed by a bounded worker
+pool, and fetched with GET /scan/jobs/{id} (or pushed to a callback URL).
+The default queue is SQLite-backed so it runs without external services;
+other backends only need to implement JobQueue.
+"""
+
+import asyncio
+import ipaddress
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+import uuid
+from abc import ABC, abstractmethod
+from datetime import datetime
+from pathlib import Path
+from typing import Dict, Any, Optional, List
+from urllib.parse import urlsplit
+
+from scan_pipeline import scan_image
+from scryfall_integration import get_http_client
+
+logger = logging.getLogger(__name__)
+
+# Job queue configuration
+SCAN_JOB_QUEUE = os.getenv("SCAN_JOB_QUEUE", "sqlite")  # Queue backend
+SCAN_JOB_DB = os.getenv("SCAN_JOB_DB", str(Path(__file__).parent / "cache" / "scan_jobs.sqlite3"))
+SCAN_JOB_WORKERS = int(os.getenv("SCAN_JOB_WORKERS", "2"))
+SCAN_JOB_MAX_PENDING = int(os.getenv("SCAN_JOB_MAX_PENDING", "500"))
+SCAN_JOB_RETENTION = float(os.getenv("SCAN_JOB_RETENTION", "86400"))  # Seconds to keep finished jobs
+SCAN_JOB_POLL_INTERVAL = 2.0  # Seconds between queue polls when idle
+SCAN_JOB_PURGE_INTERVAL = float(os.getenv("SCAN_JOB_PURGE_INTERVAL", "3600"))  # Seconds between purges
+
+# Hosts callbacks may be sent to (comma-separated); when unset, any host
+# resolving only to public addresses is accepted
+SCAN_CALLBACK_ALLOWED_HOSTS = {
+    host.strip().lower() for host in os.getenv("SCAN_CALLBACK_ALLOWED_HOSTS", "").split(",") if host.strip()
+}
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+COMPLETED = "completed"
+FAILED = "failed"
+
+
+class QueueFullError(Exception):
+    """Raised when too many jobs are already waiting"""
+
+
+class CallbackURLError(ValueError):
+    """Raised when a callback URL points somewhere the server must not call"""
+
+
+async def check_callback_url(callback_url: str) -> None:
+    """
+    Make sure a callback URL is safe for the server to POST to
+
+    The URL must be http(s). Its host must be in SCAN_CALLBACK_ALLOWED_HOSTS
+    when that is set; otherwise every address it resolves to must be
+    public (no loopback, private, link-local or reserved ranges), so
+    callbacks can't be used to reach internal services.
+
+    Args:
+        callback_url: URL supplied by the client
+
+    Raises:
+        CallbackURLError: If the URL must not be called
+    """
+    parts = urlsplit(callback_url)
+    if parts.scheme not in ("http", "https") or not parts.hostname:
+        raise CallbackURLError("callback_url must be an http(s) URL")
+
+    host = parts.hostname.lower()
+    if SCAN_CALLBACK_ALLOWED_HOSTS:
+        if host not in SCAN_CALLBACK_ALLOWED_HOSTS:
+            raise CallbackURLError(f"callback_url host {host} is not allowed")
+        return
+
+    try:
+        port = parts.port or (443 if parts.scheme == "https" else 80)
+        addresses = await asyncio.get_running_loop().getaddrinfo(host, port)
+    except (OSError, ValueError) as e:
+        raise CallbackURLError(f"callback_url host {host} cannot be resolved: {e}")
+
+    for *_, sockaddr in addresses:
+        address = ipaddress.ip_address(sockaddr[0].split("%")[0])
+        if not address.is_global or address.is_multicast:
+            raise CallbackURLError(f"callback_url host {host} resolves to a non-public address")
+
+
+class JobQueue(ABC):
+    """Interface every scan job queue backend implements"""
+
+    @abstractmethod
+    def submit(self, image_data: bytes, scan_mode: str, callback_url: Optional[str] = None) -> str:
+        """Enqueue a scan and return its job id"""
+
+    @abstractmethod
+    def claim(self) -> Optional[Dict[str, Any]]:
+        """Atomically move the oldest queued job to running and return it (with 'image_data')"""
+
+    @abstractmethod
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        """Mark a job as completed with its scan result"""
+
+    @abstractmethod
+    def fail(self, job_id: str, error: str) -> None:
+        """Mark a job as failed"""
+
+    @abstractmethod
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        """Public view of a job (no image data), or None if unknown"""
+
+    @abstractmethod
+    def recover(self) -> int:
+        """Requeue jobs left running by a previous process; returns how many"""
+
+    @abstractmethod
+    def purge(self, older_than: float) -> int:
+        """Delete finished jobs older than the given number of seconds"""
+
+
+class SQLiteJobQueue(JobQueue):
+    """Job queue stored in a local SQLite database"""
+
+    def __init__(self, db_path: str = SCAN_JOB_DB, max_pending: int = SCAN_JOB_MAX_PENDING):
+        Path(db_path).parent.mkdir(parents=True, exist_ok=True)
+        self.max_pending = max_pending
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(db_path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("""
+            CREATE TABLE IF NOT EXISTS scan_jobs (
+                id TEXT PRIMARY KEY,
+                status TEXT NOT NULL,
+                scan_mode TEXT NOT NULL,
+                callback_url TEXT,
+                image_data BLOB,
+                result TEXT,
+                error TEXT,
+                created_at REAL NOT NULL,
+                started_at REAL,
+                finished_at REAL
+            )
+        """)
+        self._db.execute("CREATE INDEX IF NOT EXISTS idx_scan_jobs_status ON scan_jobs (status, created_at)")
+        self._db.commit()
+        logger.info(f"Scan job queue: {db_path}")
+
+    def submit(self, image_data: bytes, scan_mode: str, callback_url: Optional[str] = None) -> str:
+        job_id = uuid.uuid4().hex
+
+        with self._lock:
+            pending = self._db.execute(
+                "SELECT COUNT(*) FROM scan_jobs WHERE status IN (?, ?)", (QUEUED, RUNNING)
+            ).fetchone()[0]
+            if pending >= self.max_pending:
+                raise QueueFullError(f"{pending} scan jobs already pending")
+
+            self._db.execute(
+                "INSERT INTO scan_jobs (id, status, scan_mode, callback_url, image_data, created_at) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (job_id, QUEUED, scan_mode, callback_url, image_data, time.time())
+            )
+            self._db.commit()
+
+        return job_id
+
+    def claim(self) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT * FROM scan_jobs WHERE status = ? ORDER BY created_at LIMIT 1", (QUEUED,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            started_at = time.time()
+            self._db.execute(
+                "UPDATE scan_jobs SET status = ?, started_at = ? WHERE id = ?",
+                (RUNNING, started_at, row['id'])
+            )
+            self._db.commit()
+
+        job = dict(row)
+        job['status'] = RUNNING
+        job['started_at'] = started_at
+        return job
+
+    def complete(self, job_id: str, result: Dict[str, Any]) -> None:
+        self._finish(job_id, COMPLETED, result=json.dumps(result))
+
+    def fail(self, job_id: str, error: str) -> None:
+        self._finish(job_id, FAILED, error=error)
+
+    def _finish(self, job_id: str, status: str, result: Optional[str] = None, error: Optional[str] = None) -> None:
+        """Record the outcome and drop the image, which is no longer needed"""
+        with self._lock:
+            self._db.execute(
+                "UPDATE scan_jobs SET status = ?, result = ?, error = ?, finished_at = ?, image_data = NULL "
+                "WHERE id = ?",
+                (status, result, error, time.time(), job_id)
+            )
+            self._db.commit()
+
+    def get(self, job_id: str) -> Optional[Dict[str, Any]]:
+        with self._lock:
+            row = self._db.execute(
+                "SELECT id, status, scan_mode, callback_url, result, error, created_at, started_at, finished_at "
+                "FROM scan_jobs WHERE id = ?",
+                (job_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        job = dict(row)
+        job['result'] = json.loads(job['result']) if job['result'] else None
+        return job
+
+    def recover(self) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "UPDATE scan_jobs SET status = ?, started_at = NULL WHERE status = ?", (QUEUED, RUNNING)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+    def purge(self, older_than: float) -> int:
+        with self._lock:
+            cursor = self._db.execute(
+                "DELETE FROM scan_jobs WHERE status IN (?, ?) AND finished_at < ?",
+                (COMPLETED, FAILED, time.time() - older_than)
+            )
+            self._db.commit()
+            return cursor.rowcount
+
+
+# Available queue backends (name -> factory)
+QUEUE_BACKENDS = {
+    "sqlite": SQLiteJobQueue,
+}
+
+
+def create_job_queue(backend: str = SCAN_JOB_QUEUE) -> JobQueue:
+    """
+    Create the configured job queue backend
+
+    Args:
+        backend: Backend name from QUEUE_BACKENDS
+
+    Returns:
+        Job queue instance
+    """
+    if backend not in QUEUE_BACKENDS:
+        raise ValueError(f"Unknown scan job queue backend: {backend}")
+    return QUEUE_BACKENDS[backend]()
+
+
+def format_job(job: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Public JSON view of a job
+
+    Args:
+        job: Job record from JobQueue.get()
+
+    Returns:
+        Job status (and result once completed)
+    """
+    def iso(timestamp: Optional[float]) -> Optional[str]:
+        return datetime.fromtimestamp(timestamp).isoformat() if timestamp else None
+
+    return {
+        "job_id": job['id'],
+        "status": job['status'],
+        "scan_mode": job['scan_mode'],
+        "created_at": iso(job['created_at']),
+        "started_at": iso(job['started_at']),
+        "finished_at": iso(job['finished_at']),
+        "result": job['result'],
+        "error": job['error']
+    }
+
+
+class ScanWorkerPool:
+    """Bounded pool of asyncio workers draining a JobQueue"""
+
+    def __init__(self, queue: JobQueue, workers: int = SCAN_JOB_WORKERS):
+        self.queue = queue
+        self.workers = workers
+        self._tasks: List[asyncio.Task] = []
+        self._wakeup: Optional[asyncio.Event] = None
+
+    async def start(self) -> None:
+        """Start the workers (requeues jobs interrupted by a restart)"""
+        recovered = self.queue.recover()
+        if recovered:
+            logger.info(f"Requeued {recovered} interrupted scan job(s)")
+
+        self._wakeup = asyncio.Event()
+        self._tasks = [asyncio.create_task(self._worker(n)) for n in range(self.workers)]
+        self._tasks.append(asyncio.create_task(self._purger()))
+        logger.info(f"Started {self.workers} scan job worker(s)")
+
+    async def stop(self) -> None:
+        """Stop the workers; running jobs are requeued on next start"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def notify(self) -> None:
+        """Wake idle workers after a job is submitted"""
+        if self._wakeup is not None:
+            self._wakeup.set()
+
+    async def _purger(self) -> None:
+        """Delete finished jobs past SCAN_JOB_RETENTION, now and every SCAN_JOB_PURGE_INTERVAL"""
+        while True:
+            try:
+                purged = self.queue.purge(SCAN_JOB_RETENTION)
+                if purged:
+                    logger.info(f"Purged {purged} expired scan job(s)")
+            except Exception as e:
+                logger.error(f"Failed to purge scan jobs: {e}")
+            await asyncio.sleep(SCAN_JOB_PURGE_INTERVAL)
+
+    async def _worker(self, worker_number: int) -> None:
+        """Claim and process jobs until cancelled"""
+        while True:
+            # Clear before claiming so a submit that lands in between isn't missed
+            self._wakeup.clear()
+            job = self.queue.claim()
+
+            if job is None:
+                try:
+                    await asyncio.wait_for(self._wakeup.wait(), timeout=SCAN_JOB_POLL_INTERVAL)
+                except asyncio.TimeoutError:
+                    pass
+                continue
+
+            # Another job may be waiting behind this one
+            self.notify()
+            await self._process(worker_number, job)
+
+    async def _process(self, worker_number: int, job: Dict[str, Any]) -> None:
+        """Run one scan job and record its outcome"""
+        job_id = job['id']
+        logger.info(f"Worker {worker_number} processing scan job {job_id} (mode: {job['scan_mode']})")
+
+        try:
+            result = await scan_image(job['image_data'], job['scan_mode'])
+            self.queue.complete(job_id, result)
+            logger.info(f"✓ Scan job {job_id} completed in {time.time() - job['started_at']:.1f}s")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            logger.error(f"✗ Scan job {job_id} failed: {e}", exc_info=True)
+            self.queue.fail(job_id, str(e))
+
+        if job.get('callback_url'):
+            await self._send_callback(job_id, job['callback_url'])
+
+    async def _send_callback(self, job_id: str, callback_url: str) -> None:
+        """POST the finished job to the client's callback URL"""
+        finished = self.queue.get(job_id)
+        if finished is None:
+            return
+
+        try:
+            # Checked again at delivery, in case the host now resolves elsewhere;
+            # redirects aren't followed, since they could lead anywhere
+            await check_callback_url(callback_url)
+            response = await get_http_client().post(
+                callback_url,
+                json=format_job(finished),
+                timeout=10.0,
+                follow_redirects=False
+            )
+            response.raise_for_status()
+            logger.info(f"Delivered callback for scan job {job_id}")
+        except Exception as e:
+            logger.error(f"Callback for scan job {job_id} to {callback_url} failed: {e}")
+
+
+# Process-wide queue and worker pool (created on startup)
+_queue: Optional[JobQueue] = None
+_pool: Optional[ScanWorkerPool] = None
+
+
+def get_job_queue() -> JobQueue:
+    """Get the process-wide job queue, creating it on first use"""
+    global _queue
+    if _queue is None:
+        _queue = create_job_queue()
+    return _queue
+
+
+async def start_workers() -> None:
+    """Start the background worker pool (FastAPI startup)"""
+    global _pool
+    if _pool is None:
+        _pool = ScanWorkerPool(get_job_queue())
+        await _pool.start()
+
+
+async def stop_workers() -> None:
+    """Stop the background worker pool (FastAPI shutdown)"""
+    global _pool
+    if _pool is not None:
+        await _pool.stop()
+        _pool = None
+
+
+def submit_job(image_data: bytes, scan_mode: str, callback_url: Optional[str] = None) -> str:
+    """
+    Queue a scan for background processing
+
+    Args:
+        image_data: Raw image bytes
+        scan_mode: "default" or "pro"
+        callback_url: Optional URL the finished job is POSTed to
+
+    Returns:
+        Job id
+    """
+    job_id = get_job_queue().submit(image_data, scan_mode, callback_url)
+    if _pool is not None:
+        _pool.notify()
+    logger.info(f"Queued scan job {job_id} (mode: {scan_mode})")
+    return job_id
@@ -0,0 +1,660 @@
+"""
+Scan Pipeline
+Identification and Scryfall resolution stages shared by /scan and /scan/batch
+"""
+
+import asyncio
+import io
+import logging
+import os
+import time
+import zipfile
+from datetime import datetime
+from typing import List, Dict, Any, Optional, Tuple
+
+from multi_vision import identify_cards_pro, identify_cards_hedged, HEDGE_BACKUP_PROVIDER
+from mosaic_batcher import mosaic_batcher, MOSAIC_BATCHING
+from scryfall_integration import get_card_prices, search_card_by_name, get_card_details_by_set, get_all_printings
+from image_comparison import edition_matcher, ScanPhoto
+from scan_cache import scan_cache
+from deadline import Deadline, DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Batch limits and per-stage concurrency
+BATCH_MAX_IMAGES = int(os.getenv("BATCH_MAX_IMAGES", "100"))
+BATCH_PREPARE_CONCURRENCY = int(os.getenv("BATCH_PREPARE_CONCURRENCY", "4"))  # Decoding + hashing
+BATCH_VISION_CONCURRENCY = int(os.getenv("BATCH_VISION_CONCURRENCY", "4"))  # Vision API calls
+BATCH_RESOLVE_CONCURRENCY = int(os.getenv("BATCH_RESOLVE_CONCURRENCY", "4"))  # Cards resolved on Scryfall at once
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.heic')
+
+# Deadline budgeting
+COMPARISON_MIN_BUDGET = float(os.getenv("COMPARISON_MIN_BUDGET", "8"))  # Seconds needed to attempt image comparison
+RESOLVE_RESERVE_SECONDS = 3.0  # Budget kept back from vision for Scryfall lookups
+
+EMPTY_PRICES = {'usd': None, 'usd_foil': None, 'eur': None, 'tix': None}
+
+
+class LookupMemo:
+    """
+    Deduplicates Scryfall lookups for the lifetime of one scan or batch
+
+    Identical calls share a single task, so a card appearing in twenty
+    photos of a batch is looked up once.
+    """
+
+    def __init__(self):
+        self._tasks: Dict[Tuple, asyncio.Task] = {}
+        self.requested = 0
+
+    async def call(self, func, *args, **kwargs):
+        """
+        Call an async lookup function, reusing any identical earlier call
+
+        Args:
+            func: Async Scryfall lookup function
+            *args, **kwargs: Arguments for the lookup
+
+        Returns:
+            The lookup result
+        """
+        key = (func.__name__, args, tuple(sorted(kwargs.items())))
+        self.requested += 1
+
+        task = self._tasks.get(key)
+        if task is None:
+            task = asyncio.ensure_future(func(*args, **kwargs))
+            self._tasks[key] = task
+
+        # Shield so one caller's cancellation doesn't cancel the shared lookup
+        return await asyncio.shield(task)
+
+    def stats(self) -> Dict[str, int]:
+        """Requested vs. actually issued lookups"""
+        return {
+            "requested": self.requested,
+            "issued": len(self._tasks),
+            "deduplicated": self.requested - len(self._tasks)
+        }
+
+
+def clean_collector_number(collector_number: Optional[str]) -> Optional[str]:
+    """
+    Normalize a collector number read off a card
+
+    Args:
+        collector_number: Collector number as read by the vision model
+
+    Returns:
+        Collector number in Scryfall's format
+    """
+    if not collector_number:
+        return collector_number
+
+    # Remove format like "048/168" -> just keep "48"
+    if '/' in collector_number:
+        collector_number = collector_number.split('/')[0]
+    # Remove leading zeros (Scryfall uses "483" not "0483")
+    if collector_number.isdigit():
+        collector_number = str(int(collector_number))
+
+    return collector_number
+
+
+def collect_set_number_attempts(card_info: Dict[str, Any]) -> List[Tuple[str, str]]:
+    """
+    Set/number combinations to try for an identified card
+
+    Args:
+        card_info: Card as identified by the vision model(s)
+
+    Returns:
+        (set, collector number) pairs, the primary reading first
+    """
+    attempts = []
+    set_code = card_info.get('set')
+    collector_number = clean_collector_number(card_info.get('collector_number'))
+    if set_code and collector_number:
+        attempts.append((set_code, collector_number))
+
+    # Add alternative set/numbers from Pro Scan if available
+    for alt in card_info.get('set_alternatives', []):
+        alt_set = alt.get('set')
+        alt_number = clean_collector_number(alt.get('collector_number'))
+        if alt_set and alt_number:
+            attempts.append((alt_set, alt_number))
+
+    return attempts
+
+
+def printing_filters(card_info: Dict[str, Any]) -> Dict[str, str]:
+    """
+    Frame/finish/border filters for the printings lookup
+
+    Args:
+        card_info: Card as identified (frame, finish and border_color are
+            used when the identification reports them)
+
+    Returns:
+        Keyword arguments for get_all_printings
+    """
+    filters = {
+        'frame': card_info.get('frame'),
+        'finish': card_info.get('finish'),
+        'border': card_info.get('border_color')
+    }
+    return {key: str(value).lower() for key, value in filters.items() if value}
+
+
+async def prefetch_set_lookups(
+    identified_cards: List[Dict[str, Any]],
+    lookups: LookupMemo,
+    deadline: Optional[Deadline] = None
+) -> None:
+    """
+    Look up every set/number attempt of a scan at once
+
+    The lookups run concurrently, so the Scryfall client groups them into
+    /cards/collection requests instead of one request per attempt. Results
+    land in the lookup memo, where resolve_card picks them up (failures
+    surface there too).
+
+    Args:
+        identified_cards: Cards as identified by the vision model(s)
+        lookups: Lookup memo shared by the scan or batch
+        deadline: Optional time budget for the scan
+    """
+    deadline = deadline or Deadline(None)
+    attempts = {attempt for card_info in identified_cards for attempt in collect_set_number_attempts(card_info)}
+    if not attempts:
+        return
+
+    try:
+        await deadline.run(
+            asyncio.gather(
+                *(lookups.call(get_card_details_by_set, set_code, number) for set_code, number in attempts),
+                return_exceptions=True
+            ),
+            "set/number lookup"
+        )
+    except DeadlineExceeded:
+        pass
+
+
+def vision_timeout(deadline: Deadline) -> Optional[float]:
+    """Seconds identification may still take, keeping RESOLVE_RESERVE_SECONDS for Scryfall"""
+    if deadline.budget is None:
+        return None
+    return max(1.0, deadline.remaining() - RESOLVE_RESERVE_SECONDS)
+
+
+async def identify_cards(
+    image_data: bytes,
+    scan_mode: str,
+    deadline: Optional[Deadline] = None
+) -> List[Dict[str, Any]]:
+    """
+    Identify cards using the selected scan mode
+
+    The provider SDKs are synchronous, so the call runs in a worker thread
+    to keep the event loop free for other requests.
+
+    Args:
+        image_data: Raw image bytes
+        scan_mode: "default" or "pro"
+        deadline: Optional time budget (providers that haven't answered by
+            then are no longer waited for)
+
+    Returns:
+        List of identified cards
+    """
+    deadline = deadline or Deadline(None)
+
+    if scan_mode == "pro":
+        logger.info("Using Pro Scan (Claude + OpenAI + Gemini, returning on quorum)...")
+        return await asyncio.to_thread(identify_cards_pro, image_data, vision_timeout(deadline))
+
+    if MOSAIC_BATCHING:
+        cards = await deadline.run(
+            mosaic_batcher.identify_image(image_data, vision_timeout(deadline)),
+            "mosaic identification"
+        )
+        if cards is not None:
+            logger.info(f"Default Scan identified {len(cards)} card(s) in a shared mosaic")
+            return cards
+
+    if HEDGE_BACKUP_PROVIDER:
+        logger.info(f"Using Default Scan (routed provider, hedged with {HEDGE_BACKUP_PROVIDER})...")
+    else:
+        logger.info("Using Default Scan (routed provider)...")
+    # Whatever the batching window and a failed mosaic left of the budget
+    return await asyncio.to_thread(identify_cards_hedged, image_data, vision_timeout(deadline))
+
+
+async def resolve_card(
+    index: int,
+    card_info: Dict[str, Any],
+    photo: ScanPhoto,
+    lookups: LookupMemo,
+    deadline: Optional[Deadline] = None
+) -> Dict[str, Any]:
+    """
+    Resolve one identified card against Scryfall
+
+    When the deadline runs low, optional steps (edition comparison, prices)
+    are skipped and the card is returned with an 'incomplete' marker
+    instead of failing the scan.
+
+    Args:
+        index: Position of the card in the scan (0-based)
+        card_info: Card as identified by the vision model(s)
+        photo: The scan's photo (used for edition comparison)
+        lookups: Lookup memo shared by the scan or batch
+        deadline: Optional time budget for the scan
+
+    Returns:
+        Card result for the API response
+    """
+    deadline = deadline or Deadline(None)
+    card_name = card_info.get('name')
+    skipped = []
+
+    try:
+        set_code = card_info.get('set')
+        collector_number = clean_collector_number(card_info.get('collector_number'))
+        confidence = card_info.get('confidence', 'medium')
+
+        logger.info(f"Looking up card: {card_name} (set: {set_code}, number: {collector_number})")
+
+        # Search for card on Scryfall
+        card_details = None
+
+        # Collect all set/number combinations to try
+        set_number_attempts = collect_set_number_attempts(card_info)
+
+        try:
+            # Try each set/number combination
+            for attempt_set, attempt_number in set_number_attempts:
+                logger.info(f"Trying lookup: {attempt_set}/{attempt_number}")
+                card_details = await deadline.run(
+                    lookups.call(get_card_details_by_set, attempt_set, attempt_number),
+                    "set/number lookup"
+                )
+
+                # Validate that the found card matches the identified name
+                if card_details:
+                    found_name = card_details.get('name', '')
+                    if found_name.lower() == card_name.lower():
+                        logger.info(f"✓ Found exact match: {attempt_set}/{attempt_number}")
+                        break  # Found the right card!
+                    else:
+                        logger.info(f"✗ Name mismatch: found '{found_name}' but expected '{card_name}'")
+                        card_details = None
+                else:
+                    logger.info(f"✗ Not found: {attempt_set}/{attempt_number}")
+
+            # Fallback to name search if all specific lookups failed
+            if not card_details:
+                logger.info(f"All set/number attempts failed, falling back to name search")
+                card_details = await deadline.run(
+                    lookups.call(search_card_by_name, card_name, None),
+                    "name search"
+                )
+        except DeadlineExceeded:
+            skipped.append('lookup')
+
+        # If name search found something but we're not confident, use image comparison
+        # This helps when there are multiple editions of the same card
+        if card_details and (confidence == 'medium' or confidence == 'low' or len(set_number_attempts) == 0):
+            if not deadline.has_budget(COMPARISON_MIN_BUDGET):
+                logger.info(f"Skipping image comparison - only {deadline.remaining():.1f}s of budget left")
+                skipped.append('edition_check')
+            else:
+                logger.info(f"Using image comparison to verify edition (confidence: {confidence})...")
+                try:
+                    # Get all printings of this card
+                    all_printings = await deadline.run(
+                        lookups.call(get_all_printings, card_name, limit=None, **printing_filters(card_info)),
+                        "printings lookup"
+                    )
+
+                    if len(all_printings) > 1:
+                        logger.info(f"Found {len(all_printings)} printings - comparing images")
+
+                        # Compare locally against the printings' images (Claude only if ambiguous)
+                        best_match = await deadline.run(
+                            edition_matcher.choose(photo, all_printings, owner=index),
+                            "image comparison"
+                        )
+
+                        if best_match:
+                            logger.info(f"✓ Image comparison selected: {best_match['set'].upper()}/{best_match.get('collector_number')}")
+                            card_details = best_match
+                            confidence = 'high'  # Upgrade confidence since we verified with image comparison
+                        else:
+                            logger.info("Image comparison didn't find a confident match, keeping name search result")
+                    else:
+                        logger.info(f"Only 1 printing found, skipping image comparison")
+                except DeadlineExceeded:
+                    skipped.append('edition_check')
+
+        if card_details:
+            # Get current prices
+            try:
+                # Taken from the card in hand unless its prices are stale
+                prices = await deadline.run(
+                    get_card_prices(card_details['id'], card_details),
+                    "price lookup"
+                )
+            except DeadlineExceeded:
+                prices = dict(EMPTY_PRICES)
+                skipped.append('prices')
+
+            result = {
+                "card_number": index + 1,
+                "matched": True,
+                "confidence": confidence,
+                "name": card_details['name'],
+                "set": card_details['set_name'],
+                "set_code": card_details['set'],
+                "collector_number": card_details.get('collector_number'),
+                "rarity": card_details.get('rarity'),
+                "image_url": card_details.get('image_uris', {}).get('normal'),
+                "scryfall_id": card_details['id'],
+                "prices": prices,
+                "scryfall_uri": card_details.get('scryfall_uri')
+            }
+        elif skipped:
+            result = {
+                "card_number": index + 1,
+                "matched": False,
+                "identified_name": card_name,
+                "message": "Scan deadline reached before this card was looked up"
+            }
+        else:
+            result = {
+                "card_number": index + 1,
+                "matched": False,
+                "identified_name": card_name,
+                "message": "Card identified but not found in Scryfall"
+            }
+
+        result["incomplete"] = bool(skipped)
+        if skipped:
+            result["skipped"] = skipped
+        return result
+
+    except Exception as e:
+        logger.error(f"Error processing card {index+1} ({card_name}): {e}")
+        return {
+            "card_number": index + 1,
+            "matched": False,
+            "identified_name": card_name,
+            "error": str(e),
+            "incomplete": False
+        }
+
+
+async def refresh_cached_prices(
+    cards: List[Dict[str, Any]],
+    lookups: LookupMemo,
+    deadline: Optional[Deadline] = None
+) -> None:
+    """
+    Refresh prices on cached scan results in place
+
+    Identification is cached, but prices change daily, so each matched
+    card gets a fresh price lookup. Cached prices are kept if the
+    deadline runs out.
+
+    Args:
+        cards: Card results from a cached scan response
+        lookups: Lookup memo shared by the scan or batch
+        deadline: Optional time budget for the scan
+    """
+    deadline = deadline or Deadline(None)
+
+    for card in cards:
+        if card.get('matched') and card.get('scryfall_id'):
+            try:
+                card['prices'] = await deadline.run(
+                    lookups.call(get_card_prices, card['scryfall_id']),
+                    "price refresh"
+                )
+            except DeadlineExceeded:
+                logger.info("Deadline reached, keeping cached prices for remaining cards")
+                break
+
+
+async def scan_image(
+    image_data: bytes,
+    scan_mode: str,
+    lookups: Optional[LookupMemo] = None,
+    prepare_semaphore: Optional[asyncio.Semaphore] = None,
+    vision_semaphore: Optional[asyncio.Semaphore] = None,
+    resolve_semaphore: Optional[asyncio.Semaphore] = None,
+    timings: Optional[Dict[str, float]] = None,
+    deadline: Optional[Deadline] = None
+) -> Dict[str, Any]:
+    """
+    Run the full scan pipeline for one image
+
+    Stages: prepare (hash + cache lookup), identify (vision API) and
+    resolve (Scryfall). Each stage can be bounded by its own semaphore
+    when several images are processed at once.
+
+    Args:
+        image_data: Raw image bytes
+        scan_mode: "default" or "pro"
+        lookups: Lookup memo to share with other scans (new one if None)
+        prepare_semaphore: Bounds concurrent hashing/cache lookups
+        vision_semaphore: Bounds concurrent vision API calls
+        resolve_semaphore: Bounds concurrently resolved cards
+        timings: Optional dict that receives per-stage durations in seconds
+        deadline: Optional time budget; whatever is resolved when it runs
+            out is returned with per-card 'incomplete' markers
+
+    Returns:
+        Scan response
+    """
+    lookups = lookups or LookupMemo()
+    prepare_semaphore = prepare_semaphore or asyncio.Semaphore(1)
+    vision_semaphore = vision_semaphore or asyncio.Semaphore(1)
+    resolve_semaphore = resolve_semaphore or asyncio.Semaphore(1)
+    timings = timings if timings is not None else {}
+    deadline = deadline or Deadline(None)
+    started = time.perf_counter()
+
+    # Step 0: Serve repeated and near-duplicate uploads from the scan cache
+    async with prepare_semaphore:
+        stage_started = time.perf_counter()
+        cache_key = await asyncio.to_thread(scan_cache.key_for, image_data)
+        cached = scan_cache.lookup(cache_key, scan_mode)
+        timings['prepare_seconds'] = time.perf_counter() - stage_started
+
+    if cached:
+        logger.info(f"Scan cache hit ({cached['match']}, distance {cached['distance']}) - refreshing prices only")
+        stage_started = time.perf_counter()
+        response = cached['result']
+        await refresh_cached_prices(response['cards'], lookups, deadline)
+        response['cached'] = cached['match']
+        response['timestamp'] = datetime.now().isoformat()
+        timings['resolve_seconds'] = time.perf_counter() - stage_started
+        timings['total_seconds'] = time.perf_counter() - started
+        scan_cache.record_saved(cached['compute_seconds'] - timings['total_seconds'])
+        return response
+
+    # Step 1: Identify cards using selected mode
+    async with vision_semaphore:
+        stage_started = time.perf_counter()
+        try:
+            identified_cards = await deadline.run(identify_cards(image_data, scan_mode, deadline), "vision")
+        except DeadlineExceeded:
+            identified_cards = None
+        timings['identify_seconds'] = time.perf_counter() - stage_started
+
+    if identified_cards is None:
+        timings['total_seconds'] = time.perf_counter() - started
+        return {
+            "success": True,
+            "cards_found": 0,
+            "cards": [],
+            "partial": True,
+            "message": "Scan deadline reached before cards were identified"
+        }
+
+    if not identified_cards:
+        timings['total_seconds'] = time.perf_counter() - started
+        return {
+            "success": True,
+            "cards_found": 0,
+            "cards": [],
+            "message": "No cards identified in image"
+        }
+
+    logger.info(f"Vision API identified {len(identified_cards)} card(s)")
+
+    # Step 2: Get detailed information for each identified card
+    logger.info("Fetching card details from Scryfall...")
+    stage_started = time.perf_counter()
+    await prefetch_set_lookups(identified_cards, lookups, deadline)
+    photo = ScanPhoto(image_data)  # Cards are detected once, when the first edition comparison needs them
+
+    async def resolve(index: int, card_info: Dict[str, Any]) -> Dict[str, Any]:
+        async with resolve_semaphore:
+            return await resolve_card(index, card_info, photo, lookups, deadline)
+
+    results = await asyncio.gather(*(
+        resolve(i, card_info) for i, card_info in enumerate(identified_cards)
+    ))
+    timings['resolve_seconds'] = time.perf_counter() - stage_started
+    partial = any(r.get('incomplete') for r in results)
+
+    response = {
+        "success": True,
+        "cards_found": len(identified_cards),
+        "cards_matched": sum(1 for r in results if r.get('matched')),
+        "cards": list(results),
+        "scan_mode": scan_mode,
+        "method": "pro_scan" if scan_mode == "pro" else "claude_vision",
+        "partial": partial,
+        "timestamp": datetime.now().isoformat()
+    }
+
+    timings['total_seconds'] = time.perf_counter() - started
+
+    # Partial results would pin missing data in the cache
+    if partial:
+        logger.info(f"Returning partial scan results after {timings['total_seconds']:.1f}s (deadline {deadline.budget}s)")
+    else:
+        scan_cache.store(cache_key, scan_mode, response, timings['total_seconds'])
+
+    return response
+
+
+def extract_zip_images(zip_data: bytes) -> List[Tuple[str, bytes]]:
+    """
+    Extract image files from a zip upload
+
+    Args:
+        zip_data: Raw zip bytes
+
+    Returns:
+        List of (filename, image bytes), in archive order
+    """
+    images = []
+
+    with zipfile.ZipFile(io.BytesIO(zip_data)) as archive:
+        for info in archive.infolist():
+            name = info.filename
+            # Skip folders and macOS resource forks
+            if info.is_dir() or name.startswith('__MACOSX/') or os.path.basename(name).startswith('.'):
+                continue
+            if not name.lower().endswith(IMAGE_EXTENSIONS):
+                logger.info(f"Skipping non-image file in zip: {name}")
+                continue
+            images.append((name, archive.read(info)))
+
+    return images
+
+
+async def scan_batch(
+    images: List[Tuple[str, bytes]],
+    scan_mode: str,
+    deadline: Optional[Deadline] = None
+) -> Dict[str, Any]:
+    """
+    Scan many images as one pipelined batch
+
+    Images flow through prepare -> identify -> resolve independently, with
+    bounded concurrency at each stage, and Scryfall lookups are shared
+    across the whole batch.
+
+    Args:
+        images: List of (filename, image bytes)
+        scan_mode: "default" or "pro"
+        deadline: Optional time budget shared by the whole batch
+
+    Returns:
+        Per-image results plus aggregate timings
+    """
+    logger.info(f"Processing batch of {len(images)} image(s) (mode: {scan_mode})")
+
+    lookups = LookupMemo()
+    prepare_semaphore = asyncio.Semaphore(BATCH_PREPARE_CONCURRENCY)
+    vision_semaphore = asyncio.Semaphore(BATCH_VISION_CONCURRENCY)
+    resolve_semaphore = asyncio.Semaphore(BATCH_RESOLVE_CONCURRENCY)
+    started = time.perf_counter()
+
+    async def process(index: int, filename: str, image_data: bytes) -> Dict[str, Any]:
+        timings: Dict[str, float] = {}
+        try:
+            result = await scan_image(
+                image_data,
+                scan_mode,
+                lookups,
+                prepare_semaphore,
+                vision_semaphore,
+                resolve_semaphore,
+                timings,
+                deadline
+            )
+        except Exception as e:
+            logger.error(f"Error processing batch image {index+1} ({filename}): {e}", exc_info=True)
+            result = {"success": False, "error": str(e)}
+
+        return {
+            "image_number": index + 1,
+            "filename": filename,
+            **result,
+            "timings": {name: round(seconds, 3) for name, seconds in timings.items()}
+        }
+
+    results = await asyncio.gather(*(
+        process(i, filename, image_data) for i, (filename, image_data) in enumerate(images)
+    ))
+
+    wall_seconds = time.perf_counter() - started
+    sequential_seconds = sum(r['timings'].get('total_seconds', 0.0) for r in results)
+
+    logger.info(f"Batch complete: {len(images)} image(s) in {wall_seconds:.1f}s (sum of per-image times {sequential_seconds:.1f}s)")
+
+    return {
+        "success": True,
+        "images_processed": len(results),
+        "cards_found": sum(r.get('cards_found', 0) for r in results),
+        "cards_matched": sum(r.get('cards_matched', 0) for r in results),
+        "partial": any(r.get('partial') for r in results),
+        "results": list(results),
+        "timings": {
+            "wall_seconds": round(wall_seconds, 3),
+            "sum_image_seconds": round(sequential_seconds, 3),
+            "identify_seconds": round(sum(r['timings'].get('identify_seconds', 0.0) for r in results), 3),
+            "resolve_seconds": round(sum(r['timings'].get('resolve_seconds', 0.0) for r in results), 3),
+            "cached_images": sum(1 for r in results if r.get('cached'))
+        },
+        "lookups": lookups.stats(),
+        "scan_mode": scan_mode,
+        "timestamp": datetime.now().isoformat()
+    }
@@ -4,71 +4,565 @@ Handles all communication with Scryfall API
 """
 
 import httpx
-from typing import Dict, Any, Optional
+from typing import Dict, Any, Iterator, Optional, Tuple
 import logging
 import asyncio
+import json
+import os
+import random
+import time
+from pathlib import Path
+from email.utils import parsedate_to_datetime
+
+from rate_limiter import scryfall_rate_limiter
+from card_store import card_store, card_names, normalize_name
+from name_index import name_index
+from printings_index import printings_index
+from price_cache import price_cache, extract_prices, PRICE_CACHE_TTL
+from response_cache import response_cache, cache_key
 
 logger = logging.getLogger(__name__)
 
 # Scryfall API base URL
-SCRYFALL_API_BASE = "https://api.scryfall.com"
+SCRYFALL_API_BASE = os.getenv("SCRYFALL_API_BASE", "https://api.scryfall.com")
+
+# Rate limiting (Scryfall allows 10 requests per second) is handled by the
+# shared token bucket in rate_limiter.py
+
+# Retries for throttled (429) and transient server/network errors
+MAX_RETRIES = int(os.getenv("SCRYFALL_MAX_RETRIES", "3"))
+RETRY_STATUS_CODES = (429, 500, 502, 503, 504)
+RETRY_BASE_DELAY = 0.5  # Seconds, doubled per attempt
+RETRY_MAX_DELAY = 10.0
+RETRY_JITTER = 0.25  # Max random seconds added to Retry-After
+
+# Identical requests within this window are answered from memory (seconds)
+RESPONSE_MEMO_TTL = float(os.getenv("SCRYFALL_MEMO_TTL", "30"))
+RESPONSE_MEMO_SIZE = 2048  # Entries before expired ones are swept
+
+# /cards/collection batching: identifiers requested within the window share
+# one POST of up to COLLECTION_MAX_IDENTIFIERS
+COLLECTION_MAX_IDENTIFIERS = 75  # Scryfall's per-request limit
+COLLECTION_WINDOW = float(os.getenv("SCRYFALL_COLLECTION_WINDOW", "0.02"))  # Seconds
+
+# Connection pool shared by all outbound HTTP (Scryfall API, bulk data, card images)
+HTTP_MAX_CONNECTIONS = int(os.getenv("HTTP_MAX_CONNECTIONS", "20"))
+HTTP_MAX_KEEPALIVE = int(os.getenv("HTTP_MAX_KEEPALIVE", "10"))
+HTTP_KEEPALIVE_EXPIRY = 30.0  # Seconds an idle connection is kept open
+
+# Bulk data files are streamed to disk here and parsed incrementally
+BULK_DATA_DIR = os.getenv("BULK_DATA_DIR", str(Path(__file__).parent / "cache"))
+BULK_CHUNK_SIZE = 1 << 20  # Bytes per download chunk / characters per parse refill
+
+_http_client: Optional[httpx.AsyncClient] = None
+_http_client_loop: Optional[asyncio.AbstractEventLoop] = None
+
+
+def _http2_available() -> bool:
+    """HTTP/2 needs the optional h2 package (httpx[http2])"""
+    try:
+        import h2  # noqa: F401
+        return True
+    except ImportError:
+        return False
+
+
+def create_http_client() -> httpx.AsyncClient:
+    """
+    Create a pooled, keep-alive HTTP client
+
+    Returns:
+        AsyncClient using HTTP/2 when available
+    """
+    return httpx.AsyncClient(
+        http2=_http2_available(),
+        limits=httpx.Limits(
+            max_connections=HTTP_MAX_CONNECTIONS,
+            max_keepalive_connections=HTTP_MAX_KEEPALIVE,
+            keepalive_expiry=HTTP_KEEPALIVE_EXPIRY
+        ),
+        timeout=httpx.Timeout(30.0, connect=10.0),
+        headers={"User-Agent": "MagicScanner/1.0"},
+        follow_redirects=True
+    )
+
+
+async def open_http_client() -> httpx.AsyncClient:
+    """
+    Open the process-wide HTTP client (FastAPI startup)
+
+    Returns:
+        The shared client
+    """
+    global _http_client, _http_client_loop
+    if _http_client is None or _http_client.is_closed:
+        _http_client = create_http_client()
+        _http_client_loop = asyncio.get_running_loop()
+        logger.info(f"Opened pooled HTTP client (http2={_http2_available()}, max_connections={HTTP_MAX_CONNECTIONS})")
+    return _http_client
+
 
-# Rate limiting (Scryfall allows 10 requests per second)
-REQUEST_DELAY = 0.1  # 100ms between requests
+async def close_http_client() -> None:
+    """Close the process-wide HTTP client (FastAPI shutdown / end of scripts)"""
+    global _http_client, _http_client_loop
+    if _http_client is not None:
+        await _http_client.aclose()
+        _http_client = None
+        _http_client_loop = None
+
+
+def get_http_client() -> httpx.AsyncClient:
+    """
+    Get the shared HTTP client, opening it on first use
+
+    Connections belong to an event loop, so a new client is created when
+    called from a different loop (e.g. scripts using asyncio.run twice).
+
+    Returns:
+        The shared client
+    """
+    global _http_client, _http_client_loop
+    loop = asyncio.get_running_loop()
+    if _http_client is None or _http_client.is_closed or _http_client_loop is not loop:
+        _http_client = create_http_client()
+        _http_client_loop = loop
+    return _http_client
 
 
 class ScryfallClient:
-    """Async client for Scryfall API with rate limiting"""
+    """
+    Async client for Scryfall API with rate limiting
+
+    Identical concurrent requests (same endpoint + params) share one
+    in-flight request, and responses are remembered for a short time.
+    Card objects in any response also answer later /cards/{id} requests.
+    Below that, the response cache (memory + disk) keeps responses for
+    their endpoint's TTL across scans and restarts.
+    """
     
     def __init__(self):
-        self.last_request_time = 0
-    
-    async def _rate_limit(self):
-        """Ensure we don't exceed Scryfall's rate limits"""
-        current_time = asyncio.get_event_loop().time()
-        time_since_last = current_time - self.last_request_time
-        
-        if time_since_last < REQUEST_DELAY:
-            await asyncio.sleep(REQUEST_DELAY - time_since_last)
-        
-        self.last_request_time = asyncio.get_event_loop().time()
+        self._in_flight: Dict[Tuple, asyncio.Task] = {}
+        self._memo: Dict[Tuple, Tuple[float, Any]] = {}
+
+        # Statistics
+        self.requests = 0
+        self.network_requests = 0
+        self.coalesced = 0
+        self.memo_hits = 0
+        self.throttled = 0
+        self.retries = 0
+
+    @staticmethod
+    def _request_key(endpoint: str, params: Optional[Dict] = None) -> Tuple:
+        """Key identifying a request by endpoint and params"""
+        return (endpoint, tuple(sorted((params or {}).items())))
     
-    async def get(self, endpoint: str, params: Optional[Dict] = None) -> Dict[str, Any]:
+    async def get(
+        self,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        max_age: Optional[float] = None
+    ) -> Dict[str, Any]:
         """
         Make GET request to Scryfall API
         
         Args:
             endpoint: API endpoint (without base URL)
             params: Query parameters
+            max_age: Oldest cached response acceptable (seconds), on top of
+                the endpoint's TTL; used for price lookups
             
         Returns:
             JSON response
         """
-        await self._rate_limit()
-        
+        key = self._request_key(endpoint, params)
+        if max_age is not None:
+            key += (max_age,)
+        self.requests += 1
+
+        memo = self._memo.get(key)
+        if memo and memo[0] > time.monotonic():
+            self.memo_hits += 1
+            return memo[1]
+
+        task = self._in_flight.get(key)
+        if task is not None and task.get_loop() is asyncio.get_running_loop():
+            self.coalesced += 1
+        else:
+            task = asyncio.ensure_future(self._fetch(endpoint, params, max_age))
+            self._in_flight[key] = task
+            task.add_done_callback(lambda done, key=key: self._finish(key, done))
+
+        # Shield so a cancelled caller doesn't cancel the request for everyone else
+        return await asyncio.shield(task)
+
+    def _finish(self, key: Tuple, task: asyncio.Task) -> None:
+        """Clear the in-flight entry and memoize a successful response"""
+        if self._in_flight.get(key) is task:
+            del self._in_flight[key]
+
+        if task.cancelled() or task.exception() is not None:
+            return
+
+        expires = time.monotonic() + RESPONSE_MEMO_TTL
+        data = task.result()
+        self._memo[key] = (expires, data)
+
+        # Card objects also answer a later /cards/{id} (e.g. price lookups)
+        if isinstance(data, dict):
+            cards = data.get('data', []) if data.get('object') == 'list' else [data]
+            self.remember_cards(cards)
+
+    def recall(self, endpoint: str, params: Optional[Dict] = None) -> Optional[Any]:
+        """
+        Memoized response for a request, without making it
+
+        Args:
+            endpoint: API endpoint (without base URL)
+            params: Query parameters
+
+        Returns:
+            Response data, or None if not memoized
+        """
+        memo = self._memo.get(self._request_key(endpoint, params))
+        if memo and memo[0] > time.monotonic():
+            self.requests += 1
+            self.memo_hits += 1
+            return memo[1]
+
+        entry, fresh = response_cache.lookup(cache_key(endpoint, params))
+        if fresh:
+            self.requests += 1
+            return entry.data()
+        return None
+
+    def remember_cards(self, cards: list, persist: bool = False) -> None:
+        """
+        Memoize card objects as /cards/{id} and /cards/{set}/{number} responses
+
+        Args:
+            cards: Card objects from any response
+            persist: Also put them in the response cache (for responses that
+                aren't cached under their own endpoint, e.g. POSTs)
+        """
+        expires = time.monotonic() + RESPONSE_MEMO_TTL
+        for card in cards:
+            if isinstance(card, dict) and card.get('object') == 'card' and card.get('id'):
+                endpoints = [f"/cards/{card['id']}"]
+                if card.get('set') and card.get('collector_number'):
+                    endpoints.append(f"/cards/{card['set'].lower()}/{card['collector_number']}")
+
+                body = json.dumps(card).encode() if persist else None
+                for endpoint in endpoints:
+                    self._memo[self._request_key(endpoint)] = (expires, card)
+                    if persist:
+                        response_cache.store(endpoint, cache_key(endpoint), body, None, None)
+
+        if len(self._memo) > RESPONSE_MEMO_SIZE:
+            now = time.monotonic()
+            self._memo = {k: v for k, v in self._memo.items() if v[0] > now}
+
+    async def _fetch(
+        self,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        max_age: Optional[float] = None
+    ) -> Dict[str, Any]:
+        """
+        Serve from the response cache, revalidate a stale entry, or fetch
+
+        Args:
+            endpoint: API endpoint (without base URL)
+            params: Query parameters
+            max_age: Oldest cached response acceptable (seconds)
+
+        Returns:
+            JSON response
+        """
+        key = cache_key(endpoint, params)
+        entry, fresh = response_cache.lookup(key, max_age)
+        if fresh:
+            return entry.data()
+
+        # Stale entries are revalidated conditionally (304 = still current)
+        headers = entry.conditional_headers() if entry is not None else None
+        response = await self._send("GET", endpoint, params=params, headers=headers)
+
+        if response.status_code == 304 and entry is not None:
+            response_cache.refresh(endpoint, key, entry)
+            return entry.data()
+
+        response_cache.store(
+            endpoint,
+            key,
+            response.content,
+            response.headers.get("ETag"),
+            response.headers.get("Last-Modified")
+        )
+        return response.json()
+
+    async def _send(
+        self,
+        method: str,
+        endpoint: str,
+        params: Optional[Dict] = None,
+        json_body: Optional[Dict] = None,
+        headers: Optional[Dict[str, str]] = None
+    ) -> httpx.Response:
+        """
+        Send a request through the rate limiter, retrying throttled and transient failures
+
+        A 429 pauses the shared token bucket for the server's Retry-After, so
+        every concurrent request backs off together.
+
+        Args:
+            method: HTTP method
+            endpoint: API endpoint (without base URL)
+            params: Query parameters
+            json_body: JSON request body
+            headers: Extra request headers (e.g. conditional validators)
+
+        Returns:
+            Successful (or 304 Not Modified) response
+
+        Raises:
+            httpx.HTTPStatusError: For non-retryable statuses or when retries run out
+        """
         url = f"{SCRYFALL_API_BASE}{endpoint}"
-        
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                url,
-                params=params,
-                headers={
-                    "User-Agent": "MagicScanner/1.0",
-                    "Accept": "application/json"
-                },
-                timeout=30.0
+
+        for attempt in range(MAX_RETRIES + 1):
+            await scryfall_rate_limiter.acquire()
+            self.network_requests += 1
+
+            try:
+                response = await get_http_client().request(
+                    method,
+                    url,
+                    params=params,
+                    json=json_body,
+                    headers={
+                        "User-Agent": "MagicScanner/1.0",
+                        "Accept": "application/json",
+                        **(headers or {})
+                    },
+                    timeout=30.0
+                )
+            except httpx.TransportError as e:
+                if attempt == MAX_RETRIES:
+                    raise
+                delay = _backoff_delay(attempt)
+                logger.warning(f"Scryfall request {endpoint} failed ({e}), retrying in {delay:.2f}s")
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code in RETRY_STATUS_CODES and attempt < MAX_RETRIES:
+                retry_after = _parse_retry_after(response.headers.get("Retry-After"))
+                if response.status_code == 429:
+                    self.throttled += 1
+                    delay = retry_after if retry_after is not None else _backoff_delay(attempt)
+                    scryfall_rate_limiter.pause(delay)
+                    delay += random.uniform(0, RETRY_JITTER)
+                else:
+                    delay = retry_after if retry_after is not None else _backoff_delay(attempt)
+                logger.warning(f"Scryfall returned {response.status_code} for {endpoint}, retrying in {delay:.2f}s")
+                self.retries += 1
+                await asyncio.sleep(delay)
+                continue
+
+            if response.status_code != 304:
+                response.raise_for_status()
+            return response
+
+        # Unreachable: the last attempt either returns or raises
+        raise RuntimeError(f"Retries exhausted for {endpoint}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Request counters (coalesced and memoized requests never hit the network)"""
+        return {
+            "requests": self.requests,
+            "network_requests": self.network_requests,
+            "coalesced": self.coalesced,
+            "memo_hits": self.memo_hits,
+            "in_flight": len(self._in_flight),
+            "throttled": self.throttled,
+            "retries": self.retries,
+            "rate_limiter": scryfall_rate_limiter.stats()
+        }
+
+
+def _backoff_delay(attempt: int) -> float:
+    """Exponential backoff with full jitter"""
+    return min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)) * random.uniform(0.5, 1.5)
+
+
+def _parse_retry_after(value: Optional[str]) -> Optional[float]:
+    """
+    Parse a Retry-After header
+
+    Args:
+        value: Header value (delta seconds or HTTP date)
+
+    Returns:
+        Seconds to wait, or None if absent/unparseable
+    """
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        retry_at = parsedate_to_datetime(value)
+        return max(0.0, retry_at.timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def _identifier_key(identifier: Dict[str, str]) -> Tuple:
+    """Key matching a /cards/collection identifier to the card that answers it"""
+    if identifier.get('id'):
+        return ('id', identifier['id'])
+    if identifier.get('collector_number'):
+        return ('set', identifier['set'].lower(), identifier['collector_number'])
+    return ('name', normalize_name(identifier['name']), (identifier.get('set') or '').lower())
+
+
+def _card_keys(card: Dict[str, Any]) -> list:
+    """Every identifier key a returned card can answer"""
+    set_code = (card.get('set') or '').lower()
+    keys = [('id', card.get('id')), ('set', set_code, card.get('collector_number'))]
+    for name in card_names(card):
+        keys.extend([('name', name, ''), ('name', name, set_code)])
+    return keys
+
+
+class CollectionBatcher:
+    """
+    Resolves card identifiers through /cards/collection
+
+    Identifiers requested by concurrent callers within a short window are
+    grouped into POSTs of up to 75, and each caller gets back just its own
+    card (or None if Scryfall didn't find it).
+    """
+
+    def __init__(self, client: ScryfallClient, window: float = COLLECTION_WINDOW):
+        self.client = client
+        self.window = window
+        self._pending: Dict[Tuple, Tuple[Dict[str, str], asyncio.Future]] = {}
+        self._timer: Optional[asyncio.TimerHandle] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+        # Statistics
+        self.identifiers = 0
+        self.requests = 0
+        self.not_found = 0
+
+    async def resolve(self, identifier: Dict[str, str]) -> Optional[Dict[str, Any]]:
+        """
+        Resolve one identifier, batched with any others pending
+
+        Args:
+            identifier: {"id"}, {"set", "collector_number"} or {"name"[, "set"]}
+
+        Returns:
+            Card object or None if not found
+        """
+        loop = asyncio.get_running_loop()
+        if self._loop is not loop:
+            # Pending futures from a previous event loop can never be resolved
+            self._pending, self._timer, self._loop = {}, None, loop
+
+        key = _identifier_key(identifier)
+        self.identifiers += 1
+
+        pending = self._pending.get(key)
+        if pending is None:
+            pending = (identifier, loop.create_future())
+            self._pending[key] = pending
+
+            if len(self._pending) >= COLLECTION_MAX_IDENTIFIERS:
+                self._flush()
+            elif self._timer is None:
+                self._timer = loop.call_later(self.window, self._flush)
+
+        # Shield so one caller's cancellation doesn't fail the others
+        return await asyncio.shield(pending[1])
+
+    def _flush(self) -> None:
+        """Send everything pending as collection requests of up to 75"""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+
+        entries = list(self._pending.items())
+        self._pending = {}
+        for start in range(0, len(entries), COLLECTION_MAX_IDENTIFIERS):
+            asyncio.ensure_future(self._send_chunk(entries[start:start + COLLECTION_MAX_IDENTIFIERS]))
+
+    async def _send_chunk(self, entries: list) -> None:
+        """POST one chunk and hand each card back to its waiting caller"""
+        self.requests += 1
+        try:
+            response = await self.client._send(
+                "POST",
+                "/cards/collection",
+                json_body={"identifiers": [identifier for _, (identifier, _) in entries]}
             )
-            response.raise_for_status()
-            return response.json()
+            data = response.json()
+        except Exception as e:
+            logger.error(f"Error resolving {len(entries)} identifier(s) via /cards/collection: {e}")
+            for _, (_, future) in entries:
+                if not future.done():
+                    future.set_exception(e)
+            return
+
+        cards = data.get('data', [])
+        self.client.remember_cards(cards, persist=True)
+
+        by_key = {}
+        for card in cards:
+            for card_key in _card_keys(card):
+                by_key.setdefault(card_key, card)
+
+        for key, (_, future) in entries:
+            card = by_key.get(key)
+            if card is None:
+                self.not_found += 1
+            if not future.done():
+                future.set_result(card)
+
+        logger.info(f"Resolved {len(cards)}/{len(entries)} identifier(s) in one /cards/collection request")
+
+    def stats(self) -> Dict[str, int]:
+        """Identifiers asked for vs. collection requests sent"""
+        return {
+            "identifiers": self.identifiers,
+            "requests": self.requests,
+            "not_found": self.not_found
+        }
 
 
 # Global client instance
 _client = ScryfallClient()
+_collection = CollectionBatcher(_client)
+
+
+def get_request_stats() -> Dict[str, Any]:
+    """Request counters for the shared Scryfall client"""
+    return dict(
+        _client.stats(),
+        collection=_collection.stats(),
+        prices=price_cache.stats(),
+        response_cache=response_cache.stats()
+    )
 
 
 async def get_card_details(scryfall_id: str) -> Dict[str, Any]:
     """
     Get full card details from Scryfall by ID
+
+    Read from the local card store first; the API is only asked on a miss.
     
     Args:
         scryfall_id: Scryfall UUID for the card
@@ -76,6 +570,10 @@ async def get_card_details(scryfall_id: str) -> Dict[str, Any]:
     Returns:
         Card object from Scryfall
     """
+    card_data = card_store.get_by_id(scryfall_id)
+    if card_data is not None:
+        return card_data
+
     try:
         endpoint = f"/cards/{scryfall_id}"
         card_data = await _client.get(endpoint)
@@ -90,42 +588,47 @@ async def get_card_details(scryfall_id: str) -> Dict[str, Any]:
         raise
 
 
-async def get_card_prices(scryfall_id: str) -> Dict[str, Optional[str]]:
+async def get_card_prices(scryfall_id: str, card: Optional[Dict[str, Any]] = None) -> Dict[str, Optional[str]]:
     """
     Get current prices for a card
+
+    Prices come from the price cache, then from the card object already in
+    hand (or the local store) if it carries prices, and only then from
+    /cards/{id}. The card store leaves prices off once they are older than
+    the price TTL, so stale prices are never reused.
     
     Args:
         scryfall_id: Scryfall UUID for the card
+        card: Card object the caller already has, if any
         
     Returns:
         Dictionary of prices (usd, usd_foil, eur, tix)
     """
+    prices = price_cache.get(scryfall_id)
+    if prices is not None:
+        return prices
+
     try:
-        card_data = await get_card_details(scryfall_id)
-        
-        prices = card_data.get('prices', {})
-        
-        return {
-            'usd': prices.get('usd'),
-            'usd_foil': prices.get('usd_foil'),
-            'eur': prices.get('eur'),
-            'tix': prices.get('tix')
-        }
+        if card is None or 'prices' not in card:
+            card = card_store.get_by_id(scryfall_id)
+        if card is None or 'prices' not in card:
+            card = await _client.get(f"/cards/{scryfall_id}", max_age=PRICE_CACHE_TTL)
+
+        prices = extract_prices(card.get('prices'))
+        price_cache.put(scryfall_id, prices)
+        return prices
         
     except Exception as e:
         logger.error(f"Error fetching prices for {scryfall_id}: {e}")
-        return {
-            'usd': None,
-            'usd_foil': None,
-            'eur': None,
-            'tix': None
-        }
+        return extract_prices(None)
 
 
 async def get_card_details_by_set(set_code: str, collector_number: str) -> Optional[Dict[str, Any]]:
     """
     Get card details by set code and collector number
 
+    Read from the local card store first; the API is only asked on a miss.
+
     Args:
         set_code: Set code (e.g., "NEO")
         collector_number: Collector number
@@ -133,16 +636,23 @@ async def get_card_details_by_set(set_code: str, collector_number: str) -> Optio
     Returns:
         Card object or None
     """
-    try:
-        endpoint = f"/cards/{set_code}/{collector_number}"
-        card_data = await _client.get(endpoint)
+    card_data = card_store.get_by_set(set_code, collector_number)
+    if card_data is not None:
+        return card_data
 
+    card_data = _client.recall(f"/cards/{set_code.lower()}/{collector_number}")
+    if card_data is not None:
         return card_data
 
-    except httpx.HTTPStatusError as e:
-        if e.response.status_code == 404:
+    try:
+        # Concurrent lookups (e.g. every card of a scan) share one /cards/collection request
+        card_data = await _collection.resolve({'set': set_code, 'collector_number': collector_number})
+
+        if card_data is None:
             logger.info(f"Card not found: {set_code}/{collector_number}")
-            return None
+        return card_data
+
+    except httpx.HTTPError as e:
         logger.error(f"Error fetching card {set_code}/{collector_number}: {e}")
         raise
     except Exception as e:
@@ -150,9 +660,55 @@ async def get_card_details_by_set(set_code: str, collector_number: str) -> Optio
         raise
 
 
+async def get_cards_collection(identifiers: list) -> list:
+    """
+    Resolve many cards at once via /cards/collection
+
+    Args:
+        identifiers: Identifier dicts ({"id"}, {"set", "collector_number"} or {"name"[, "set"]})
+
+    Returns:
+        Card object or None for each identifier, in order
+    """
+    return list(await asyncio.gather(*(_collection.resolve(identifier) for identifier in identifiers)))
+
+
+def find_stored_printings(
+    card_name: str,
+    set_code: Optional[str] = None,
+    limit: Optional[int] = None
+) -> list:
+    """
+    Printings from the local card store, correcting misread names
+
+    An exact (normalized) name lookup comes first; if that misses, the
+    fuzzy name index maps near misses ("Lightning Bolts", a dropped comma)
+    to the real card name locally.
+
+    Args:
+        card_name: Name as identified
+        set_code: Optional set code to narrow the search
+        limit: Maximum printings to return
+
+    Returns:
+        Printings, newest first ([] if none)
+    """
+    printings = card_store.find_by_name(card_name, set_code, limit=limit)
+    if printings:
+        return printings
+
+    corrected = name_index.correct(card_name)
+    if corrected and normalize_name(corrected) != normalize_name(card_name):
+        return card_store.find_by_name(corrected, set_code, limit=limit)
+    return []
+
+
 async def search_card_by_name(card_name: str, set_code: Optional[str] = None) -> Optional[Dict[str, Any]]:
     """
     Search for a card by name
+
+    Read from the local card store first (correcting misread names); the
+    API is only asked on a miss.
     
     Args:
         card_name: Name of the card
@@ -161,6 +717,10 @@ async def search_card_by_name(card_name: str, set_code: Optional[str] = None) ->
     Returns:
         Card object or None
     """
+    stored = find_stored_printings(card_name, set_code, limit=1)
+    if stored:
+        return stored[0]
+
     try:
         # Build search query
         query = f'!"{card_name}"'  # Exact name match
@@ -193,20 +753,51 @@ async def search_card_by_name(card_name: str, set_code: Optional[str] = None) ->
         raise
 
 
-async def get_all_printings(card_name: str, limit: int = 10) -> list[Dict[str, Any]]:
+async def get_all_printings(
+    card_name: str,
+    limit: Optional[int] = 10,
+    frame: Optional[str] = None,
+    finish: Optional[str] = None,
+    border: Optional[str] = None
+) -> list[Dict[str, Any]]:
     """
     Get all printings/editions of a card by name
 
+    Candidates come from the local printings index (every printing,
+    filtered locally, misread names corrected); the API is only asked when
+    the card isn't known locally. A filter that rules out every printing
+    is ignored rather than returning nothing.
+
     Args:
         card_name: Name of the card
-        limit: Maximum number of printings to return (default 10)
+        limit: Maximum number of printings to return (default 10, None for all)
+        frame: Only printings with this frame ("1993", "1997", "2003", "2015", "future")
+        finish: Only printings available in this finish ("nonfoil", "foil", "etched")
+        border: Only printings with this border color ("black", "white", "borderless", ...)
 
     Returns:
-        List of card objects for all printings
+        List of card objects for all printings, newest first
     """
+    oracle_id = printings_index.oracle_id_for(card_name)
+    if oracle_id:
+        candidates = printings_index.printings(oracle_id, frame=frame, finish=finish, border=border)
+        if not candidates and (frame or finish or border):
+            logger.info(f"No printings of '{card_name}' match frame={frame} finish={finish} border={border}, ignoring filters")
+            candidates = printings_index.printings(oracle_id)
+        printings = card_store.get_many([printing['id'] for printing in candidates[:limit]])
+        if printings:
+            logger.info(f"Found {len(printings)} printings for '{card_name}' (local index)")
+            return printings
+
     try:
         # Build search query for exact name match, all printings
         query = f'!"{card_name}"'
+        if frame:
+            query += f' frame:{frame}'
+        if finish:
+            query += f' is:{finish}'
+        if border:
+            query += f' border:{border}'
 
         endpoint = "/cards/search"
         params = {
@@ -256,59 +847,156 @@ async def get_bulk_data_info() -> Dict[str, Any]:
         raise
 
 
-async def get_default_cards_bulk_url() -> str:
+async def get_bulk_data_item(bulk_type: str = "default_cards") -> Dict[str, Any]:
     """
-    Get the download URL for the default cards bulk data file
-    
+    Get the bulk data entry of a given type
+
+    Args:
+        bulk_type: Bulk data type (e.g., "default_cards")
+
     Returns:
-        Download URL
+        Bulk data object (download_uri, updated_at, size, ...)
     """
     try:
         bulk_info = await get_bulk_data_info()
-        
-        # Find "Default Cards" bulk data
+
         for item in bulk_info.get('data', []):
-            if item.get('type') == 'default_cards':
-                return item.get('download_uri')
-        
-        raise ValueError("Default cards bulk data not found")
-        
+            if item.get('type') == bulk_type:
+                return item
+
+        raise ValueError(f"Bulk data '{bulk_type}' not found")
+
     except Exception as e:
-        logger.error(f"Error getting bulk data URL: {e}")
+        logger.error(f"Error getting bulk data info for {bulk_type}: {e}")
         raise
 
 
-async def download_all_cards() -> list:
+async def get_default_cards_bulk_url() -> str:
     """
-    Download all cards from Scryfall bulk data
+    Get the download URL for the default cards bulk data file
     
     Returns:
-        List of all card objects
+        Download URL
+    """
+    item = await get_bulk_data_item("default_cards")
+    return item.get('download_uri')
+
+
+async def download_bulk_file(bulk_type: str = "default_cards", dest: Optional[Path] = None) -> Path:
     """
+    Stream a bulk data file to disk
+
+    The response is written chunk by chunk to a temporary file and renamed
+    into place, so memory use stays flat and a failed download never
+    replaces a good file.
+
+    Args:
+        bulk_type: Bulk data type (e.g., "default_cards")
+        dest: Target path (default: BULK_DATA_DIR/<bulk_type>.json)
+
+    Returns:
+        Path to the downloaded JSON file
+    """
+    item = await get_bulk_data_item(bulk_type)
+    download_url = item.get('download_uri')
+    dest = Path(dest) if dest else Path(BULK_DATA_DIR) / f"{bulk_type}.json"
+    dest.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = dest.with_name(dest.name + ".part")
+
+    logger.info(f"Downloading {bulk_type} from: {download_url}")
+    started = time.monotonic()
+    written = 0
+
     try:
-        # Get bulk data URL
-        download_url = await get_default_cards_bulk_url()
-        
-        logger.info(f"Downloading all cards from: {download_url}")
-        
-        # Download the JSON file (can be large, ~100MB)
-        async with httpx.AsyncClient() as client:
-            response = await client.get(
-                download_url,
-                timeout=300.0  # 5 minute timeout for large download
-            )
+        async with get_http_client().stream("GET", download_url, timeout=300.0) as response:
             response.raise_for_status()
-            
-            cards = response.json()
-            
-            logger.info(f"Downloaded {len(cards)} cards")
-            
-            return cards
-        
+            with open(tmp_path, "wb") as f:
+                async for chunk in response.aiter_bytes(BULK_CHUNK_SIZE):
+                    f.write(chunk)
+                    written += len(chunk)
+        os.replace(tmp_path, dest)
     except Exception as e:
         logger.error(f"Error downloading bulk data: {e}")
+        tmp_path.unlink(missing_ok=True)
         raise
 
+    logger.info(f"✓ Downloaded {written / 1e6:.1f} MB to {dest} in {time.monotonic() - started:.1f}s")
+    return dest
+
+
+def iter_bulk_cards(path: Path, chunk_size: int = BULK_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """
+    Iterate the card objects of a bulk data file without loading it whole
+
+    Bulk files are a single top-level JSON array; items are decoded one at
+    a time from a sliding text buffer, so memory stays at roughly one chunk
+    plus one card regardless of file size.
+
+    Args:
+        path: Bulk data JSON file
+        chunk_size: Characters read per refill
+
+    Yields:
+        Card objects in file order
+    """
+    decoder = json.JSONDecoder()
+    with open(path, "r", encoding="utf-8") as f:
+        buffer = f.read(chunk_size)
+        pos = 0
+        eof = not buffer
+        started = False
+
+        while True:
+            # Skip whitespace and separators
+            while pos < len(buffer) and buffer[pos] in " \t\r\n,":
+                pos += 1
+
+            if pos >= len(buffer):
+                if eof:
+                    break
+                buffer, pos = f.read(chunk_size), 0
+                eof = not buffer
+                continue
+
+            if not started:
+                if buffer[pos] != "[":
+                    raise ValueError(f"{path} is not a JSON array")
+                started = True
+                pos += 1
+                continue
+
+            if buffer[pos] == "]":
+                break
+
+            try:
+                item, end = decoder.raw_decode(buffer, pos)
+            except json.JSONDecodeError:
+                if eof:
+                    raise
+                # Item runs past the buffer: keep the tail and read more
+                more = f.read(chunk_size)
+                eof = not more
+                buffer, pos = buffer[pos:] + more, 0
+                continue
+
+            pos = end
+            yield item
+
+
+async def download_all_cards() -> list:
+    """
+    Download all cards from Scryfall bulk data
+
+    Holds every card in memory; prefer download_bulk_file() + iter_bulk_cards().
+    
+    Returns:
+        List of all card objects
+    """
+    path = await download_bulk_file("default_cards")
+    cards = list(iter_bulk_cards(path))
+    logger.info(f"Downloaded {len(cards)} cards")
+    return cards
+
 
 async def get_set_info(set_code: str) -> Dict[str, Any]:
     """
@@ -0,0 +1,305 @@
+"""
+Set Symbol Index
+Templates of every set's expansion symbol (per rarity and frame, since the
+symbol's color and position depend on both), matched against the symbol
+area of a normalized card crop to tell which set a printing is from
+
+Build it (after the card store, from images in the image store) with:
+    python set_symbol_index.py
+"""
+
+import asyncio
+import logging
+import os
+import threading
+import time
+from pathlib import Path
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import cv2
+import numpy as np
+
+from card_store import card_store
+from image_store import image_store
+
+logger = logging.getLogger(__name__)
+
+# Index location (overridable through the environment)
+SET_SYMBOL_INDEX_PATH = os.getenv("SET_SYMBOL_INDEX_PATH", str(Path(__file__).parent / "cache" / "set_symbols.npz"))
+
+# Card images averaged into each template
+TEMPLATE_SAMPLES = 3
+
+# Boxes as (x0, y0, x1, y1) fractions of the card. The template is the
+# symbol's usual box - kept inside the type line bar, whose edges would
+# otherwise match every set alike; matching searches a wider window around
+# it to absorb crop misalignment and older frames' symbol placement.
+SYMBOL_BOX = (0.845, 0.562, 0.935, 0.612)
+SEARCH_BOX = (0.80, 0.53, 0.98, 0.64)
+CARD_SIZE = (488, 680)
+
+# Symbols are matched at this fraction of CARD_SIZE: still recognizable,
+# and a quarter of the correlation work
+SYMBOL_SCALE = 0.5
+
+# Narrowing only happens when the best set matches at least this well...
+SYMBOL_MIN_SCORE = float(os.getenv("SYMBOL_MIN_SCORE", "0.85"))
+# ...and sets scoring within this of the best are kept as well
+SYMBOL_KEEP_MARGIN = 0.08
+
+
+def template_key(card: Dict[str, Any]) -> str:
+    """Template a printing's symbol is matched against (set|rarity|frame)"""
+    return f"{(card.get('set') or '').lower()}|{card.get('rarity') or ''}|{card.get('frame') or ''}"
+
+
+def symbol_area(card_image: np.ndarray, box: Tuple[float, float, float, float]) -> np.ndarray:
+    """
+    A fractional box of a card image, at SYMBOL_SCALE of a CARD_SIZE card
+
+    Only the box is resized (and slightly blurred against JPEG and sensor
+    noise), not the whole card.
+
+    Args:
+        card_image: Card image of any size (BGR)
+        box: (x0, y0, x1, y1) as fractions of the card
+
+    Returns:
+        The box's pixels
+    """
+    x0, y0, x1, y1 = box
+    height, width = card_image.shape[:2]
+    area = card_image[int(y0 * height):int(y1 * height), int(x0 * width):int(x1 * width)]
+    width_px, height_px = CARD_SIZE[0] * SYMBOL_SCALE, CARD_SIZE[1] * SYMBOL_SCALE
+    size = (int(x1 * width_px) - int(x0 * width_px), int(y1 * height_px) - int(y0 * height_px))
+    if area.shape[1::-1] != size:
+        area = cv2.resize(area, size, interpolation=cv2.INTER_AREA)
+    return cv2.GaussianBlur(area, (3, 3), 0)
+
+
+def is_template_source(card: Dict[str, Any]) -> bool:
+    """Whether a printing shows its set symbol in the usual place"""
+    return (
+        card.get('layout') in ('normal', 'leveler', 'class', 'saga', 'adventure', 'prototype', 'mutate')
+        and card.get('border_color') != 'borderless'
+        and not card.get('full_art')
+        and 'image_uris' in card
+    )
+
+
+class SetSymbolIndex:
+    """
+    Symbol templates keyed by set|rarity|frame, loaded from an .npz file
+
+    Matching is restricted to the sets of a card's candidate printings,
+    so a lookup compares a few dozen small templates at most.
+    """
+
+    def __init__(self, path: str = SET_SYMBOL_INDEX_PATH):
+        self.path = path
+        self._templates: Dict[str, np.ndarray] = {}
+        self._loaded_mtime: Optional[float] = None
+        self._lock = threading.Lock()
+
+        # Statistics
+        self.lookups = 0
+        self.narrowed = 0
+        self.seconds = 0.0
+
+    def _ensure_loaded(self) -> Dict[str, np.ndarray]:
+        """Load the index on first use, and reload it after a rebuild"""
+        try:
+            mtime = os.stat(self.path).st_mtime
+        except OSError:
+            return self._templates
+
+        if mtime != self._loaded_mtime:
+            with self._lock:
+                if mtime != self._loaded_mtime:
+                    try:
+                        with np.load(self.path) as data:
+                            self._templates = dict(zip(data['keys'].tolist(), data['templates']))
+                        logger.info(f"Loaded {len(self._templates)} set symbol templates from {self.path}")
+                    except Exception as e:
+                        logger.error(f"Failed to load set symbol index {self.path}: {e}")
+                    self._loaded_mtime = mtime
+        return self._templates
+
+    @property
+    def available(self) -> bool:
+        """Whether any templates are loaded"""
+        return bool(self._ensure_loaded())
+
+    def score_keys(self, card_image: np.ndarray, keys: Iterable[str]) -> Dict[str, float]:
+        """
+        How well the card's symbol matches each template
+
+        Args:
+            card_image: Card crop (any size, upright; BGR)
+            keys: Template keys to try (see template_key())
+
+        Returns:
+            Key -> best normalized correlation within the search window
+            (keys without a template are left out)
+        """
+        templates = self._ensure_loaded()
+        window = symbol_area(card_image, SEARCH_BOX)
+        scores = {}
+        for key in set(keys):
+            template = templates.get(key)
+            if template is not None:
+                scores[key] = float(cv2.matchTemplate(window, template, cv2.TM_CCOEFF_NORMED).max())
+        return scores
+
+    def narrow(self, card_image: np.ndarray, printings: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Keep only the printings from the set(s) whose symbol is in the photo
+
+        Args:
+            card_image: Card crop (upright; BGR)
+            printings: Candidate printings (need set, rarity and frame)
+
+        Returns:
+            Printings from the best-matching set, any set within
+            SYMBOL_KEEP_MARGIN of it and any without a template - or all
+            printings if no template matches confidently
+        """
+        started = time.perf_counter()
+        scores = self.score_keys(card_image, (template_key(card) for card in printings))
+        self.lookups += 1
+        self.seconds += time.perf_counter() - started
+        if not scores:
+            return printings
+
+        best = max(scores.values())
+        if best < SYMBOL_MIN_SCORE:
+            return printings
+
+        # Printings without a template can't be ruled out
+        kept_sets = {key.split("|", 1)[0] for key, score in scores.items() if score >= best - SYMBOL_KEEP_MARGIN}
+        narrowed = [
+            card for card in printings
+            if (card.get('set') or '').lower() in kept_sets or template_key(card) not in scores
+        ]
+        if narrowed and len(narrowed) < len(printings):
+            self.narrowed += 1
+            logger.info(f"Set symbol narrowed {len(printings)} printings to {len(narrowed)} ({', '.join(sorted(kept_sets)).upper()})")
+            return narrowed
+        return printings
+
+    def build(self, samples: Dict[str, List[np.ndarray]]) -> int:
+        """
+        Build templates from sample symbol crops and swap the index in
+
+        Args:
+            samples: Template key -> symbol_area(card image, SYMBOL_BOX) of
+                each sample printing
+
+        Returns:
+            Number of templates written
+        """
+        keys, templates = [], []
+        for key, crops in samples.items():
+            if crops:
+                keys.append(key)
+                templates.append(np.median(np.stack(crops), axis=0).astype(np.uint8))
+
+        Path(self.path).parent.mkdir(parents=True, exist_ok=True)
+        tmp_path = f"{self.path}.building.npz"
+        np.savez_compressed(tmp_path, keys=np.array(keys), templates=np.stack(templates) if templates else np.zeros((0, 1, 1, 3), np.uint8))
+        os.replace(tmp_path, self.path)
+        logger.info(f"✓ Set symbol index built: {len(keys)} templates ({self.path})")
+        return len(keys)
+
+    def stats(self) -> Dict[str, Any]:
+        """Template count and narrowing counters"""
+        return {
+            "templates": len(self._templates),
+            "lookups": self.lookups,
+            "narrowed": self.narrowed,
+            "avg_ms": round(self.seconds / self.lookups * 1000, 2) if self.lookups else 0.0
+        }
+
+
+# Global index instance
+set_symbol_index = SetSymbolIndex()
+
+
+def decode_symbol_area(image_data: bytes) -> Optional[np.ndarray]:
+    """
+    The SYMBOL_BOX area of an encoded card image
+
+    Only the small crop is kept, so building the index never holds whole
+    decoded card images.
+
+    Args:
+        image_data: Card image bytes
+
+    Returns:
+        Symbol crop, or None if the image can't be decoded
+    """
+    image = cv2.imdecode(np.frombuffer(image_data, np.uint8), cv2.IMREAD_COLOR)
+    return symbol_area(image, SYMBOL_BOX) if image is not None else None
+
+
+async def build_set_symbol_index(samples_per_key: int = TEMPLATE_SAMPLES) -> int:
+    """
+    Build the set symbol index from the card store and image store
+
+    Args:
+        samples_per_key: Card images averaged into each template
+
+    Returns:
+        Number of templates built
+    """
+    chosen: Dict[str, List[Dict[str, Any]]] = {}
+    for card in card_store.iter_cards():
+        if is_template_source(card):
+            cards = chosen.setdefault(template_key(card), [])
+            if len(cards) < samples_per_key:
+                cards.append(card)
+
+    logger.info(f"Building {len(chosen)} set symbol templates...")
+    all_cards = [card for cards in chosen.values() for card in cards]
+    for start in range(0, len(all_cards), 500):
+        await image_store.prefetch(all_cards[start:start + 500])
+
+    # Cropped as they're loaded (off the event loop), so only symbol boxes are held
+    samples: Dict[str, List[np.ndarray]] = {}
+    for key, cards in chosen.items():
+        for card in cards:
+            data = await image_store.get(card)
+            crop = await asyncio.to_thread(decode_symbol_area, data) if data else None
+            if crop is not None:
+                samples.setdefault(key, []).append(crop)
+
+    return await asyncio.to_thread(set_symbol_index.build, samples)
+
+
+def main():
+    """Main entry point"""
+    import argparse
+    from rate_limiter import background_priority
+    from scryfall_integration import close_http_client
+
+    parser = argparse.ArgumentParser(description="Build the set symbol template index")
+    parser.add_argument('--samples', type=int, default=TEMPLATE_SAMPLES, help='Card images per template')
+    args = parser.parse_args()
+
+    logging.basicConfig(
+        level=logging.INFO,
+        format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+    )
+
+    async def run():
+        try:
+            await build_set_symbol_index(args.samples)
+        finally:
+            await close_http_client()
+
+    with background_priority():
+        asyncio.run(run())
+
+
+if __name__ == "__main__":
+    main()